@@ -1,5 +1,9 @@
 from fastapi import APIRouter, HTTPException, status
 from database import database
+from searching.index import user_search_index
+from proFile.identity import user_identity
+from existence import existence
+from cache import response_cache
 from typing import Optional, List
 from pydantic import BaseModel
 
@@ -100,9 +104,17 @@ async def insert_item(user: User):
     
         )
     
-    query = 'SELECT * FROM user WHERE id=%s AND password=%s'
-    params = [user.userId, user.password]
-    result = await database.execute_query(query, tuple(params))
+    # 이미 있는 ID 인지 확인 (Bloom filter 가 확실히 없다고 하면 DB 조회 없이 바로 INSERT)
+    if existence.user_may_exist(user.userId):
+        query = 'SELECT id FROM user WHERE id=%s'
+        result = await database.execute_query(query, (user.userId,))
+        existence.user_probed(len(result) > 0)
+        if len(result) > 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="이미 존재하는 사용자입니다."
+            )
+    
     try:
         # id 필드가 없는 경우
         query = "INSERT INTO user (id, password, name, country) VALUES (%s, %s, %s, %s)"
@@ -121,6 +133,12 @@ async def insert_item(user: User):
                 detail="예상치 못한 오류가 발생했습니다."
             )
     
+    user_search_index.add(user.userId, user.username)
+    user_identity.put(user.userId, user.username, user.country)
+    existence.user_added(user.userId)
+    # 가입 전에 "없는 유저" 로 캐시된 프로필 응답 무효화
+    await response_cache.invalidate(f"user:{user.userId}")
+    
     return {
         "userId": user.userId,
         "password": user.password,
@@ -199,6 +217,7 @@ async def get_users(user: User):
         query = 'UPDATE user SET password = %s WHERE id = %s'
         params = (user.password, user.userId)
         await database.execute_query(query, params)
+        user_identity.invalidate(user.userId)
                 
     except Exception as e:
         print(e)
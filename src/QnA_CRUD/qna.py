@@ -1,5 +1,13 @@
-from fastapi import APIRouter, HTTPException, status, Header
+from fastapi import APIRouter, HTTPException, status, Header, Query, Request, Response
 from database import database
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, keyset_condition, keyset_params, paginate
+from searching.fulltext import post_search_index
+from timeline.timeline import home_timeline
+from interaction.state import user_state
+from cache import CACHE_LIST_TTL, response_cache
+from etag import check_etag
+from batch import in_order, parse_ids
+from existence import existence
 from typing import Optional, List
 from pydantic import BaseModel
 from datetime import datetime
@@ -10,14 +18,14 @@ router = APIRouter(
 )
 
 # Pydantic 모델 정의
-class qa(BaseModel):
+class qaContent(BaseModel):
     content: str
 
-class qaListResponse(BaseModel):
-    result: List[qa]
+class qaContentListResponse(BaseModel):
+    result: List[qaContent]
 
 @router.post("", summary="Qna 글 생성")
-async def create_item(text: qa, userId: str = Header()):
+async def create_item(text: qaContent, userId: str = Header()):
     """
     데이터를 'qa' 테이블에 삽입하는 엔드포인트입니다.
     
@@ -38,7 +46,11 @@ async def create_item(text: qa, userId: str = Header()):
         params = (text.content, userId)
     
       # 쿼리 실행
-        await database.execute_query(query, params)
+        post_id = await database.execute_insert(query, params)
+        post_search_index.upsert("qa", post_id, text.content)
+        home_timeline.post_created("qa", post_id, userId)
+        existence.post_added("qa", post_id)
+        await response_cache.invalidate("qa:list")
                 
     except Exception as e:
         print(e)
@@ -49,7 +61,7 @@ async def create_item(text: qa, userId: str = Header()):
     
     return {"content":text.content}
 
-class qa(BaseModel):
+class qaItem(BaseModel):
     id: int
     content: str
     author: str
@@ -57,18 +69,33 @@ class qa(BaseModel):
     postType: str
     liked: bool
     likeCount: int
+    commentCount: int
+
+class qaPageResponse(BaseModel):
+    result: List[qaItem]
+    nextCursor: Optional[str] = None
 
-class qaListResponse(BaseModel):
-    result: List[qa]
+class QABatchResponse(BaseModel):
+    result: List[qaItem]
 
-@router.get("", summary="Qna 글 불러오기", response_model=qaListResponse)
-async def read_item(targetUserId: Optional[str] = None, userId: str = Header()):
+@router.get("", summary="Qna 글 불러오기", response_model=qaPageResponse)
+async def read_item(request: Request, response: Response, targetUserId: Optional[str] = None, cursor: Optional[str] = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), userId: str = Header()):
     """
-    데이터를 'qa' 테이블에서 불러오는 엔드포인트입니다.
+    데이터를 'qa' 테이블에서 최신순으로 불러오는 엔드포인트입니다.
+    응답의 ETag 를 If-None-Match 헤더로 보내면 바뀐 게 없을 때 304 를 반환합니다.
     
     - **targetUserId**: 작성자 ID (선택) (str) (없으면 전체를 받아옵니다)
+    - **cursor**: 이전 응답의 nextCursor (선택) (str) (없으면 첫 페이지)
+    - **limit**: 한 번에 받아올 개수 (선택) (int) (기본 20, 최대 100)
     - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
     """
+    
+    cursor_params = keyset_params(cursor) if cursor else None
+    
+    # 글 작성 / 삭제, 좋아요 수, 이 유저의 좋아요가 바뀌지 않았으면 쿼리 없이 304
+    not_modified = await check_etag(request, response, ("qa:list", "qa:counts", f"state:{userId}"), "qa:list", targetUserId, cursor, limit, userId)
+    if not_modified:
+        return not_modified
 
     try:
         query = """
@@ -77,26 +104,41 @@ async def read_item(targetUserId: Optional[str] = None, userId: str = Header()):
             q.content, 
             q.author, 
             q.created_at,
-            CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,  
-            COALESCE(like_count_table.like_count, 0) AS like_count 
+            q.like_count,
+            q.comment_count
         FROM qa q
-        LEFT JOIN `like` l ON q.id = l.post_id AND l.user_id = %s AND post_type = 'qa'
-        LEFT JOIN (
-            SELECT post_id, COUNT(*) AS like_count 
-            FROM `like`
-            WHERE post_type = 'qa'
-            GROUP BY post_id
-        ) AS like_count_table ON q.id = like_count_table.post_id 
         """
-        params = [userId]
+        params = []
+        conditions = []
         
         if targetUserId:
-            query += " WHERE q.author = %s"
+            conditions.append("q.author = %s")
             params.append(targetUserId)
         
-        # 쿼리 실행
-        result = await database.execute_query(query, params)
-        formatted_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result]
+        if cursor_params:
+            conditions.append(keyset_condition("q"))
+            params.extend(cursor_params)
+        
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        
+        query += " ORDER BY q.created_at DESC, q.id DESC LIMIT %s"
+        params.append(limit + 1)
+        
+        # 쿼리 실행 (게시글 데이터는 모든 유저에게 같으므로 캐시)
+        # ETag 와 같은 태그를 달아서 좋아요 / 댓글 수가 바뀌면 캐시도 같이 무효화 (ETag 만 바뀌고 예전 본문이 나가지 않도록)
+        # 좋아요 여부는 JOIN 대신 유저별 캐시에서 (목록 조회와 동시에)
+        result, state = await database.gather(
+            response_cache.get_or_load(
+                f"qa:list:{targetUserId or ''}:{cursor or ''}:{limit}",
+                lambda: database.execute_query(query, params),
+                tags=["qa:list", "qa:counts"],
+                ttl=CACHE_LIST_TTL,
+            ),
+            user_state.get(userId),
+        )
+        result, next_cursor = paginate(result, limit)
+        formatted_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": state.liked("qa", row['id']), "likeCount": row["like_count"], "commentCount": row["comment_count"]} for row in result]
                 
     except Exception as e:
         print(e)
@@ -106,42 +148,40 @@ async def read_item(targetUserId: Optional[str] = None, userId: str = Header()):
         )
     
     return {
-        "result": formatted_result
+        "result": formatted_result,
+        "nextCursor": next_cursor
     }
     
-@router.get("/following", summary="Qna 글 불러오기", response_model=qaListResponse)
-async def read_item(userId: str = Header()):
+@router.get("/following", summary="Qna 글 불러오기", response_model=qaPageResponse)
+async def read_item(cursor: Optional[str] = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), userId: str = Header()):
     """
-    팔로잉한 사람들의 Q&A 목록을 받아오는 EndPoint입니다.
+    팔로잉한 사람들의 Q&A 목록을 최신순으로 받아오는 EndPoint입니다.
     
+    - **cursor**: 이전 응답의 nextCursor (선택) (str) (없으면 첫 페이지)
+    - **limit**: 한 번에 받아올 개수 (선택) (int) (기본 20, 최대 100)
     - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
     """
     
+    # 유저별 타임라인에서 이번 페이지의 글 id 만 먼저 고르고 (기본 키 범위 조회) 본문을 붙임
+    source, params = await home_timeline.feed_source(userId, "qa", cursor, limit + 1)
+    
     try:
-        query = """
+        query = f"""
         SELECT
             q.id, 
             q.content, 
             q.author, 
             q.created_at,
-            CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,  
-            COALESCE(like_count_table.like_count, 0) AS like_count 
-        FROM qa q
-        JOIN following f ON f.follower = q.author
-        LEFT JOIN `like` l ON q.id = l.post_id AND l.user_id = %s AND post_type = 'qa'
-        LEFT JOIN (
-            SELECT post_id, COUNT(*) AS like_count 
-            FROM `like`
-            WHERE post_type = 'qa'
-            GROUP BY post_id
-        ) AS like_count_table ON q.id = like_count_table.post_id 
-        WHERE f.following = %s;
+            q.like_count,
+            q.comment_count
+        FROM ({source}) AS feed
+        JOIN qa q ON q.id = feed.id
+        ORDER BY q.created_at DESC, q.id DESC
         """
         
-        params = [userId, userId]
-        
-        result = await database.execute_query(query, tuple(params)) 
-        formatted_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result]
+        result, state = await database.gather(database.execute_query(query, tuple(params)), user_state.get(userId))
+        result, next_cursor = paginate(result, limit)
+        formatted_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": state.liked("qa", row['id']), "likeCount": row["like_count"], "commentCount": row["comment_count"]} for row in result]
                 
     except Exception as e:
         print(e)
@@ -151,17 +191,18 @@ async def read_item(userId: str = Header()):
         )
     
     return {
-        "result": formatted_result
+        "result": formatted_result,
+        "nextCursor": next_cursor
     }
 
-class qa(BaseModel):
+class qaUpdate(BaseModel):
     content: str
 
-class qaListResponse(BaseModel):
-    result: List[qa]
+class qaUpdateListResponse(BaseModel):
+    result: List[qaUpdate]
 
 @router.put("/{postID}", summary="Qna 글 업데이트")
-async def update_item(postID: int, text: qa, userId: str = Header()):
+async def update_item(postID: int, text: qaUpdate, userId: str = Header()):
     """
     'qa' 테이블의 데이터를 id를 통해 불러와서 수정하는 엔드포인트입니다.
     
@@ -197,6 +238,8 @@ async def update_item(postID: int, text: qa, userId: str = Header()):
     
         # 쿼리 실행
         await database.execute_query(query, params)
+        post_search_index.upsert("qa", postID, text.content)
+        await response_cache.invalidate(f"qa:{postID}", "qa:list")
                 
     except Exception as e:
         print(e)
@@ -234,6 +277,11 @@ async def delete_item(postID: int, userId: str = Header()):
     
         # 쿼리 실행
         await database.execute_query(query, params)
+        post_search_index.remove("qa", postID)
+        home_timeline.post_deleted("qa", postID)
+        existence.post_removed("qa", postID)
+        user_state.post_deleted("qa", postID)
+        await response_cache.invalidate(f"qa:{postID}", f"qa:{postID}:comments", "qa:list")
                 
     except Exception as e:
         print(e)
@@ -246,56 +294,180 @@ async def delete_item(postID: int, userId: str = Header()):
     
     return {"message": "Data deleted successfully"}
 
-@router.get("/detail/{postID}")
-async def get_qna_detail(postID: str, userId: str = Header()):
-    query = """
+@router.get("/batch", summary="Qna 글 여러 개 한 번에 불러오기", response_model=QABatchResponse)
+async def get_qna_batch(request: Request, response: Response, ids: str = Query(..., description="쉼표로 구분된 Qna 글 ID 목록"), userId: str = Header()):
+    """
+    여러 Qna 글을 목록과 같은 모양으로 한 번에 불러오는 엔드포인트입니다.
+    글마다 /detail/{postID} 를 호출하는 대신 한 번의 IN (...) 쿼리로 조회합니다. (댓글은 포함하지 않음)
+    
+    - **ids**: 쉼표로 구분된 Qna 글 ID 목록, 최대 BATCH_MAX_IDS (기본 100)개 (필수) (str) (Query)
+
+    - **userId**: 현재 접속중인 유저 이름 (필수) (str) (Header)
+    """
+    post_ids = parse_ids(ids)
+    not_modified = await check_etag(request, response, (*[f"qa:{post_id}" for post_id in post_ids], f"state:{userId}"), "qa:batch", *post_ids, userId)
+    if not_modified:
+        return not_modified
+    
+    placeholders = ", ".join(["%s"] * len(post_ids))
+    query = f"""
         SELECT
             q.id, 
             q.content, 
             q.author, 
             q.created_at,
-            CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,  
-            COALESCE(like_count_table.like_count, 0) AS like_count 
+            q.like_count,
+            q.comment_count
         FROM qa q
-        LEFT JOIN `like` l ON q.id = l.post_id AND l.user_id = %s AND post_type = 'qa'
-        LEFT JOIN (
-            SELECT post_id, COUNT(*) AS like_count 
-            FROM `like`
-            WHERE post_type = 'qa'
-            GROUP BY post_id
-        ) AS like_count_table ON q.id = like_count_table.post_id 
-        WHERE q.id = %s
+        WHERE q.id IN ({placeholders})
         """
-    params = [userId, postID]
-
-    result = await database.execute_query(query, params)
-    formatted_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result]
     
+    result, state = await database.gather(database.execute_query(query, tuple(post_ids)), user_state.get(userId))
+    
+    formatted_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": state.liked("qa", row['id']), "likeCount": row["like_count"], "commentCount": row["comment_count"]} for row in in_order(result, post_ids)]
+    
+    return {"result": formatted_result}
+
+# 댓글 한 페이지 (작성 순) / 게시글 상세와 댓글 목록이 같이 사용
+# 댓글은 모든 유저에게 같은 내용이므로 응답 캐시에 두고, 댓글이 추가 / 삭제되면 "qa:{postID}:comments" 태그로 무효화
+# 작성자 이름도 같이 캐시하고, 이름이 바뀌면 프로필 수정 핸들러가 그 유저가 댓글을 단 글의 태그를 무효화
+# (그래서 ETag 는 태그 버전만으로 조회 전에 계산할 수 있음)
+async def _comment_page(postID: int, cursor: Optional[str], limit: int):
     query = """
     SELECT 
-        c.*, 
-        u.name AS name
+        c.id,
+        c.content,
+        c.author,
+        c.created_at,
+        u.name
     FROM comment c
-    JOIN user u ON c.author = u.id
-    WHERE c.post_id = %s;
+    JOIN user u ON u.id = c.author
+    WHERE c.post_id = %s
     """
-    
     params = [postID]
-
-    result = await database.execute_query(query, params)
+    if cursor:
+        query += " AND " + keyset_condition("c", ascending=True)
+        params.extend(keyset_params(cursor))
+    query += " ORDER BY c.created_at, c.id LIMIT %s"
+    params.append(limit + 1)
+    
+    result = await response_cache.get_or_load(
+        f"qa:{postID}:comments:{cursor or ''}:{limit}",
+        lambda: database.execute_shared(query, tuple(params)),
+        tags=[f"qa:{postID}:comments"],
+    )
+    result, next_cursor = paginate(result, limit)
     comment_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "created_at": row['created_at'], "name": row['name']} for row in result]
+    return comment_result, next_cursor
+
+@router.get("/detail/{postID}")
+async def get_qna_detail(request: Request, response: Response, postID: int, userId: str = Header()):
+    """
+    Qna 글 하나와 댓글 첫 페이지(작성 순 DEFAULT_LIMIT 개)를 받아오는 엔드포인트입니다.
+    나머지 댓글은 commentsNextCursor 로 /comment/{postID} 에서 이어서 받아옵니다.
     
-    return {"result": {"detail": formatted_result, "comments": comment_result}}
+    - **postID**: 게시글 id (필수) (int) (parameter)
+
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    """
+    # 조회 전에 태그 버전만으로 ETag 를 계산해서, 바뀐 게 없으면 쿼리 없이 304
+    not_modified = await check_etag(request, response, (f"qa:{postID}", f"qa:{postID}:comments", f"state:{userId}"), "qa:detail", postID, userId)
+    if not_modified:
+        return not_modified
+    
+    # 게시글은 모든 유저에게 같은 내용이므로 응답 캐시에 두고, 캐시가 없을 때 동시에 들어온 같은 요청은 한 번의 쿼리로 합쳐짐
+    query = """
+        SELECT
+            q.id, 
+            q.content, 
+            q.author, 
+            q.created_at,
+            q.like_count,
+            q.comment_count
+        FROM qa q
+        WHERE q.id = %s
+        """
+    params = (postID,)
+
+    # 게시글 / 댓글 / 좋아요 여부는 서로 의존하지 않으므로 동시에 조회
+    result, (comment_result, comments_next_cursor), state = await database.gather(
+        response_cache.get_or_load(f"qa:{postID}:detail", lambda: database.execute_shared(query, params), tags=[f"qa:{postID}"]),
+        _comment_page(postID, None, DEFAULT_LIMIT),
+        # 유저마다 다른 부분 (좋아요 여부)
+        user_state.get(userId),
+    )
+    
+    formatted_result = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": state.liked("qa", row['id']), "likeCount": row["like_count"], "commentCount": row["comment_count"]} for row in result]
+    
+    return {"result": {"detail": formatted_result, "comments": comment_result, "commentsNextCursor": comments_next_cursor}}
+
+@router.get("/comment/{postID}", summary="Qna 글의 댓글 목록")
+async def get_comments(request: Request, response: Response, postID: int, cursor: Optional[str] = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT)):
+    """
+    Qna 글의 댓글을 작성 순(오래된 댓글부터)으로 받아오는 엔드포인트입니다.
+    
+    - **postID**: 게시글 id (필수) (int) (parameter)
+    - **cursor**: 이전 응답의 nextCursor 또는 상세 조회의 commentsNextCursor (선택) (str) (없으면 첫 페이지)
+    - **limit**: 한 번에 받아올 개수 (선택) (int) (기본 20, 최대 100)
+    """
+    not_modified = await check_etag(request, response, (f"qa:{postID}:comments",), "qa:comments", postID, cursor, limit)
+    if not_modified:
+        return not_modified
+    
+    comment_result, next_cursor = await _comment_page(postID, cursor, limit)
+    return {"result": comment_result, "nextCursor": next_cursor}
 
 class comment(BaseModel):
     content: str
     
 @router.post("/comment/{postID}")
-async def upload_comment(postID: str, comment: comment, userId: str = Header()):
-    query = "INSERT INTO comment (content, author, post_id) VALUES (%s, %s, %s)"
-    params = (comment.content, userId, postID)
+async def upload_comment(postID: int, comment: comment, userId: str = Header()):
+    async with database.transaction() as tx:
+        result = await tx.execute_query("SELECT id FROM qa WHERE id = %s", (postID,))
+        if len(result) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="존재하지 않는 게시글입니다."
+            )
+        
+        query = "INSERT INTO comment (content, author, post_id) VALUES (%s, %s, %s)"
+        params = (comment.content, userId, postID)
+        await tx.execute_query(query, params)
+        
+        # 게시글의 댓글 수를 같이 증가 (목록 / 피드에서 comment 테이블 GROUP BY 대신 사용)
+        await tx.execute_query("UPDATE qa SET comment_count = comment_count + 1 WHERE id = %s", (postID,))
     
-    await database.execute_query(query, params)
+    await response_cache.invalidate(f"qa:{postID}", f"qa:{postID}:comments", "qa:counts")
     
     return {"message": "Succesfully upload Comment"}
-    
\ No newline at end of file
+
+@router.delete("/comment/{commentID}", summary="댓글 삭제")
+async def delete_comment(commentID: int, userId: str = Header()):
+    """
+    댓글을 삭제하는 엔드포인트입니다. (댓글 작성자만 가능)
+    
+    - **commentID**: 댓글 id (필수) (int) (parameter)
+
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    """
+    async with database.transaction() as tx:
+        # 댓글 행을 잠가서 같은 댓글을 동시에 지워도 댓글 수가 한 번만 줄어들도록 함
+        result = await tx.execute_query("SELECT post_id, author FROM comment WHERE id = %s FOR UPDATE", (commentID,))
+        if len(result) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="존재하지 않는 댓글입니다."
+            )
+        if result[0]['author'] != userId:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="댓글 삭제권한이 없습니다."
+            )
+        
+        postID = result[0]['post_id']
+        await tx.execute_query("DELETE FROM comment WHERE id = %s", (commentID,))
+        await tx.execute_query("UPDATE qa SET comment_count = comment_count - 1 WHERE id = %s AND comment_count > 0", (postID,))
+    
+    await response_cache.invalidate(f"qa:{postID}", f"qa:{postID}:comments", "qa:counts")
+    
+    return {"message": "Comment deleted successfully"}
@@ -0,0 +1,47 @@
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+from typing import Iterable, List, Tuple
+import os
+
+load_dotenv()
+
+# 배치 조회 한 번에 받을 수 있는 최대 id 수
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "100"))
+
+# "1,2,3" -> [1, 2, 3] (중복은 처음 위치만 남김)
+def parse_ids(ids: str, limit: int = BATCH_MAX_IDS) -> List[int]:
+    items = [item.strip() for item in ids.split(",")]
+    if not all(item.isdigit() for item in items):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids 는 '1,2,3' 형식이어야 합니다."
+        )
+    return _unique([int(item) for item in items], limit)
+
+# "ox:1,qa:2" -> [("ox", 1), ("qa", 2)]
+def parse_posts(posts: str, post_types: Iterable[str], limit: int = BATCH_MAX_IDS) -> List[Tuple[str, int]]:
+    post_types = set(post_types)
+    keys = []
+    for item in posts.split(","):
+        post_type, _, post_id = item.strip().partition(":")
+        if post_type not in post_types or not post_id.isdigit():
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="posts 는 'ox:1,qa:2' 형식이어야 합니다."
+            )
+        keys.append((post_type, int(post_id)))
+    return _unique(keys, limit)
+
+def _unique(items: list, limit: int) -> list:
+    items = list(dict.fromkeys(items))
+    if len(items) > limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"한 번에 최대 {limit}개까지 조회할 수 있습니다."
+        )
+    return items
+
+# IN (...) 조회 결과를 요청한 id 순서대로 정렬 (없는 id 는 빠짐)
+def in_order(rows: List[dict], ids: List[int], key: str = "id") -> List[dict]:
+    by_id = {row[key]: row for row in rows}
+    return [by_id[post_id] for post_id in ids if post_id in by_id]
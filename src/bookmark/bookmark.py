@@ -1,5 +1,8 @@
 from fastapi import APIRouter, HTTPException, status, Header
 from database import database
+from interaction.state import user_state
+from proFile.identity import user_identity
+from existence import existence
 from typing import Optional, List
 from pydantic import BaseModel, Field
 from datetime import datetime
@@ -30,21 +33,36 @@ async def insert_item(item: bookmark, userId: str = Header()):
         )
     
     try:
-        query = "SELECT * FROM bookmark WHERE user_id = %s AND post_id = %s AND post_type = %s"
-        params = (userId, item.postID, item.postType)
-        # 쿼리 실행
-        result = await database.execute_query(query, params)
+        async with database.transaction() as tx:
+            # 유저 행을 잠가서 같은 유저의 북마크 토글을 직렬화
+            query = """
+            SELECT b.post_id
+            FROM user u
+            LEFT JOIN bookmark b ON u.id = b.user_id AND b.post_id = %s AND b.post_type = %s
+            WHERE u.id = %s
+            FOR UPDATE
+            """
+            params = (item.postID, item.postType, userId)
+            result = await tx.execute_query(query, params)
+            
+            if len(result) == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="존재하지 않는 유저입니다"
+                )
 
-        if len(result) == 0:
-            query = "INSERT INTO bookmark (user_id, post_id, post_type) VALUES (%s, %s, %s)"
-            params = (userId, item.postID, item.postType)
-            await database.execute_query(query, params)
-            return {"message": "Bookmarked successfully"}
-        else:
-            query = "DELETE FROM `bookmark` WHERE user_id = %s AND post_id = %s AND post_type = %s"
-            params = (userId, item.postID, item.postType)
-            await database.execute_query(query, params)
-            return {"message": "Bookmarked contents removed successfully"}
+            if result[0]['post_id'] is None:
+                query = "INSERT INTO bookmark (user_id, post_id, post_type) VALUES (%s, %s, %s)"
+                params = (userId, item.postID, item.postType)
+                await tx.execute_query(query, params)
+                return {"message": "Bookmarked successfully"}
+            else:
+                query = "DELETE FROM `bookmark` WHERE user_id = %s AND post_id = %s AND post_type = %s"
+                params = (userId, item.postID, item.postType)
+                await tx.execute_query(query, params)
+                return {"message": "Bookmarked contents removed successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -72,6 +90,7 @@ class qa(BaseModel):
     postType: str
     liked: bool
     likeCount: int
+    commentCount: int
 
 class bookmarkListResponse(BaseModel):
     oxList: List[OXItem]
@@ -92,19 +111,15 @@ async def search_item(targetUserId: str, userId: str = Header()):
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="유저 이름은 1글자 이상 25글자 이하여야 합니다."
         )
-        
-    query = "SELECT * FROM user WHERE id = %s"
-    params = (targetUserId)   
-    count = await database.execute_query(query, params)
     
-    if len(count) == 0:  
+    # 확실히 없는 유저는 DB 조회 없이 바로 거절
+    if not existence.user_may_exist(targetUserId):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="존재하지 않는 유저입니다"
         )
-    
-    try:
-        query = """
+        
+    ox_query = """
         SELECT 
             o.id, 
             o.content,
@@ -112,49 +127,52 @@ async def search_item(targetUserId: str, userId: str = Header()):
             o.created_at,
             o.o_count,
             o.x_count,
-            CASE WHEN c.id IS NOT NULL THEN TRUE ELSE FALSE END AS voted,
-            CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,  
-            COALESCE(like_count_table.like_count, 0) AS like_count 
+            o.like_count
         FROM ox o
         JOIN `bookmark` b ON o.id = b.post_id
-        LEFT JOIN `ox_check` c ON o.id = c.post_id AND c.user_id = %s
-        LEFT JOIN `like` l ON o.id = l.post_id AND l.user_id = %s AND l.post_type = 'ox'
-        LEFT JOIN (
-            SELECT post_id, COUNT(*) AS like_count 
-            FROM `like`
-            WHERE post_type = 'ox'
-            GROUP BY post_id
-        ) AS like_count_table ON o.id = like_count_table.post_id 
         WHERE b.user_id = %s AND b.post_type = 'ox'
         """
-        params = (userId, userId, targetUserId)
-        # 쿼리 실행
-        result = await database.execute_query(query, params)
-        ox = [{"id": row['id'], "content": row['content'], "oCount": row["o_count"], "xCount": row["x_count"], "voted": bool(row["voted"]), "author": row["author"], "created_at": row["created_at"], "postType": "ox", "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result]  
     
-        query = """
+    qa_query = """
         SELECT 
             q.id, 
             q.content, 
             q.author, 
             q.created_at,
-            CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,  
-            COALESCE(like_count_table.like_count, 0) AS like_count  
+            q.like_count,
+            q.comment_count
         FROM qa q
         JOIN `bookmark` b ON q.id = b.post_id
-        LEFT JOIN `like` l ON q.id = l.post_id AND l.user_id = %s AND l.post_type = 'qa'
-        LEFT JOIN (
-            SELECT post_id, COUNT(*) AS like_count 
-            FROM `like`
-            WHERE post_type = 'qa'
-            GROUP BY post_id
-        ) AS like_count_table ON q.id = like_count_table.post_id 
         WHERE b.user_id = %s AND b.post_type = 'qa'
         """
-        params = (userId, targetUserId)
-        # 쿼리 실행
-        result2 = await database.execute_query(query, params)
-        qa = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result2]
+    params = (targetUserId,)
+    
+    # 유저 확인 (유저 정보 캐시) / OX / Q&A 북마크 / 투표·좋아요 여부는 서로 의존하지 않으므로 동시에 조회
+    try:
+        target_user, result, result2, state = await database.gather(
+            user_identity.get(targetUserId),
+            database.execute_query(ox_query, params),
+            database.execute_query(qa_query, params),
+            user_state.get(userId),
+        )
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="예상치 못한 오류가 발생했습니다."
+        )
+    
+    existence.user_probed(target_user is not None)
+    if target_user is None:  
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="존재하지 않는 유저입니다"
+        )
+    
+    try:
+        ox = [{"id": row['id'], "content": row['content'], "oCount": row["o_count"], "xCount": row["x_count"], "voted": state.voted(row['id']), "author": row["author"], "created_at": row["created_at"], "postType": "ox", "liked": state.liked("ox", row['id']), "likeCount": row["like_count"]} for row in result]  
+    
+        qa = [{"id": row['id'], "content": row['content'], "author": row['author'], "postType": "qa", "created_at":row['created_at'], "liked": state.liked("qa", row['id']), "likeCount": row["like_count"], "commentCount": row["comment_count"]} for row in result2]
                 
         if len(result) == 0 and len(result2):
             return {"message": "There's no Bookmarked contents"}
@@ -0,0 +1,339 @@
+from metrics import register
+from dotenv import load_dotenv
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+import base64
+import json
+import logging
+import os
+import time
+
+load_dotenv()
+
+# 프로세스 메모리 캐시 최대 크기 (직렬화된 byte 기준)
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# 항목 하나의 최대 크기 (넘으면 캐시하지 않음)
+CACHE_MAX_ITEM_BYTES = int(os.getenv("CACHE_MAX_ITEM_BYTES", str(1024 * 1024)))
+# 기본 유효 시간 (초)
+CACHE_DEFAULT_TTL = float(os.getenv("CACHE_DEFAULT_TTL", "30"))
+# 변경 순번을 기억하는 최대 태그 수 (넘으면 모두 비우고 그 시점에 한꺼번에 바뀐 것으로 봄)
+CACHE_MAX_TAGS = int(os.getenv("CACHE_MAX_TAGS", "1000000"))
+# 목록처럼 자주 바뀌는 응답의 유효 시간 (초)
+CACHE_LIST_TTL = float(os.getenv("CACHE_LIST_TTL", "5"))
+# 설정하면 Redis 프로토콜 서버를 공유 캐시로 같이 사용 (예: redis://localhost:6379/0)
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL")
+
+_KEY_PREFIX = "cache:"
+_TAG_PREFIX = "cache-tag:"
+# 태그 버전 값으로 쓰는 전역 순번 (만료되지 않음. 태그 키가 만료된 뒤 다시 올려도 예전 값과 겹치지 않음)
+_CLOCK_KEY = "cache-clock"
+# 모든 프로세스가 같이 쓰는 ETag epoch
+_EPOCH_KEY = "cache-epoch"
+# 태그 버전 키 유효 시간 (캐시 항목보다 충분히 길게)
+_TAG_TTL = 86400
+# epoch 는 태그 키보다 빨리 바뀌게 해서, 만료된 태그(버전 0)로 만든 ETag 가 나중에 다시 맞지 않도록 함
+_EPOCH_TTL = _TAG_TTL // 2
+
+# 공유 캐시를 쓰지 않을 때의 epoch (프로세스마다 다른 값. 재시작으로 변경 순번이 0 부터 다시 시작해도 예전 ETag 와 겹치지 않도록)
+_LOCAL_EPOCH = os.urandom(8).hex()
+
+# 캐시 값은 JSON 으로 직렬화 (Redis 에서 읽은 byte 를 pickle.loads 하면 임의 코드가 실행될 수 있으므로)
+# JSON 에 없는 타입은 {"__cache__": 타입, "value": 값} 으로 감쌈
+_TYPE_KEY = "__cache__"
+_DECODERS = {
+    "tuple": tuple,
+    "datetime": datetime.fromisoformat,
+    "date": date.fromisoformat,
+    "timedelta": lambda seconds: timedelta(seconds=seconds),
+    "decimal": Decimal,
+    "bytes": base64.b64decode,
+}
+
+def _encode(value: Any) -> Any:
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, list):
+        return [_encode(item) for item in value]
+    if isinstance(value, dict):
+        if _TYPE_KEY in value or not all(isinstance(key, str) for key in value):
+            raise TypeError("캐시할 수 없는 dict (문자열이 아닌 키)")
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return {_TYPE_KEY: "tuple", "value": [_encode(item) for item in value]}
+    if isinstance(value, datetime):
+        return {_TYPE_KEY: "datetime", "value": value.isoformat()}
+    if isinstance(value, date):
+        return {_TYPE_KEY: "date", "value": value.isoformat()}
+    if isinstance(value, timedelta):
+        return {_TYPE_KEY: "timedelta", "value": value.total_seconds()}
+    if isinstance(value, Decimal):
+        return {_TYPE_KEY: "decimal", "value": str(value)}
+    if isinstance(value, bytes):
+        return {_TYPE_KEY: "bytes", "value": base64.b64encode(value).decode()}
+    raise TypeError(f"캐시할 수 없는 타입: {type(value).__name__}")
+
+def _decode(obj: dict) -> Any:
+    kind = obj.get(_TYPE_KEY)
+    return obj if kind is None else _DECODERS[kind](obj["value"])
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(_encode(value), ensure_ascii=False, separators=(",", ":")).encode()
+
+def _loads(data: bytes) -> Any:
+    return json.loads(data, object_hook=_decode)
+
+class LocalCache:
+    """
+    프로세스 메모리 LRU 캐시입니다. 값은 직렬화된 byte 로 들고 있어서 크기를 정확히 계산하고,
+    꺼낼 때마다 새 객체가 만들어지므로 호출한 쪽에서 수정해도 캐시가 바뀌지 않습니다.
+    """
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # key -> (만료 시각, 직렬화된 값, 태그, 공유 캐시의 태그 버전)
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...], Optional[Dict[str, int]]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    # (직렬화된 값, 저장할 때의 공유 캐시 태그 버전) 반환
+    def get(self, key: str) -> Optional[Tuple[bytes, Optional[Dict[str, int]]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], entry[3]
+
+    def set(self, key: str, data: bytes, tags: Tuple[str, ...], ttl: float, versions: Optional[Dict[str, int]] = None):
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, data, tags, versions)
+        self.bytes += len(data)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        while self.bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def remove(self, key: str):
+        self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.bytes -= len(entry[1])
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def invalidate(self, tag: str) -> int:
+        keys = self._tags.pop(tag, set())
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+class ResponseCache:
+    """
+    라우터에서 쓰는 2단 캐시입니다.
+      1. 프로세스 메모리 LRU (CACHE_MAX_BYTES, 항목별 TTL)
+      2. CACHE_REDIS_URL 이 있으면 Redis (프로세스 / 서버 간 공유)
+    항목마다 태그("ox:123", "user:abc" 등)를 달아두고, 쓰기 후 invalidate(태그) 를 호출하면
+    그 태그가 달린 항목이 모두 무효화됩니다.
+    Redis 에는 태그별 버전 번호를 두고, 항목을 저장할 때의 버전과 지금 버전이 다르면 무효로 봅니다.
+    Redis 오류는 캐시 미스로 처리하고 요청은 DB 로 진행합니다.
+    """
+    def __init__(self):
+        self.local = LocalCache(CACHE_MAX_BYTES)
+        self._redis = None
+        # 태그별 마지막 무효화 순번 (읽는 도중 무효화된 값을 저장하지 않기 위해)
+        self._clock = 0
+        self._invalidated: Dict[str, int] = {}
+        self._reset_at = 0
+        self._stats = {"localHits": 0, "sharedHits": 0, "misses": 0, "invalidations": 0, "sharedErrors": 0, "skippedLarge": 0, "skippedUnsupported": 0}
+
+    async def connect(self):
+        if not CACHE_REDIS_URL:
+            return
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            logging.warning("CACHE_REDIS_URL 이 설정되어 있지만 redis 패키지가 없어서 메모리 캐시만 사용합니다.")
+            return
+        self._redis = redis.from_url(CACHE_REDIS_URL)
+
+    async def disconnect(self):
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], tags: Iterable[str] = (), ttl: Optional[float] = None) -> Any:
+        ttl = CACHE_DEFAULT_TTL if ttl is None else ttl
+        tags = tuple(tags)
+
+        entry = self.local.get(key)
+        if entry is not None:
+            data, versions = entry
+            # 공유 캐시를 쓰면 다른 프로세스에서 무효화됐을 수 있으므로 태그 버전을 확인
+            if versions is None or await self._shared_current(key, versions):
+                self._stats["localHits"] += 1
+                return _loads(data)
+            self.local.remove(key)
+
+        if self._redis is not None:
+            shared = await self._shared_get(key)
+            if shared is not None:
+                versions, data = shared
+                self._stats["sharedHits"] += 1
+                self.local.set(key, data, tags, ttl, versions)
+                return _loads(data)
+
+        self._stats["misses"] += 1
+        started = self._clock
+        # 공유 캐시의 태그 버전은 읽기 전에 가져옴 (읽는 사이에 다른 프로세스가 무효화하면 저장한 값이 바로 무효가 되도록)
+        versions = await self._shared_versions(key, tags) if self._redis is not None else None
+        value = await loader()
+        if any(self._invalidated.get(tag, self._reset_at) > started for tag in tags):
+            return value
+        if self._redis is not None and versions is None:
+            return value
+
+        try:
+            data = _dumps(value)
+        except TypeError as e:
+            self._stats["skippedUnsupported"] += 1
+            logging.warning(f"캐시하지 않음 ({key}): {e}")
+            return value
+        if len(data) > CACHE_MAX_ITEM_BYTES:
+            self._stats["skippedLarge"] += 1
+            return value
+
+        self.local.set(key, data, tags, ttl, versions)
+        if self._redis is not None:
+            await self._shared_set(key, data, versions, ttl)
+        return value
+
+    # 태그 -> 공유 캐시의 현재 버전 (읽지 못하면 None)
+    async def _shared_versions(self, key: str, tags: Iterable[str]) -> Optional[Dict[str, int]]:
+        tags = tuple(tags)
+        if not tags:
+            return {}
+        try:
+            current = await self._redis.mget([_TAG_PREFIX + tag for tag in tags])
+            return {tag: int(version or 0) for tag, version in zip(tags, current)}
+        except Exception as e:
+            self._stats["sharedErrors"] += 1
+            logging.warning(f"공유 캐시 태그 버전 조회 실패 ({key}): {e!r}")
+            return None
+
+    async def _shared_current(self, key: str, versions: Dict[str, int]) -> bool:
+        return await self._shared_versions(key, versions) == versions
+
+    async def _shared_get(self, key: str) -> Optional[Tuple[Dict[str, int], bytes]]:
+        try:
+            raw = await self._redis.get(_KEY_PREFIX + key)
+            if raw is None:
+                return None
+            # "태그 버전 JSON\n값 JSON"
+            head, data = raw.split(b"\n", 1)
+            versions = json.loads(head)
+            if not isinstance(versions, dict) or not all(isinstance(version, int) for version in versions.values()):
+                raise ValueError("잘못된 태그 버전")
+        except Exception as e:
+            self._stats["sharedErrors"] += 1
+            logging.warning(f"공유 캐시 조회 실패 ({key}): {e!r}")
+            return None
+        if not await self._shared_current(key, versions):
+            return None
+        return versions, data
+
+    async def _shared_set(self, key: str, data: bytes, versions: Dict[str, int], ttl: float):
+        try:
+            raw = json.dumps(versions, separators=(",", ":")).encode() + b"\n" + data
+            await self._redis.set(_KEY_PREFIX + key, raw, px=int(ttl * 1000))
+        except Exception as e:
+            self._stats["sharedErrors"] += 1
+            logging.warning(f"공유 캐시 저장 실패 ({key}): {e!r}")
+
+    # 쓰기가 커밋된 뒤 호출
+    async def invalidate(self, *tags: str):
+        self._clock += 1
+        for tag in tags:
+            self._invalidated[tag] = self._clock
+            self._stats["invalidations"] += self.local.invalidate(tag)
+        if len(self._invalidated) > CACHE_MAX_TAGS:
+            self._invalidated.clear()
+            self._reset_at = self._clock
+
+        if self._redis is not None and tags:
+            try:
+                clock = await self._redis.incr(_CLOCK_KEY)
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for tag in tags:
+                        pipe.set(_TAG_PREFIX + tag, clock, ex=_TAG_TTL)
+                    await pipe.execute()
+            except Exception as e:
+                self._stats["sharedErrors"] += 1
+                logging.warning(f"공유 캐시 무효화 실패 ({', '.join(tags)}): {e!r}")
+
+    # ETag 계산용 (epoch, 태그별 변경 순번...)
+    #  - 공유 캐시를 쓰면 Redis 의 태그 버전 (다른 프로세스에서 처리한 쓰기도 반영됨)
+    #  - 아니면 이 프로세스의 변경 순번
+    # Redis 를 읽지 못하면 None (호출한 쪽은 조건부 요청을 처리하지 않음)
+    async def versions(self, *tags: str) -> Optional[tuple]:
+        if self._redis is None:
+            return (_LOCAL_EPOCH, *(self._invalidated.get(tag, self._reset_at) for tag in tags))
+
+        try:
+            epoch, *current = await self._redis.mget([_EPOCH_KEY, *[_TAG_PREFIX + tag for tag in tags]])
+            if epoch is None:
+                await self._redis.set(_EPOCH_KEY, os.urandom(8).hex(), nx=True, ex=_EPOCH_TTL)
+                epoch = await self._redis.get(_EPOCH_KEY)
+                if epoch is None:
+                    return None
+            return (epoch.decode() if isinstance(epoch, bytes) else epoch, *(int(version or 0) for version in current))
+        except Exception as e:
+            self._stats["sharedErrors"] += 1
+            logging.warning(f"공유 캐시 태그 버전 조회 실패: {e!r}")
+            return None
+
+    def stats(self) -> dict:
+        return dict(
+            self._stats,
+            entries=len(self.local),
+            bytes=self.local.bytes,
+            maxBytes=self.local.max_bytes,
+            evictions=self.local.evictions,
+            expirations=self.local.expirations,
+            shared=self._redis is not None,
+        )
+
+response_cache = ResponseCache()
+register("cache", response_cache.stats)
+
+# 라우터 핸들러용 데코레이터. key / tags 는 핸들러와 같은 인자를 받아서 캐시 키 / 태그를 만듦
+# 응답이 모든 유저에게 같은 핸들러에만 사용 (유저별 값은 캐시 밖에서 붙일 것)
+#
+#   @router.get("/{userId}")
+#   @cached(key=lambda userId: f"profile:{userId}", tags=lambda userId: [f"user:{userId}"])
+#   async def get_profile(userId: str): ...
+def cached(key: Callable[..., str], tags: Callable[..., Iterable[str]] = lambda **_: (), ttl: Optional[float] = None):
+    def decorator(handler):
+        @wraps(handler)
+        async def wrapper(**kwargs):
+            return await response_cache.get_or_load(key(**kwargs), lambda: handler(**kwargs), tags(**kwargs), ttl)
+        return wrapper
+    return decorator
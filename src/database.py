@@ -1,8 +1,16 @@
 import os
 from dotenv import load_dotenv
 import aiomysql
-from typing import Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from metrics import query_stats, register
+import asyncio
+import itertools
 import logging
+import re
+import time
 
 # 환경 변수 로드 및 로깅 설정
 load_dotenv()
@@ -18,38 +26,388 @@ DB_NAME = os.getenv('DB_NAME')
 if None in (DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME):
     raise ValueError(".env에 DB 환경변수 셋팅이 제대로 진행되지 않았습니다.")
 
+# stream_query 가 서버에서 한 번에 읽어오는 행 수
+STREAM_CHUNK_SIZE = int(os.getenv("DB_STREAM_CHUNK_SIZE", "500"))
+
+# 읽기 전용 복제본 목록 (쉼표 구분, "host" 또는 "host:port") / 계정과 DB 이름은 primary 와 동일
+# ex) DB_REPLICA_HOSTS=replica-1:3306,replica-2:3306
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+
+# 복제본 헬스 체크 주기 (초)
+DB_REPLICA_CHECK_INTERVAL = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "5"))
+
+# 쓰기를 한 유저의 읽기는 이 시간(초) 동안 primary 로 보냄 (복제 지연 때문에 방금 쓴 내용이 안 보이는 것 방지)
+# 0 이면 사용하지 않음
+DB_READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "0"))
+
+# 요청 하나가 동시에 잡을 수 있는 최대 커넥션 수 (한 요청이 풀을 다 쓰지 않도록)
+DB_GATHER_LIMIT = int(os.getenv("DB_GATHER_LIMIT", "3"))
+
+# 현재 요청의 유저 ID (main.py 미들웨어에서 userId 헤더로 설정)
+current_user: ContextVar[Optional[str]] = ContextVar("current_user", default=None)
+
+# 현재 요청이 동시에 쓰는 커넥션 수를 제한하는 세마포어 (main.py 미들웨어에서 요청마다 DB_GATHER_LIMIT 개로 설정)
+# 쿼리를 실행하는 동안에만 잡으므로 gather 안에서 다시 gather 를 불러도 한도가 곱해지거나 막히지 않음
+request_slots: ContextVar[Optional[asyncio.Semaphore]] = ContextVar("request_slots", default=None)
+
+# 복제본이 죽었다고 판단하는 커넥션 계열 오류
+_CONNECTION_ERRORS = (aiomysql.OperationalError, OSError, asyncio.TimeoutError)
+
+_LEADING_COMMENT = re.compile(r"^\s*(?:/\*.*?\*/\s*)*", re.S)
+_LOCKING_READ = re.compile(r"\bFOR\s+(?:UPDATE|SHARE)\b|\bLOCK\s+IN\s+SHARE\s+MODE\b", re.I)
+
+# 복제본으로 보내도 되는 쿼리인지 (잠금 없는 SELECT 계열만)
+@lru_cache(maxsize=1024)
+def is_read_query(query: str) -> bool:
+    head = _LEADING_COMMENT.sub("", query, count=1)[:8].upper()
+    if not head.startswith(("SELECT", "WITH", "SHOW")):
+        return False
+    return not _LOCKING_READ.search(query)
+
+async def _run_query(cursor, query: str, params: Optional[tuple], pool_wait: Optional[float] = None):
+    started = time.perf_counter()
+    try:
+        await cursor.execute(query, params)
+        result = await cursor.fetchall()
+    except Exception:
+        query_stats.record(query, time.perf_counter() - started, 0, pool_wait, error=True)
+        raise
+
+    query_stats.record(query, time.perf_counter() - started, len(result), pool_wait)
+    return result
+
+async def _create_pool(host: str, port: int) -> aiomysql.Pool:
+    return await aiomysql.create_pool(
+        host=host,
+        port=port,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        db=DB_NAME,
+        autocommit=True,
+        charset='utf8mb4'
+    )
+
+class Transaction:
+    """
+    하나의 커넥션을 점유한 채로 여러 쿼리를 실행하는 단위입니다.
+    `database.transaction()` 블록 안에서만 사용합니다.
+    """
+    def __init__(self, conn: aiomysql.Connection):
+        self._conn = conn
+
+    async def execute_query(self, query: str, params: Optional[tuple] = None):
+        async with self._conn.cursor(aiomysql.DictCursor) as cursor:
+            # 트랜잭션 안의 쿼리는 풀 대기 시간이 없으므로 쿼리 시간만 기록
+            return await _run_query(cursor, query, params)
+
+    # INSERT 후 자동 증가 id 반환 (SELECT LAST_INSERT_ID() 왕복 없이)
+    async def execute_insert(self, query: str, params: Optional[tuple] = None) -> int:
+        async with self._conn.cursor() as cursor:
+            await _run_query(cursor, query, params)
+            return cursor.lastrowid
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 호출은 먼저 들어온 한 번만 실제로 실행하고, 나머지는 그 결과를 같이 받습니다.
+    결과 객체는 모든 호출자가 공유하므로 호출한 쪽에서 수정하면 안 됩니다.
+    """
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]):
+        future = self._inflight.get(key)
+        if future is None:
+            self.leaders += 1
+            # 먼저 호출한 요청이 취소되어도 기다리는 다른 요청에는 영향이 없도록 별도 태스크로 실행
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.followers += 1
+
+        return await asyncio.shield(future)
+
+    def _finish(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        # 기다리던 요청이 모두 취소된 경우에도 "exception was never retrieved" 경고가 남지 않도록
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        return {"leaders": self.leaders, "followers": self.followers, "inflight": len(self._inflight)}
+
+class Replica:
+    def __init__(self, name: str, pool: aiomysql.Pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = True
+
 class Database:
+    """
+    primary 풀 하나와 (설정된 경우) 복제본 풀 N개를 관리합니다.
+    잠금 없는 읽기는 정상 상태인 복제본에 라운드 로빈으로 보내고, 쓰기 / 잠금 읽기 / 트랜잭션은 primary 로 보냅니다.
+    """
     def __init__(self):
         self._pool: Optional[aiomysql.Pool] = None
+        self._replicas: List[Replica] = []
+        self._round_robin = itertools.count()
+        self._health_task: Optional[asyncio.Task] = None
+        # 유저 ID -> primary 로 읽어야 하는 마감 시각 (monotonic)
+        self._recent_writers: Dict[str, float] = {}
+        self._single_flight = SingleFlight()
 
     async def connect(self):
         logging.info("Connecting to MySQL database...")
-        self._pool = await aiomysql.create_pool(
-            host=DB_HOST,
-            port=int(DB_PORT),
-            user=DB_USER,
-            password=DB_PASSWORD,
-            db=DB_NAME,
-            autocommit=True,
-            charset='utf8mb4'
-        )
+        self._pool = await _create_pool(DB_HOST, int(DB_PORT))
+
+        for host in DB_REPLICA_HOSTS:
+            name, _, port = host.partition(":")
+            replica = Replica(host, await _create_pool(name, int(port or DB_PORT)))
+            self._replicas.append(replica)
+
+        if self._replicas:
+            self._health_task = asyncio.create_task(self._check_replicas())
+            logging.info(f"DB 복제본 {len(self._replicas)}개 연결 완료")
+
         logging.info("DB 연결 완료")
 
     async def disconnect(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+
+        for replica in self._replicas:
+            replica.pool.close()
+            await replica.pool.wait_closed()
+        self._replicas = []
+
         if self._pool:
             self._pool.close()
             await self._pool.wait_closed()
             logging.info("DB 연결 해제 완료")
 
+    async def _check_replicas(self):
+        while True:
+            await asyncio.sleep(DB_REPLICA_CHECK_INTERVAL)
+            for replica in self._replicas:
+                try:
+                    async with replica.pool.acquire() as conn:
+                        await asyncio.wait_for(conn.ping(reconnect=False), timeout=DB_REPLICA_CHECK_INTERVAL)
+                    healthy = True
+                except Exception:
+                    healthy = False
+
+                if healthy != replica.healthy:
+                    logging.warning(f"DB 복제본 {replica.name} 상태 변경: {'정상' if healthy else '비정상'}")
+                replica.healthy = healthy
+
+    def _mark_write(self):
+        user = current_user.get()
+        if not user or DB_READ_YOUR_WRITES_SECONDS <= 0:
+            return
+
+        now = time.monotonic()
+        self._recent_writers[user] = now + DB_READ_YOUR_WRITES_SECONDS
+
+        # 만료된 항목 정리 (요청이 몰릴 때도 dict 크기가 일정 수준을 넘지 않도록)
+        if len(self._recent_writers) > 10000:
+            self._recent_writers = {u: until for u, until in self._recent_writers.items() if until > now}
+
+    def _reads_from_primary(self) -> bool:
+        user = current_user.get()
+        if not user:
+            return False
+        until = self._recent_writers.get(user)
+        return until is not None and until > time.monotonic()
+
+    def _pick_replica(self) -> Optional[Replica]:
+        healthy = [replica for replica in self._replicas if replica.healthy]
+        if not healthy or self._reads_from_primary():
+            return None
+        return healthy[next(self._round_robin) % len(healthy)]
+
+    async def _execute(self, pool: aiomysql.Pool, query: str, params: Optional[tuple]):
+        slots = request_slots.get()
+        if slots is None:
+            return await self._execute_on(pool, query, params)
+        async with slots:
+            return await self._execute_on(pool, query, params)
+
+    async def _execute_on(self, pool: aiomysql.Pool, query: str, params: Optional[tuple]):
+        wait_started = time.perf_counter()
+        async with pool.acquire() as conn:
+            pool_wait = time.perf_counter() - wait_started
+            query_stats.record_pool_wait(pool_wait)
+
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                return await _run_query(cursor, query, params, pool_wait)
+
     async def execute_query(self, query: str, params: Optional[tuple] = None) -> int:
         if not self._pool:
             raise RuntimeError("Connection pool is not initialized.")
 
+        if not is_read_query(query):
+            result = await self._execute(self._pool, query, params)
+            self._mark_write()
+            return result
+
+        replica = self._pick_replica()
+        if replica is not None:
+            try:
+                return await self._execute(replica.pool, query, params)
+            except _CONNECTION_ERRORS as e:
+                # 복제본 장애 시 다음 헬스 체크까지 제외하고 primary 로 재시도
+                logging.warning(f"DB 복제본 {replica.name} 쿼리 실패, primary 로 재시도: {e}")
+                replica.healthy = False
+
+        return await self._execute(self._pool, query, params)
+
+    # 복제 지연 없이 읽어야 하는 쿼리 (읽은 결과를 오래 들고 있는 캐시 등) 를 항상 primary 에서 실행
+    async def execute_primary(self, query: str, params: Optional[tuple] = None):
+        if not self._pool:
+            raise RuntimeError("Connection pool is not initialized.")
+        return await self._execute(self._pool, query, params)
+
+    # INSERT 를 실행하고 AUTO_INCREMENT 로 생성된 id 를 반환
+    async def execute_insert(self, query: str, params: Optional[tuple] = None) -> int:
+        if not self._pool:
+            raise RuntimeError("Connection pool is not initialized.")
+
+        wait_started = time.perf_counter()
         async with self._pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cursor:
+            pool_wait = time.perf_counter() - wait_started
+            query_stats.record_pool_wait(pool_wait)
+
+            async with conn.cursor() as cursor:
+                await _run_query(cursor, query, params, pool_wait)
+                self._mark_write()
+                return cursor.lastrowid
+
+    # 동시에 들어온 같은 쿼리 + 같은 파라미터의 읽기는 DB 에 한 번만 보내고 결과를 나눠 가짐
+    # 유저별로 달라지는 값(liked, voted 등)이 섞인 쿼리는 공유가 안 되므로 분리해서 사용해야 함
+    # 반환된 행은 다른 요청과 공유되므로 수정하지 말고 새 dict 로 만들어서 사용
+    async def execute_shared(self, query: str, params: Optional[tuple] = None):
+        if not is_read_query(query):
+            raise ValueError("execute_shared는 읽기 쿼리에만 사용할 수 있습니다.")
+
+        # 방금 쓰기를 한 유저는 다른 요청이 복제본에서 읽은 결과를 받으면 안 되므로 따로 실행
+        if self._reads_from_primary():
+            return await self.execute_query(query, params)
+
+        key = (query, tuple(params) if isinstance(params, (list, tuple)) else params)
+        return await self._single_flight.do(key, lambda: self.execute_query(query, params))
+
+    # 서로 의존하지 않는 쿼리들을 각각 다른 커넥션에서 동시에 실행하고 결과를 순서대로 반환
+    # 동시에 쓰는 커넥션 수는 요청 단위로 DB_GATHER_LIMIT 개로 제한되고 (request_slots), 하나가 실패하면 나머지는 취소하고 예외를 그대로 올림
+    # 요청 밖 (백그라운드 작업 등) 에서 부르면 이 gather 안에서만 쓰는 한도를 새로 둠
+    # 트랜잭션(tx.execute_query)은 커넥션 하나를 쓰므로 넣으면 안 됨
+    # ox, qa = await database.gather(
+    #     database.execute_query(ox_query, params),
+    #     database.execute_query(qa_query, params),
+    # )
+    async def gather(self, *calls: Awaitable[Any]) -> List[Any]:
+        token = request_slots.set(asyncio.Semaphore(DB_GATHER_LIMIT)) if request_slots.get() is None else None
+        try:
+            # 태스크는 만들 때의 컨텍스트를 복사하므로 한도를 설정한 뒤에 만듦
+            tasks = [asyncio.ensure_future(call) for call in calls]
+        finally:
+            if token is not None:
+                request_slots.reset(token)
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    # 서버 사이드 커서(SSDictCursor)로 결과를 한 행씩 흘려보냄
+    # fetchall 처럼 전체 결과를 메모리에 올리지 않으므로 결과 크기와 상관없이 메모리가 일정함
+    # primary=True 면 복제본으로 보내지 않음 (시작 시 메모리 인덱스를 만들 때처럼 복제 지연이 오래 남는 경우)
+    # 중간에 빠져나가도 커서 / 커넥션이 바로 반환되도록 aclosing 으로 감싸서 사용
+    # async with aclosing(database.stream_query(query, params)) as rows:
+    #     async for row in rows:
+    #         ...
+    async def stream_query(self, query: str, params: Optional[tuple] = None, chunk_size: int = STREAM_CHUNK_SIZE, primary: bool = False) -> AsyncIterator[dict]:
+        if not self._pool:
+            raise RuntimeError("Connection pool is not initialized.")
+
+        replica = self._pick_replica() if is_read_query(query) and not primary else None
+        pool = replica.pool if replica is not None else self._pool
+
+        wait_started = time.perf_counter()
+        async with pool.acquire() as conn:
+            pool_wait = time.perf_counter() - wait_started
+            query_stats.record_pool_wait(pool_wait)
+
+            cursor = await conn.cursor(aiomysql.SSDictCursor)
+            started = time.perf_counter()
+            rows = 0
+            exhausted = False
+            error = False
+            try:
                 await cursor.execute(query, params)
-                result = await cursor.fetchall() 
-                return result
+                while True:
+                    chunk = await cursor.fetchmany(chunk_size)
+                    if not chunk:
+                        exhausted = True
+                        break
+                    rows += len(chunk)
+                    for row in chunk:
+                        yield row
+            except Exception as e:
+                error = True
+                if replica is not None and isinstance(e, _CONNECTION_ERRORS):
+                    replica.healthy = False
+                raise
+            finally:
+                # 끝까지 읽었으면 커서만 닫고, 중간에 멈췄으면 남은 행을 다 읽어들이는 대신 커넥션을 끊어서 풀에서 버림
+                if exhausted:
+                    await cursor.close()
+                else:
+                    conn.close()
+                # 스트리밍은 소비하는 쪽 시간까지 포함됨
+                query_stats.record(query, time.perf_counter() - started, rows, pool_wait, error=error)
+
+    # 하나의 커넥션에서 BEGIN ~ COMMIT 으로 묶어 실행 (예외 발생 시 ROLLBACK)
+    # 트랜잭션은 항상 primary 에서 실행됨
+    # async with database.transaction() as tx:
+    #     await tx.execute_query("SELECT ... FOR UPDATE", params)
+    @asynccontextmanager
+    async def transaction(self):
+        if not self._pool:
+            raise RuntimeError("Connection pool is not initialized.")
+
+        wait_started = time.perf_counter()
+        async with self._pool.acquire() as conn:
+            query_stats.record_pool_wait(time.perf_counter() - wait_started)
+
+            await conn.begin()
+            try:
+                yield Transaction(conn)
+            except BaseException:
+                await conn.rollback()
+                raise
+            else:
+                await conn.commit()
+                self._mark_write()
+
+    def pool_stats(self) -> dict:
+        def describe(pool: Optional[aiomysql.Pool]) -> dict:
+            if pool is None:
+                return {}
+            return {"size": pool.size, "free": pool.freesize, "max": pool.maxsize}
+
+        return {
+            "primary": describe(self._pool),
+            "replicas": [{"name": r.name, "healthy": r.healthy, **describe(r.pool)} for r in self._replicas],
+            "readYourWritesUsers": len(self._recent_writers),
+            "singleFlight": self._single_flight.stats(),
+        }
 
 # Database 인스턴스 생성
-database = Database()
\ No newline at end of file
+database = Database()
+register("pools", database.pool_stats)
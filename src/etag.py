@@ -0,0 +1,41 @@
+from fastapi import Request, Response, status
+from cache import response_cache
+from typing import Optional
+import hashlib
+
+def _etag_of(versions: Optional[tuple], *parts) -> Optional[str]:
+    if versions is None:
+        return None
+    raw = "|".join(str(part) for part in (*versions, *parts))
+    return 'W/"' + hashlib.blake2b(raw.encode(), digest_size=12).hexdigest() + '"'
+
+# 태그 버전을 읽지 못하면 None
+async def make_etag(tags: tuple, *parts) -> Optional[str]:
+    return _etag_of(await response_cache.versions(*tags), *parts)
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # 약한 비교 (W/ 접두어 무시)
+    target = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == target for candidate in if_none_match.split(","))
+
+def _respond(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Vary": "userId", "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+# 응답에 ETag 를 붙이고, 클라이언트가 같은 ETag 를 갖고 있으면 304 응답을 반환
+# tags: 응답 내용이 의존하는 캐시 태그 (쓰기 핸들러가 response_cache.invalidate 로 올리는 변경 순번)
+# parts: 그 밖에 응답을 구분하는 값 (쿼리 파라미터, 유저 ID 등)
+# 쿼리를 실행하기 전에 호출해야 함 (그 사이에 바뀐 경우 다음 요청에서 ETag 가 달라져서 다시 받게 됨)
+# 공유 캐시의 태그 버전을 읽지 못하면 ETag 없이 그대로 진행 (다른 프로세스의 쓰기를 놓쳐서 304 를 잘못 보내지 않도록)
+async def check_etag(request: Request, response: Response, tags: tuple, *parts) -> Optional[Response]:
+    return _respond(request, response, await make_etag(tags, *parts))
@@ -0,0 +1,198 @@
+from database import database
+from metrics import register
+from dotenv import load_dotenv
+from contextlib import aclosing
+from typing import Dict, List, Tuple
+import hashlib
+import logging
+import math
+import os
+
+load_dotenv()
+
+# 유저 Bloom filter 의 목표 오탐률 / 최소 용량 (시작 시 유저 수의 2배와 비교해서 큰 쪽으로 만듦)
+EXISTENCE_BLOOM_FP_RATE = float(os.getenv("EXISTENCE_BLOOM_FP_RATE", "0.01"))
+EXISTENCE_BLOOM_MIN_CAPACITY = int(os.getenv("EXISTENCE_BLOOM_MIN_CAPACITY", "100000"))
+
+# 존재 여부를 들고 있는 게시글 타입 -> 테이블
+EXISTENCE_POST_TABLES = {"ox": "ox", "qa": "qa"}
+
+class BloomFilter:
+    """
+    문자열 키 Bloom filter 입니다. "없음" 은 확실하고 "있음" 은 오탐일 수 있습니다. (삭제는 지원하지 않음)
+    키 하나당 약 -ln(p) / ln(2)^2 bit 만 사용합니다. (p = 1% 일 때 약 9.6 bit)
+    """
+    def __init__(self, capacity: int, fp_rate: float):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    # blake2b 128bit 를 둘로 나눠서 k 개 위치를 만듦 (double hashing)
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    # 지금 채워진 bit 비율로 계산한 예상 오탐률
+    def estimated_fp_rate(self) -> float:
+        filled = int.from_bytes(self._bits, "little").bit_count() / self.size
+        return filled ** self.hashes
+
+    def bytes(self) -> int:
+        return len(self._bits)
+
+class IdBitmap:
+    """
+    AUTO_INCREMENT 게시글 id 집합입니다. id 하나당 1 bit 이고 오탐 없이 추가 / 삭제가 가능합니다.
+    """
+    def __init__(self):
+        self._bits = bytearray()
+        self.count = 0
+
+    def add(self, post_id: int):
+        index = post_id >> 3
+        if index >= len(self._bits):
+            self._bits.extend(bytes(max(index + 1 - len(self._bits), len(self._bits) // 2)))
+        mask = 1 << (post_id & 7)
+        if not self._bits[index] & mask:
+            self._bits[index] |= mask
+            self.count += 1
+
+    def remove(self, post_id: int):
+        index = post_id >> 3
+        mask = 1 << (post_id & 7)
+        if index < len(self._bits) and self._bits[index] & mask:
+            self._bits[index] &= ~mask
+            self.count -= 1
+
+    def __contains__(self, post_id: int) -> bool:
+        index = post_id >> 3
+        return 0 <= index < len(self._bits) and bool(self._bits[index] & (1 << (post_id & 7)))
+
+    def bytes(self) -> int:
+        return len(self._bits)
+
+class ExistenceIndex:
+    """
+    쓰기 전에 하는 존재 확인 (SELECT ... FROM user / ox WHERE id = %s) 중
+    확실히 없는 경우를 DB 왕복 없이 걸러내는 메모리 인덱스입니다.
+      - 유저: Bloom filter (문자열 ID, 오탐률은 EXISTENCE_BLOOM_FP_RATE 목표)
+      - 게시글: 타입별 id 비트맵 (정확함)
+    시작 시 DB 에서 만들고, 회원가입 / 게시글 작성 / 삭제 핸들러가 커밋 후 바로 반영합니다.
+    로드 전에는 모두 "있을 수 있음" 으로 답해서 기존처럼 DB 에서 확인합니다.
+    """
+    def __init__(self):
+        self.ready = False
+        self._loading = False
+        # 로드 중에 들어온 변경 (로드가 끝나면 새로 만든 인덱스에 다시 반영)
+        self._during_load: List[Tuple[str, str, object]] = []
+        self._users = BloomFilter(EXISTENCE_BLOOM_MIN_CAPACITY, EXISTENCE_BLOOM_FP_RATE)
+        self._posts: Dict[str, IdBitmap] = {post_type: IdBitmap() for post_type in EXISTENCE_POST_TABLES}
+        self._stats = {"userChecks": 0, "userMisses": 0, "userFalsePositives": 0, "postChecks": 0, "postMisses": 0}
+
+    async def load(self):
+        self._loading = True
+        self._during_load = []
+        try:
+            result = await database.execute_primary("SELECT COUNT(*) AS count FROM user")
+            users = BloomFilter(max(EXISTENCE_BLOOM_MIN_CAPACITY, result[0]['count'] * 2), EXISTENCE_BLOOM_FP_RATE)
+            async with aclosing(database.stream_query("SELECT id FROM user", primary=True)) as rows:
+                async for row in rows:
+                    users.add(row['id'])
+
+            posts = {}
+            for post_type, table in EXISTENCE_POST_TABLES.items():
+                posts[post_type] = IdBitmap()
+                async with aclosing(database.stream_query(f"SELECT id FROM {table}", primary=True)) as rows:
+                    async for row in rows:
+                        posts[post_type].add(row['id'])
+
+            self._users, self._posts = users, posts
+            for change in self._during_load:
+                self._apply(*change)
+        finally:
+            self._loading = False
+            self._during_load = []
+
+        self.ready = True
+        logging.info(f"존재 확인 인덱스 로드 완료 (유저 {self._users.count}명, 게시글 {sum(posts.count for posts in self._posts.values())}개)")
+
+    def _apply(self, kind: str, post_type: str, key):
+        if kind == "user":
+            self._users.add(key)
+        elif kind == "post":
+            self._posts[post_type].add(key)
+        else:
+            self._posts[post_type].remove(key)
+
+    def _change(self, kind: str, post_type: str, key):
+        self._apply(kind, post_type, key)
+        if self._loading:
+            self._during_load.append((kind, post_type, key))
+
+    # 회원가입 커밋 후
+    def user_added(self, user_id: str):
+        self._change("user", "", user_id)
+
+    # 게시글 작성 커밋 후
+    def post_added(self, post_type: str, post_id: int):
+        self._change("post", post_type, int(post_id))
+
+    # 게시글 삭제 커밋 후
+    def post_removed(self, post_type: str, post_id: int):
+        self._change("removed", post_type, int(post_id))
+
+    # False 면 확실히 없는 유저 (DB 확인 불필요)
+    # True 면 DB 로 확인한 뒤 user_probed() 로 결과를 알려줘야 오탐률이 집계됨
+    def user_may_exist(self, user_id: str) -> bool:
+        if not self.ready:
+            return True
+        self._stats["userChecks"] += 1
+        if user_id in self._users:
+            return True
+        self._stats["userMisses"] += 1
+        return False
+
+    def user_probed(self, exists: bool):
+        if self.ready and not exists:
+            self._stats["userFalsePositives"] += 1
+
+    # False 면 확실히 없는 게시글
+    def post_may_exist(self, post_type: str, post_id: int) -> bool:
+        if not self.ready or post_type not in self._posts:
+            return True
+        self._stats["postChecks"] += 1
+        if int(post_id) in self._posts[post_type]:
+            return True
+        self._stats["postMisses"] += 1
+        return False
+
+    def stats(self) -> dict:
+        # 실제 오탐률: 없는 유저를 물어본 것 중 Bloom filter 가 "있을 수 있음" 이라고 답한 비율
+        negatives = self._stats["userMisses"] + self._stats["userFalsePositives"]
+        return dict(
+            self._stats,
+            ready=self.ready,
+            users=self._users.count,
+            userCapacity=self._users.capacity,
+            userBloomBytes=self._users.bytes(),
+            userHashes=self._users.hashes,
+            userFalsePositiveRate=self._stats["userFalsePositives"] / negatives if negatives else None,
+            userEstimatedFalsePositiveRate=self._users.estimated_fp_rate() if self.ready else None,
+            posts={post_type: posts.count for post_type, posts in self._posts.items()},
+            postBitmapBytes=sum(posts.bytes() for posts in self._posts.values()),
+        )
+
+existence = ExistenceIndex()
+register("existence", existence.stats)
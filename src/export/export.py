@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Header, HTTPException, status
+from export.job import export_jobs
+
+router = APIRouter(
+    tags=["export"],
+    responses={404: {"description" : "Not Found"}},
+)
+
+@router.post("", summary="내 활동 내역 내보내기 시작", status_code=status.HTTP_202_ACCEPTED)
+async def start_export(userId: str = Header()):
+    """
+    내가 쓴 OX / Q&A 글, 댓글, 좋아요, 북마크, 투표 내역을 CSV 로 만들어 S3 에 올리는 작업을 시작하는 EndPoint입니다.
+    이미 진행 중인 작업이 있으면 그 작업을 반환합니다.
+    
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    """
+    
+    if len(userId) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="유저 ID는 필수입니다."
+        )
+    
+    job = export_jobs.start(userId)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="내보내기 요청이 많습니다. 잠시 후 다시 시도해주세요."
+        )
+    
+    return job.to_dict()
+
+@router.get("/{jobId}", summary="내 활동 내역 내보내기 상태")
+async def get_export(jobId: str, userId: str = Header()):
+    """
+    내보내기 작업의 상태를 조회하는 EndPoint입니다.
+    
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    - **jobId**: 작업 ID (필수) (str) (Parameter)
+    
+    status: queued / running / completed / failed. completed 인 경우 fileUrl 로 내려받을 수 있습니다.
+    """
+    
+    job = export_jobs.get(jobId)
+    if job is None or job.user_id != userId:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="존재하지 않는 작업입니다."
+        )
+    
+    return job.to_dict()
@@ -0,0 +1,238 @@
+from database import database
+from metrics import register
+from dotenv import load_dotenv
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+import asyncio
+import csv
+import io
+import logging
+import os
+import time
+import uuid
+import uploadS3
+
+load_dotenv()
+
+# 동시에 실행하는 내보내기 작업 수 (작업마다 S3 조각 버퍼를 사용)
+EXPORT_MAX_CONCURRENCY = int(os.getenv("EXPORT_MAX_CONCURRENCY", "2"))
+# 한 번에 읽는 행 수 (구분마다 keyset 으로 이어서 읽음)
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+# 실행 대기 중인 작업까지 포함한 최대 작업 수 (넘으면 429)
+EXPORT_MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "20"))
+# 끝난 작업 상태를 보관하는 시간 (초)
+EXPORT_JOB_TTL = int(os.getenv("EXPORT_JOB_TTL", "3600"))
+
+COLUMNS = ["section", "post_type", "post_id", "comment_id", "content", "vote", "created_at"]
+
+# (구분, 쿼리, keyset 정렬 컬럼, 행 -> CSV 한 줄)
+SECTIONS = [
+    (
+        "ox",
+        "SELECT id, content, created_at FROM ox WHERE author = %s",
+        ("id",),
+        lambda row: ["ox", "ox", row['id'], "", row['content'], "", row['created_at']],
+    ),
+    (
+        "qa",
+        "SELECT id, content, created_at FROM qa WHERE author = %s",
+        ("id",),
+        lambda row: ["qa", "qa", row['id'], "", row['content'], "", row['created_at']],
+    ),
+    (
+        "comment",
+        "SELECT id, post_id, content, created_at FROM comment WHERE author = %s",
+        ("id",),
+        lambda row: ["comment", "qa", row['post_id'], row['id'], row['content'], "", row['created_at']],
+    ),
+    (
+        "like",
+        "SELECT post_type, post_id FROM `like` WHERE user_id = %s",
+        ("post_type", "post_id"),
+        lambda row: ["like", row['post_type'], row['post_id'], "", "", "", ""],
+    ),
+    (
+        "bookmark",
+        "SELECT post_type, post_id FROM bookmark WHERE user_id = %s",
+        ("post_type", "post_id"),
+        lambda row: ["bookmark", row['post_type'], row['post_id'], "", "", "", ""],
+    ),
+    (
+        "vote",
+        "SELECT post_id, vote FROM ox_check WHERE user_id = %s",
+        ("post_id",),
+        lambda row: ["vote", "ox", row['post_id'], "", "", "O" if row['vote'] else "X", ""],
+    ),
+]
+
+# keyset 정렬 컬럼 (1개 또는 2개) 에서 last 다음 행부터 읽는 조건과 파라미터
+def _after(columns: Sequence[str], last: Sequence) -> tuple:
+    if len(columns) == 1:
+        return f"{columns[0]} > %s", [last[0]]
+    first, second = columns
+    return f"({first} > %s OR ({first} = %s AND {second} > %s))", [last[0], last[0], last[1]]
+
+class CsvExportStream:
+    """
+    유저의 활동 내역을 구분(section)별로 DB 에서 EXPORT_PAGE_SIZE 행씩 keyset 으로 읽어서 CSV byte 로 내보내는 파일 객체입니다.
+    uploadS3.put_object 가 조각 크기만큼 read() 할 때마다 그만큼만 만들어서 메모리 사용량이 일정합니다.
+    페이지마다 짧은 쿼리로 읽으므로 S3 로 조각을 올리는 동안 DB 커넥션 / 서버 사이드 커서를 잡고 있지 않습니다.
+    (열어둔 커서를 오래 읽지 않으면 net_write_timeout 으로 끊김)
+    """
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.rows = 0
+        self.bytes = 0
+        self._buffer = bytearray()
+        self._text = io.StringIO()
+        self._writer = csv.writer(self._text)
+        self._lines = self._iter_lines()
+        self._done = False
+
+        # 엑셀에서 한글이 깨지지 않도록 BOM + 헤더
+        self._buffer += "\ufeff".encode("utf-8")
+        self._write(COLUMNS)
+
+    def _write(self, values: List):
+        self._writer.writerow(values)
+        self._buffer += self._text.getvalue().encode("utf-8")
+        self._text.seek(0)
+        self._text.truncate()
+
+    async def _iter_lines(self) -> AsyncIterator[List]:
+        for _, query, columns, format_row in SECTIONS:
+            last = None
+            while True:
+                page_query, params = query, [self.user_id]
+                if last is not None:
+                    condition, after_params = _after(columns, last)
+                    page_query += " AND " + condition
+                    params.extend(after_params)
+                page_query += f" ORDER BY {', '.join(columns)} LIMIT %s"
+                params.append(EXPORT_PAGE_SIZE)
+
+                rows = await database.execute_query(page_query, tuple(params))
+                for row in rows:
+                    yield format_row(row)
+                if len(rows) < EXPORT_PAGE_SIZE:
+                    break
+                last = [rows[-1][column] for column in columns]
+
+    async def read(self, size: int) -> bytes:
+        while len(self._buffer) < size and not self._done:
+            try:
+                values = await self._lines.__anext__()
+            except StopAsyncIteration:
+                self._done = True
+                break
+            self._write(values)
+            self.rows += 1
+
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self.bytes += len(data)
+        return data
+
+    async def aclose(self):
+        await self._lines.aclose()
+
+class ExportJob:
+    def __init__(self, user_id: str):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.status = "queued"
+        self.key: Optional[str] = None
+        self.stream: Optional[CsvExportStream] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> dict:
+        result = {
+            "jobId": self.id,
+            "status": self.status,
+            "rows": self.stream.rows if self.stream else 0,
+            "bytes": self.stream.bytes if self.stream else 0,
+        }
+        if self.status == "completed":
+            result["fileUrl"] = uploadS3.presign_get(self.key)
+        if self.error:
+            result["error"] = self.error
+        return result
+
+class ExportJobs:
+    """
+    유저 활동 내역 내보내기 작업 목록입니다. (프로세스 메모리에만 보관)
+    작업은 EXPORT_MAX_CONCURRENCY 개까지 동시에 실행되고 나머지는 queued 상태로 기다립니다.
+    """
+    def __init__(self):
+        self._jobs: Dict[str, ExportJob] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _purge(self):
+        now = time.time()
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished_at and now - job.finished_at > EXPORT_JOB_TTL]:
+            del self._jobs[job_id]
+
+    def _pending(self) -> List[ExportJob]:
+        return [job for job in self._jobs.values() if job.status in ("queued", "running")]
+
+    # 이미 진행 중인 작업이 있으면 그 작업을 반환, 대기열이 가득 차면 None
+    def start(self, user_id: str) -> Optional[ExportJob]:
+        self._purge()
+        pending = self._pending()
+        for job in pending:
+            if job.user_id == user_id:
+                return job
+        if len(pending) >= EXPORT_MAX_PENDING:
+            return None
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(EXPORT_MAX_CONCURRENCY)
+
+        job = ExportJob(user_id)
+        self._jobs[job.id] = job
+        job.task = asyncio.create_task(self._run(job))
+        return job
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        self._purge()
+        return self._jobs.get(job_id)
+
+    async def _run(self, job: ExportJob):
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.key = f"exports/{job.user_id}/{job.id}/" + uploadS3.dated_file_name(f"activity-{job.user_id}.csv")
+                job.stream = CsvExportStream(job.user_id)
+                try:
+                    await uploadS3.put_object(job.stream, job.key, content_type="text/csv; charset=utf-8")
+                finally:
+                    await job.stream.aclose()
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.error = "cancelled"
+            raise
+        except Exception:
+            logging.exception(f"내보내기 작업 실패 ({job.id})")
+            job.status = "failed"
+            job.error = "내보내기에 실패했습니다."
+        finally:
+            job.finished_at = time.time()
+
+    # 서버 종료 시 실행 중인 작업 취소 (S3 멀티파트 업로드는 abort 됨)
+    async def shutdown(self):
+        tasks = [job.task for job in self._pending() if job.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        statuses = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {"jobs": statuses, "maxConcurrency": EXPORT_MAX_CONCURRENCY, "maxPending": EXPORT_MAX_PENDING}
+
+export_jobs = ExportJobs()
+register("export", export_jobs.stats)
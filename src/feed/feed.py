@@ -0,0 +1,168 @@
+from fastapi import APIRouter, HTTPException, status, Header, Query
+from database import database
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, decode_token, encode_cursor, encode_token, keyset_condition, keyset_params
+from timeline.timeline import home_timeline
+from interaction.state import user_state
+from ox.counter import vote_counter
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+from itertools import islice
+import heapq
+
+router = APIRouter(
+    tags=["피드"],
+    responses={404: {"description" : "Not Found"}},
+)
+
+FEED_SCOPES = ("global", "following", "author")
+
+# 게시글 타입별 목록 쿼리 (모든 유저에게 같은 게시글 데이터만, voted / liked 는 user_state 에서)
+# {source}: 글을 고르는 FROM 절, 별칭은 p
+FEED_QUERIES = {
+    "ox": """
+    SELECT 
+        p.id, 
+        p.content, 
+        p.author,
+        p.o_count,
+        p.x_count,
+        p.created_at,
+        p.like_count
+    FROM {source}
+    """,
+    "qa": """
+    SELECT
+        p.id, 
+        p.content, 
+        p.author, 
+        p.created_at,
+        p.like_count,
+        p.comment_count
+    FROM {source}
+    """,
+}
+
+# 어떤 id 보다도 큰 값 (같은 시간의 글을 모두 포함할 때 사용)
+_MAX_ID = 2 ** 63 - 1
+
+class FeedItem(BaseModel):
+    id: int = Field(..., description="게시글 ID")
+    postType: str = Field(..., description="게시물의 유형 ('ox' 또는 'qa')")
+    content: str = Field(..., description="게시글 내용")
+    author: str = Field(..., description="작성자의 사용자 ID")
+    created_at: datetime = Field(..., description="게시글이 생성된 날짜와 시간")
+    liked: bool = Field(..., description="현재 사용자가 이 글을 좋아요 했는지 여부")
+    likeCount: int = Field(..., description="총 좋아요 수")
+    oCount: Optional[int] = Field(None, description="'O' 투표 수 (OX 퀴즈만)")
+    xCount: Optional[int] = Field(None, description="'X' 투표 수 (OX 퀴즈만)")
+    voted: Optional[bool] = Field(None, description="현재 사용자가 투표했는지 여부 (OX 퀴즈만)")
+    commentCount: Optional[int] = Field(None, description="댓글 수 (Q&A 만)")
+
+class FeedResponse(BaseModel):
+    result: List[FeedItem]
+    nextCursor: Optional[str] = Field(None, description="다음 페이지 커서 (마지막 페이지면 null)")
+
+# 합친 피드의 정렬 기준: (created_at, postType, id) 내림차순
+def _sort_key(item: dict):
+    return (item['created_at'], item['postType'], item['id'])
+
+def _decode_feed_cursor(cursor: str):
+    value = decode_token(cursor)
+    try:
+        created_at, post_type, post_id = value
+        if post_type not in FEED_QUERIES:
+            raise ValueError(post_type)
+        return datetime.fromisoformat(created_at), post_type, int(post_id)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="잘못된 cursor 값입니다."
+        )
+
+# 합친 피드 커서를 게시글 타입 하나의 (created_at, id) 커서로 바꿈
+#  - 같은 타입: 그대로
+#  - 정렬상 앞선 타입 ("ox" < "qa"): 같은 시간의 글은 모두 이미 지나갔으므로 created_at 만 비교 (id < 0)
+#  - 정렬상 뒤인 타입: 같은 시간의 글은 아직 안 나왔으므로 모두 포함 (id < 최대값)
+def _type_cursor(feed_cursor, post_type: str) -> str:
+    created_at, cursor_type, post_id = feed_cursor
+    if post_type == cursor_type:
+        return encode_cursor(created_at, post_id)
+    return encode_cursor(created_at, 0 if post_type > cursor_type else _MAX_ID)
+
+def _format(post_type: str, row: dict, state) -> dict:
+    item = {"id": row['id'], "postType": post_type, "content": row['content'], "author": row['author'], "created_at": row['created_at'], "liked": state.liked(post_type, row['id']), "likeCount": row['like_count']}
+    if post_type == "ox":
+        o_count, x_count = vote_counter.counts(row['id'], row['o_count'], row['x_count'])
+        item.update(oCount=o_count, xCount=x_count, voted=state.voted(row['id']))
+    else:
+        item.update(commentCount=row['comment_count'])
+    return item
+
+async def _fetch(post_type: str, scope: str, target_user_id: Optional[str], cursor: Optional[str], limit: int, user_id: str) -> List[dict]:
+    if scope == "following":
+        # 유저별 타임라인에서 글 id 를 먼저 고름
+        source, params = await home_timeline.feed_source(user_id, post_type, cursor, limit)
+        query = FEED_QUERIES[post_type].format(source=f"({source}) AS feed JOIN {post_type} p ON p.id = feed.id")
+    else:
+        query = FEED_QUERIES[post_type].format(source=f"{post_type} p")
+        params = []
+    
+    if scope != "following":
+        conditions = []
+        if scope == "author":
+            conditions.append("p.author = %s")
+            params.append(target_user_id)
+        if cursor:
+            conditions.append(keyset_condition("p"))
+            params.extend(keyset_params(cursor))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+    
+    query += " ORDER BY p.created_at DESC, p.id DESC LIMIT %s"
+    params.append(limit)
+    
+    result, state = await database.gather(database.execute_query(query, tuple(params)), user_state.get(user_id))
+    return [_format(post_type, row, state) for row in result]
+
+@router.get("", summary="OX 퀴즈 + Q&A 통합 피드", response_model=FeedResponse)
+async def get_feed(scope: str = "global", targetUserId: Optional[str] = None, cursor: Optional[str] = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), userId: str = Header()):
+    """
+    OX 퀴즈와 Q&A 글을 하나의 목록으로 합쳐서 최신순으로 받아오는 EndPoint입니다.
+    
+    - **scope**: 피드 범위 (선택) (str) (global: 전체 / following: 팔로잉한 사람들 / author: targetUserId 의 글) (기본 global)
+    - **targetUserId**: 작성자 ID (scope=author 일 때 필수) (str)
+    - **cursor**: 이전 응답의 nextCursor (선택) (str) (없으면 첫 페이지)
+    - **limit**: 한 번에 받아올 개수 (선택) (int) (기본 20, 최대 100)
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    """
+    
+    if scope not in FEED_SCOPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="scope는 'global', 'following', 'author' 중 하나여야 합니다."
+        )
+    
+    if scope == "author" and not targetUserId:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="scope가 'author'인 경우 targetUserId는 필수입니다."
+        )
+    
+    feed_cursor = _decode_feed_cursor(cursor) if cursor else None
+    
+    # 타입별로 (created_at, id) 인덱스 순서대로 limit + 1 개씩 가져와서 병합
+    # 어느 한쪽에서 limit + 1 개를 모두 쓰더라도 다음 페이지 여부를 알 수 있음
+    results = await database.gather(*[
+        _fetch(post_type, scope, targetUserId, _type_cursor(feed_cursor, post_type) if feed_cursor else None, limit + 1, userId)
+        for post_type in FEED_QUERIES
+    ])
+    merged = list(islice(heapq.merge(*results, key=_sort_key, reverse=True), limit + 1))
+    
+    next_cursor = None
+    if len(merged) > limit:
+        merged = merged[:limit]
+        last = merged[-1]
+        next_cursor = encode_token([last['created_at'].isoformat(), last['postType'], last['id']])
+    
+    return {"result": merged, "nextCursor": next_cursor}
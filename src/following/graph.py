@@ -0,0 +1,197 @@
+from database import database
+from metrics import register
+from dotenv import load_dotenv
+from array import array
+from bisect import bisect_left
+from contextlib import aclosing
+from typing import Dict, Iterable, List
+import logging
+import os
+import sys
+
+load_dotenv()
+
+# 메모리에 올릴 최대 팔로우 관계 수. 넘으면 인덱스를 쓰지 않고 DB 조회로 동작
+FOLLOW_GRAPH_MAX_EDGES = int(os.getenv("FOLLOW_GRAPH_MAX_EDGES", "20000000"))
+
+# DB 조회로 동작할 때 IN (...) 한 번에 넣는 ID 수
+_IN_CHUNK = 500
+
+class FollowGraph:
+    """
+    `following` 테이블 전체를 메모리에 올려둔 인접 리스트입니다.
+    (following 컬럼 = 팔로우 하는 사람, follower 컬럼 = 팔로우 당하는 사람)
+
+    유저 ID 문자열은 정수 번호로 바꿔서 유저마다 정렬된 uint32 array 두 개(팔로잉 / 팔로워)에 담습니다.
+      - 목록 / 개수: O(degree) / O(1), 팔로우 여부: O(log degree), 추가 / 삭제: O(degree)
+      - 메모리: 관계 1개당 4 byte x 2 (양방향) = 8 byte (+ array 여유 공간)
+                유저 1명당 ID 문자열 + dict 항목 + array 객체 2개 (약 250 byte)
+      - FOLLOW_GRAPH_MAX_EDGES 를 넘으면 인덱스를 비우고 DB 조회로 동작합니다.
+    프로세스마다 따로 들고 있으므로 워커가 여러 개면 다른 워커의 변경은 재시작 전까지 반영되지 않습니다.
+    """
+    def __init__(self):
+        self._index: Dict[str, int] = {}
+        self._user_ids: List[str] = []
+        self._following: List[array] = []
+        self._followers: List[array] = []
+        self._edges = 0
+        self.ready = False
+
+    def _intern(self, user_id: str) -> int:
+        index = self._index.get(user_id)
+        if index is None:
+            index = self._index[user_id] = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._following.append(array("I"))
+            self._followers.append(array("I"))
+        return index
+
+    def _clear(self):
+        self._index = {}
+        self._user_ids = []
+        self._following = []
+        self._followers = []
+        self._edges = 0
+
+    async def load(self):
+        self._clear()
+        self.ready = False
+
+        async with aclosing(database.stream_query("SELECT following, follower FROM following", primary=True)) as rows:
+            async for row in rows:
+                if self._edges >= FOLLOW_GRAPH_MAX_EDGES:
+                    logging.warning(f"팔로우 관계가 {FOLLOW_GRAPH_MAX_EDGES}개를 넘어서 메모리 인덱스를 사용하지 않습니다.")
+                    self._clear()
+                    return
+
+                source = self._intern(row['following'])
+                target = self._intern(row['follower'])
+                self._following[source].append(target)
+                self._followers[target].append(source)
+                self._edges += 1
+
+        # 이진 탐색을 위해 정렬 (중복 행이 있어도 한 번만 남김)
+        for lists in (self._following, self._followers):
+            for i, neighbors in enumerate(lists):
+                lists[i] = array("I", sorted(set(neighbors)))
+        self._edges = sum(len(neighbors) for neighbors in self._following)
+
+        self.ready = True
+        logging.info(f"팔로우 그래프 로드 완료 (유저 {len(self._user_ids)}명, 관계 {self._edges}개)")
+
+    # follower_id 가 followee_id 를 팔로우 (POST /api/follow 커밋 이후 호출)
+    def add(self, follower_id: str, followee_id: str):
+        if not self.ready:
+            return
+        if self._edges >= FOLLOW_GRAPH_MAX_EDGES:
+            logging.warning(f"팔로우 관계가 {FOLLOW_GRAPH_MAX_EDGES}개를 넘어서 메모리 인덱스를 사용하지 않습니다.")
+            self._clear()
+            self.ready = False
+            return
+
+        source = self._intern(follower_id)
+        target = self._intern(followee_id)
+        if _insert(self._following[source], target):
+            _insert(self._followers[target], source)
+            self._edges += 1
+
+    def remove(self, follower_id: str, followee_id: str):
+        if not self.ready:
+            return
+
+        source = self._index.get(follower_id)
+        target = self._index.get(followee_id)
+        if source is None or target is None:
+            return
+        if _delete(self._following[source], target):
+            _delete(self._followers[target], source)
+            self._edges -= 1
+
+    # user_id 가 팔로우하는 유저 ID 목록
+    async def following_ids(self, user_id: str) -> List[str]:
+        if not self.ready:
+            rows = await database.execute_query("SELECT follower FROM following WHERE following = %s", (user_id,))
+            return [row['follower'] for row in rows]
+
+        index = self._index.get(user_id)
+        if index is None:
+            return []
+        return [self._user_ids[i] for i in self._following[index]]
+
+    # user_id 를 팔로우하는 유저 ID 목록
+    async def follower_ids(self, user_id: str) -> List[str]:
+        if not self.ready:
+            rows = await database.execute_query("SELECT following FROM following WHERE follower = %s", (user_id,))
+            return [row['following'] for row in rows]
+
+        index = self._index.get(user_id)
+        if index is None:
+            return []
+        return [self._user_ids[i] for i in self._followers[index]]
+
+    async def follower_count(self, user_id: str) -> int:
+        return (await self.follower_counts([user_id])).get(user_id, 0)
+
+    # 여러 유저의 팔로워 수를 한 번에 (없는 유저는 0)
+    async def follower_counts(self, user_ids: Iterable[str]) -> Dict[str, int]:
+        user_ids = list(user_ids)
+        if not self.ready:
+            counts = dict.fromkeys(user_ids, 0)
+            for start in range(0, len(user_ids), _IN_CHUNK):
+                chunk = user_ids[start:start + _IN_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                query = f"SELECT follower, COUNT(*) AS follower_count FROM following WHERE follower IN ({placeholders}) GROUP BY follower"
+                for row in await database.execute_query(query, tuple(chunk)):
+                    counts[row['follower']] = row['follower_count']
+            return counts
+
+        counts = {}
+        for user_id in user_ids:
+            index = self._index.get(user_id)
+            counts[user_id] = 0 if index is None else len(self._followers[index])
+        return counts
+
+    async def is_following(self, follower_id: str, followee_id: str) -> bool:
+        if not self.ready:
+            query = "SELECT EXISTS(SELECT 1 FROM following WHERE following = %s AND follower = %s) AS followed"
+            rows = await database.execute_query(query, (follower_id, followee_id))
+            return bool(rows[0]['followed'])
+
+        source = self._index.get(follower_id)
+        target = self._index.get(followee_id)
+        if source is None or target is None:
+            return False
+        neighbors = self._following[source]
+        i = bisect_left(neighbors, target)
+        return i < len(neighbors) and neighbors[i] == target
+
+    def stats(self) -> dict:
+        array_bytes = sum(
+            sys.getsizeof(neighbors)
+            for lists in (self._following, self._followers)
+            for neighbors in lists
+        )
+        return {
+            "ready": self.ready,
+            "users": len(self._user_ids),
+            "edges": self._edges,
+            "maxEdges": FOLLOW_GRAPH_MAX_EDGES,
+            "arrayBytes": array_bytes,
+        }
+
+def _insert(neighbors: array, value: int) -> bool:
+    i = bisect_left(neighbors, value)
+    if i < len(neighbors) and neighbors[i] == value:
+        return False
+    neighbors.insert(i, value)
+    return True
+
+def _delete(neighbors: array, value: int) -> bool:
+    i = bisect_left(neighbors, value)
+    if i < len(neighbors) and neighbors[i] == value:
+        del neighbors[i]
+        return True
+    return False
+
+follow_graph = FollowGraph()
+register("follow_graph", follow_graph.stats)
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, HTTPException, status, Header
+from fastapi import APIRouter, HTTPException, status, Header, Request
 from database import database
-from typing import List, Optional
+from following.graph import follow_graph
+from proFile.identity import user_identity
+from existence import existence
+from timeline.timeline import home_timeline
+from cache import response_cache
+from streaming import stream_rows
+from typing import AsyncIterator, List, Optional
 from pydantic import BaseModel
 
 router = APIRouter(
@@ -18,26 +24,31 @@ class UserFollowingResponse(BaseModel):
 class UserFollowingListResponse(BaseModel):
     result: List[UserFollowingResponse]
 
+# 팔로우 그래프에서 꺼낸 ID 목록의 이름을 나눠서 조회 (유저 정보 캐시에 없는 ID 만 DB 에서)
+async def _user_rows(user_ids: List[str], chunk_size: int = 500) -> AsyncIterator[dict]:
+    for start in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        users = await user_identity.get_many(chunk)
+        for user_id in chunk:
+            user = users.get(user_id)
+            if user is not None:
+                yield {"id": user.id, "name": user.name}
+
 @router.get("/following/{targetUserId}", summary="특정 유저가 팔로잉한 목록을 받아옵니다.", response_model=UserFollowingListResponse)
-async def get_following_user(targetUserId: str):
+async def get_following_user(targetUserId: str, request: Request):
     """
     특정 유저가 팔로잉한 목록을 받아옵니다.
+    결과는 조회되는 대로 스트리밍됩니다. (Accept: application/x-ndjson 이면 한 줄에 한 명)
     
     - **targetUserId**: 유저 ID (필수) (str) (Parameter)
     """
     
-    query = """
-    SELECT u.id, u.name
-    FROM following f
-    JOIN user u ON f.follower = u.id
-    WHERE f.following = %s  
-    """
-    params = (targetUserId,) 
-    
     try:
-        result = await database.execute_query(query, params)
+        # 관계는 메모리 그래프에서, 이름만 DB 에서 가져옴
+        user_ids = await follow_graph.following_ids(targetUserId)
+        rows = _user_rows(user_ids)
         
-        return { "result" : [{"userId": row['id'], "name": row['name']} for row in result] }
+        return await stream_rows(request, rows, lambda row: {"userId": row['id'], "name": row['name']})
 
     except Exception as e:
         print(e)
@@ -47,25 +58,20 @@ async def get_following_user(targetUserId: str):
         )
         
 @router.get("/follower/{targetUserId}", summary="특정 유저를 팔로잉한 팔로워들 목록을 받아옵니다.", response_model=UserFollowingListResponse)
-async def get_following_user(targetUserId: str):
+async def get_following_user(targetUserId: str, request: Request):
     """
     특정 유저를 팔로잉한 팔로워들 목록을 받아옵니다.
+    결과는 조회되는 대로 스트리밍됩니다. (Accept: application/x-ndjson 이면 한 줄에 한 명)
     
     - **targetUserId**: 유저 ID (필수) (str) (Parameter)
     """
     
-    query = """
-    SELECT u.id, u.name
-    FROM following f
-    JOIN user u ON f.following = u.id   
-    WHERE f.follower = %s  
-    """
-    params = (targetUserId,) 
-    
     try:
-        result = await database.execute_query(query, params)
+        # 관계는 메모리 그래프에서, 이름만 DB 에서 가져옴
+        user_ids = await follow_graph.follower_ids(targetUserId)
+        rows = _user_rows(user_ids)
         
-        return { "result" : [{"userId": row['id'], "name": row['name']} for row in result] }
+        return await stream_rows(request, rows, lambda row: {"userId": row['id'], "name": row['name']})
 
     except Exception as e:
         print(e)
@@ -89,36 +95,54 @@ async def follow_user(follow_user: str, userId: str = Header()):
             detail="자기 자신은 팔로우를 할 수 없습니다"
         )
     
-    query = "SELECT * FROM user WHERE id = %s"
-    params = (follow_user)   
-    count = await database.execute_query(query, params)
-    
-    if len(count) == 0:  
+    # 확실히 없는 유저는 트랜잭션을 열지 않고 바로 거절
+    if not existence.user_may_exist(follow_user):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="존재하지 않는 유저입니다"
         )
     
-    query = "SELECT * FROM following WHERE following = %s AND follower = %s"
-    params = (userId, follow_user)   
-    count = await database.execute_query(query, params)
-
-    if len(count) == 0:  
-        query = "INSERT INTO following (following, follower) VALUES (%s, %s)"
+    async with database.transaction() as tx:
+        # 대상 유저 행을 잠가서 존재 확인과 팔로우 여부 확인을 한 번에 처리
+        query = """
+        SELECT f.follower
+        FROM user u
+        LEFT JOIN following f ON u.id = f.follower AND f.following = %s
+        WHERE u.id = %s
+        FOR UPDATE
+        """
         params = (userId, follow_user)
+        result = await tx.execute_query(query, params)
+        existence.user_probed(len(result) > 0)
         
-        await database.execute_query(query, params)
+        if len(result) == 0:  
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="존재하지 않는 유저입니다"
+            )
+
+        followed = result[0]['follower'] is None
+
+        if followed:  
+            query = "INSERT INTO following (following, follower) VALUES (%s, %s)"
+            params = (userId, follow_user)
+        else:
+            query = "DELETE FROM following WHERE follower = %s AND following = %s"
+            params = (follow_user, userId)
         
+        await tx.execute_query(query, params)
+    
+    # 커밋된 뒤에 메모리 그래프 반영 (상대 프로필의 팔로워 수도 바뀜)
+    # 캐시 무효화는 그래프를 바꾼 뒤에 (무효화 직후 다시 채워지는 캐시가 이전 팔로워 수를 담지 않도록)
+    if followed:
+        follow_graph.add(userId, follow_user)
+    else:
+        follow_graph.remove(userId, follow_user)
+    await response_cache.invalidate(f"user:{follow_user}")
+
+    if followed:
+        home_timeline.followed(userId, follow_user)
         return {"message": "Successfully Followed"}
     else:
-        query = "DELETE FROM following WHERE follower = %s AND following = %s"
-        params = (follow_user, userId)
-    
-        await database.execute_query(query, params)
-        
+        home_timeline.unfollowed(userId, follow_user)
         return {"message": "Successfully UnFollowed"}
-    
-    
-    
-    
-    
\ No newline at end of file
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Header, Query
+from database import database
+from interaction.state import user_state, STATE_POST_TYPES
+from batch import parse_posts
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+router = APIRouter(
+    tags=["interaction"],
+    responses={404: {"description" : "Not Found"}},
+)
+
+class InteractionState(BaseModel):
+    postType: str = Field(..., description="게시물의 유형 ('ox' 또는 'qa')")
+    id: int = Field(..., description="게시글 ID")
+    liked: bool = Field(..., description="현재 사용자가 좋아요 했는지 여부")
+    voted: Optional[bool] = Field(None, description="현재 사용자가 투표했는지 여부 (OX 퀴즈만)")
+    bookmarked: bool = Field(..., description="현재 사용자가 북마크 했는지 여부")
+
+class InteractionStateResponse(BaseModel):
+    result: List[InteractionState]
+
+@router.get("", summary="게시글 여러 개의 좋아요 / 투표 / 북마크 여부", response_model=InteractionStateResponse)
+async def get_states(posts: str = Query(..., description="게시글 목록 (예: ox:1,ox:2,qa:3)"), userId: str = Header()):
+    """
+    이미 게시글 내용을 가지고 있는 화면에서 현재 유저의 상태만 다시 받아올 때 쓰는 엔드포인트입니다.
+    
+    - **posts**: "타입:id" 를 쉼표로 구분한 게시글 목록, 최대 BATCH_MAX_IDS (기본 100)개 (필수) (str) (Query)
+
+    - **userId**: 현재 접속중인 유저 이름 (필수) (str) (Header)
+    """
+    keys = parse_posts(posts, STATE_POST_TYPES)
+    
+    # 좋아요 / 투표 여부는 유저별 캐시에서, 북마크 여부는 한 번의 IN (...) 쿼리로
+    placeholders = ", ".join(["%s"] * len(keys))
+    query = f"SELECT post_type, post_id FROM bookmark WHERE user_id = %s AND post_id IN ({placeholders})"
+    params = (userId, *[post_id for _, post_id in keys])
+    
+    state, rows = await database.gather(user_state.get(userId), database.execute_query(query, params))
+    bookmarked = {(row['post_type'], row['post_id']) for row in rows}
+    
+    result = [
+        {
+            "postType": post_type,
+            "id": post_id,
+            "liked": state.liked(post_type, post_id),
+            "voted": state.voted(post_id) if post_type == "ox" else None,
+            "bookmarked": (post_type, post_id) in bookmarked,
+        }
+        for post_type, post_id in keys
+    ]
+    return {"result": result}
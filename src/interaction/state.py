@@ -0,0 +1,138 @@
+from database import database
+from metrics import register
+from dotenv import load_dotenv
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+import asyncio
+import os
+
+load_dotenv()
+
+# 메모리에 들고 있는 최대 유저 수 (가장 오래 안 쓴 유저부터 제거)
+USER_STATE_CACHE_SIZE = int(os.getenv("USER_STATE_CACHE_SIZE", "10000"))
+
+# 좋아요가 가능한 게시글 타입
+STATE_POST_TYPES = ("ox", "qa")
+
+class UserState:
+    """
+    유저 한 명이 좋아요 한 글 / 투표한 OX 퀴즈 id 목록입니다.
+    게시글 타입별로 정렬된 uint32 array 에 담아서 글 1개당 4 byte 만 사용하고, 조회는 이진 탐색입니다.
+    """
+    __slots__ = ("_liked", "_voted")
+
+    def __init__(self, liked: Dict[str, array], voted: array):
+        self._liked = liked
+        self._voted = voted
+
+    def liked(self, post_type: str, post_id: int) -> bool:
+        return _contains(self._liked[post_type], post_id)
+
+    def voted(self, post_id: int) -> bool:
+        return _contains(self._voted, post_id)
+
+    def size(self) -> int:
+        return len(self._voted) + sum(len(ids) for ids in self._liked.values())
+
+class UserStateCache:
+    """
+    피드 / 상세 조회 시 유저별 liked / voted 를 행마다 `like`, `ox_check` 테이블 JOIN 으로 구하지 않도록
+    최근에 접속한 유저의 좋아요 / 투표 목록을 메모리에 들고 있는 LRU 캐시입니다.
+      - 처음 조회할 때 유저의 `like`, `ox_check` 행을 읽어서 채움
+      - 좋아요 / 투표 / 게시글 삭제 핸들러가 커밋 후에 바로 반영
+    덕분에 목록 쿼리는 모든 유저에게 같은 게시글 데이터만 조회합니다.
+    """
+    def __init__(self):
+        self._users: "OrderedDict[str, UserState]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # 읽는 도중 변경이 생긴 유저 (읽은 결과를 캐시에 넣지 않음)
+        self._changed_while_loading: Set[str] = set()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    async def get(self, user_id: str) -> UserState:
+        state = self._users.get(user_id)
+        if state is not None:
+            self._users.move_to_end(user_id)
+            self._stats["hits"] += 1
+            return state
+
+        self._stats["misses"] += 1
+        # 같은 유저의 요청이 동시에 들어오면 한 번만 읽음
+        future = self._loading.get(user_id)
+        if future is None:
+            future = self._loading[user_id] = asyncio.ensure_future(self._load(user_id))
+            future.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        return await asyncio.shield(future)
+
+    async def _load(self, user_id: str) -> UserState:
+        # 읽은 결과는 메모리에서 밀려날 때까지 쓰므로, 복제본에 아직 안 넘어간 좋아요 / 투표가 빠지지 않도록 primary 에서 읽음
+        like_rows, vote_rows = await database.gather(
+            database.execute_primary("SELECT post_type, post_id FROM `like` WHERE user_id = %s", (user_id,)),
+            database.execute_primary("SELECT post_id FROM ox_check WHERE user_id = %s", (user_id,)),
+        )
+
+        liked = {post_type: [] for post_type in STATE_POST_TYPES}
+        for row in like_rows:
+            if row['post_type'] in liked:
+                liked[row['post_type']].append(row['post_id'])
+        state = UserState(
+            {post_type: array("I", sorted(set(ids))) for post_type, ids in liked.items()},
+            array("I", sorted({row['post_id'] for row in vote_rows})),
+        )
+
+        if user_id in self._changed_while_loading:
+            # 읽는 사이에 좋아요 / 투표가 바뀌었으면 이번 결과는 쓰기만 하고 다음 조회 때 다시 읽음
+            self._changed_while_loading.discard(user_id)
+            return state
+
+        self._users[user_id] = state
+        while len(self._users) > USER_STATE_CACHE_SIZE:
+            self._users.popitem(last=False)
+            self._stats["evictions"] += 1
+        return state
+
+    def _cached(self, user_id: str) -> Optional[UserState]:
+        if user_id in self._loading:
+            self._changed_while_loading.add(user_id)
+        return self._users.get(user_id)
+
+    # 좋아요 / 좋아요 취소 커밋 후 호출
+    def set_liked(self, user_id: str, post_type: str, post_id: int, liked: bool):
+        state = self._cached(user_id)
+        if state is not None:
+            _update(state._liked[post_type], post_id, liked)
+
+    # 투표 / 투표 취소 커밋 후 호출
+    def set_voted(self, user_id: str, post_id: int, voted: bool):
+        state = self._cached(user_id)
+        if state is not None:
+            _update(state._voted, post_id, voted)
+
+    # 게시글 삭제 후 호출 (캐시된 모든 유저에서 제거)
+    def post_deleted(self, post_type: str, post_id: int):
+        for user_id in list(self._loading):
+            self._changed_while_loading.add(user_id)
+        for state in self._users.values():
+            _update(state._liked[post_type], post_id, False)
+            if post_type == "ox":
+                _update(state._voted, post_id, False)
+
+    def stats(self) -> dict:
+        return dict(self._stats, users=len(self._users), ids=sum(state.size() for state in self._users.values()), maxUsers=USER_STATE_CACHE_SIZE)
+
+def _contains(ids: array, post_id: int) -> bool:
+    i = bisect_left(ids, post_id)
+    return i < len(ids) and ids[i] == post_id
+
+def _update(ids: array, post_id: int, present: bool):
+    i = bisect_left(ids, post_id)
+    found = i < len(ids) and ids[i] == post_id
+    if present and not found:
+        ids.insert(i, post_id)
+    elif not present and found:
+        del ids[i]
+
+user_state = UserStateCache()
+register("user_state", user_state.stats)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, status, Header
+from typing import Optional
+from dotenv import load_dotenv
+import hmac
+import metrics
+import os
+
+load_dotenv()
+
+# X-Metrics-Token 헤더가 이 값과 일치해야만 조회 가능 (설정하지 않으면 아무도 조회할 수 없음)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+router = APIRouter(
+    tags=["internal"],
+    include_in_schema=False,
+)
+
+@router.get("/metrics", summary="프로세스 내부 지표")
+async def get_metrics(x_metrics_token: Optional[str] = Header(None)):
+    """
+    쿼리 fingerprint 별 지연 시간 히스토그램, 커넥션 풀 대기 시간 등 내부 지표를 반환하는 EndPoint입니다.
+    """
+    
+    if not METRICS_TOKEN or x_metrics_token is None or not hmac.compare_digest(x_metrics_token.encode(), METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="권한이 없습니다."
+        )
+    
+    return metrics.snapshot()
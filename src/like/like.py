@@ -1,5 +1,9 @@
 from fastapi import APIRouter, Header, HTTPException, status
 from database import database
+from interaction.state import user_state
+from cache import response_cache
+from live.hub import live_counts
+from existence import existence
 from typing import Optional, List
 from pydantic import BaseModel
 
@@ -8,6 +12,9 @@ router = APIRouter(
     responses={404: {"description" : "Not Found"}},
 )
 
+# 좋아요가 가능한 게시글 타입 -> 좋아요 수(like_count)를 들고 있는 테이블
+LIKE_TABLES = {"ox": "ox", "qa": "qa"}
+
 class like(BaseModel):
     postID: int
     post_type: str
@@ -30,23 +37,68 @@ async def insert_item(item: like, userId: str = Header()):
             detail="유저 이름은 1글자 이상 25글자 이하여야 합니다."
         )
     
+    if item.post_type not in LIKE_TABLES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="post_type은 'ox' 또는 'qa'여야 합니다."
+        )
+    table = LIKE_TABLES[item.post_type]
+    
+    # 확실히 없는 게시글은 트랜잭션을 열지 않고 바로 거절
+    if not existence.post_may_exist(item.post_type, item.postID):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="존재하지 않는 게시글입니다."
+        )
+    
     try:
-        query = "SELECT * FROM `like` WHERE user_id = %s AND post_id = %s AND post_type = %s"
-        params = (userId, item.postID, item.post_type)
-        # 쿼리 실행
-        result = await database.execute_query(query, params)
-        if len(result) == 0:
-            query = "INSERT INTO `like` (user_id, post_id, post_type) VALUES (%s, %s, %s)"
-            params = (userId, item.postID, item.post_type)
-            await database.execute_query(query, params)
-            print("좋아요 수 증가")
+        async with database.transaction() as tx:
+            # 게시글 행(과 기존 좋아요 행)을 잠가서 연속 클릭 시 좋아요 수가 어긋나지 않도록 함
+            query = f"""
+            SELECT p.id, l.id AS like_id
+            FROM {table} p
+            LEFT JOIN `like` l ON p.id = l.post_id AND l.user_id = %s AND l.post_type = %s
+            WHERE p.id = %s
+            FOR UPDATE
+            """
+            params = (userId, item.post_type, item.postID)
+            result = await tx.execute_query(query, params)
+            
+            if len(result) == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="존재하지 않는 게시글입니다."
+                )
+            
+            if result[0]['like_id'] is None:
+                query = "INSERT INTO `like` (user_id, post_id, post_type) VALUES (%s, %s, %s)"
+                params = (userId, item.postID, item.post_type)
+                await tx.execute_query(query, params)
+                
+                # 게시글의 좋아요 수를 같이 증가 (조회 시 like 테이블 GROUP BY 대신 사용)
+                query = f"UPDATE {table} SET like_count = like_count + 1 WHERE id = %s"
+                await tx.execute_query(query, (item.postID,))
+                print("좋아요 수 증가")
+                liked = True
+            else:
+                query = "DELETE FROM `like` WHERE user_id = %s AND post_id = %s AND post_type = %s"
+                params = (userId, item.postID, item.post_type)
+                await tx.execute_query(query, params)
+                
+                query = f"UPDATE {table} SET like_count = like_count - 1 WHERE id = %s AND like_count > 0"
+                await tx.execute_query(query, (item.postID,))
+                liked = False
+        
+        # 커밋된 뒤에 유저별 좋아요 캐시 반영
+        user_state.set_liked(userId, item.post_type, item.postID, liked)
+        live_counts.publish(item.post_type, item.postID)
+        await response_cache.invalidate(f"{item.post_type}:{item.postID}", f"{item.post_type}:counts", f"state:{userId}")
+        if liked:
             return {"message": "like increased successfully"}
-        else:
-            query = "DELETE FROM `like` WHERE user_id = %s AND post_id = %s AND post_type = %s"
-            params = (userId, item.postID, item.post_type)
-            await database.execute_query(query, params)
-            return {"message": "like decreased successfully"}
+        return {"message": "like decreased successfully"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(e)
         raise HTTPException(
@@ -0,0 +1,156 @@
+from database import database
+from ox.counter import vote_counter
+from metrics import register
+from dotenv import load_dotenv
+from typing import Dict, Iterable, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+
+load_dotenv()
+
+# 같은 게시글의 변경을 모아서 보내는 주기 (초) / 게시글당 이 주기에 최대 한 번 전송
+LIVE_INTERVAL = float(os.getenv("LIVE_INTERVAL", "1"))
+# 워커 하나가 받는 최대 구독 연결 수
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "50000"))
+# 구독 하나가 볼 수 있는 최대 게시글 수
+LIVE_MAX_POSTS = int(os.getenv("LIVE_MAX_POSTS", "50"))
+
+# 게시글 타입 -> (테이블, 조회할 수 컬럼)
+LIVE_TABLES = {
+    "ox": ("ox", "o_count, x_count, like_count"),
+    "qa": ("qa", "like_count"),
+}
+
+_FETCH_CHUNK = 500
+
+PostKey = Tuple[str, int]
+
+class Subscriber:
+    """
+    구독 연결 하나입니다. 보낼 메시지를 큐에 쌓지 않고 게시글별 최신 값만 들고 있으므로
+    (최대 LIVE_MAX_POSTS 개) 클라이언트가 느려도 메모리가 늘어나지 않습니다.
+    """
+    __slots__ = ("keys", "pending", "event")
+
+    def __init__(self, keys: Tuple[PostKey, ...]):
+        self.keys = keys
+        self.pending: Dict[PostKey, dict] = {}
+        self.event = asyncio.Event()
+
+    def push(self, key: PostKey, counts: dict):
+        self.pending[key] = counts
+        self.event.set()
+
+    # 쌓인 값을 꺼내고 비움
+    def take(self) -> Dict[PostKey, dict]:
+        pending, self.pending = self.pending, {}
+        self.event.clear()
+        return pending
+
+class LiveCounts:
+    """
+    투표 / 좋아요 수 실시간 전송 허브입니다.
+    투표 / 좋아요 핸들러는 publish() 로 게시글이 바뀌었다고 표시만 하고,
+    LIVE_INTERVAL 마다 바뀐 게시글의 수를 타입별로 한 번에 조회해서 구독자에게 최신 값을 넘깁니다.
+    구독자가 없는 게시글은 표시하지 않으므로 구독이 없으면 추가 쿼리도 없습니다.
+    """
+    def __init__(self):
+        self._subscribers: Dict[PostKey, Set[Subscriber]] = {}
+        self._count = 0
+        self._dirty: Set[PostKey] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"published": 0, "sent": 0, "rejected": 0, "failedReads": 0}
+
+    @property
+    def full(self) -> bool:
+        return self._count >= LIVE_MAX_SUBSCRIBERS
+
+    def subscribe(self, keys: Iterable[PostKey]) -> Subscriber:
+        subscriber = Subscriber(tuple(keys))
+        for key in subscriber.keys:
+            self._subscribers.setdefault(key, set()).add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for key in subscriber.keys:
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[key]
+        self._count -= 1
+
+    def reject(self):
+        self._stats["rejected"] += 1
+
+    # 투표 / 좋아요가 커밋된 뒤 호출
+    def publish(self, post_type: str, post_id: int):
+        key = (post_type, int(post_id))
+        if key in self._subscribers:
+            self._dirty.add(key)
+            self._stats["published"] += 1
+
+    # 게시글별 현재 수 (OX 투표 수는 아직 반영되지 않은 증감까지 더함)
+    async def read(self, keys: Iterable[PostKey]) -> Dict[PostKey, dict]:
+        by_type: Dict[str, list] = {}
+        for post_type, post_id in keys:
+            by_type.setdefault(post_type, []).append(post_id)
+
+        counts = {}
+        for post_type, post_ids in by_type.items():
+            table, columns = LIVE_TABLES[post_type]
+            for start in range(0, len(post_ids), _FETCH_CHUNK):
+                chunk = post_ids[start:start + _FETCH_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                rows = await database.execute_query(f"SELECT id, {columns} FROM {table} WHERE id IN ({placeholders})", tuple(chunk))
+                for row in rows:
+                    item = {"postType": post_type, "id": row['id'], "likeCount": row['like_count']}
+                    if post_type == "ox":
+                        o_count, x_count = vote_counter.counts(row['id'], row['o_count'], row['x_count'])
+                        item.update(oCount=o_count, xCount=x_count)
+                    counts[(post_type, row['id'])] = item
+        return counts
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        try:
+            counts = await self.read(dirty)
+        except Exception:
+            # 다음 주기에 다시 조회
+            self._stats["failedReads"] += 1
+            self._dirty |= dirty
+            logging.exception("실시간 수 조회 실패")
+            return
+
+        for key, item in counts.items():
+            for subscriber in self._subscribers.get(key, ()):
+                subscriber.push(key, item)
+                self._stats["sent"] += 1
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(LIVE_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return dict(self._stats, subscribers=self._count, posts=len(self._subscribers), dirty=len(self._dirty))
+
+live_counts = LiveCounts()
+register("live", live_counts.stats)
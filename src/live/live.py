@@ -0,0 +1,64 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from live.hub import live_counts, LIVE_TABLES, LIVE_MAX_POSTS
+from batch import parse_posts
+import asyncio
+import json
+import os
+
+router = APIRouter(
+    tags=["live"],
+    responses={404: {"description" : "Not Found"}},
+)
+
+# 변경이 없을 때 연결 유지용 주석을 보내는 주기 (초)
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", "15"))
+
+def _event(item: dict) -> str:
+    return "event: counts\ndata: " + json.dumps(item, ensure_ascii=False) + "\n\n"
+
+@router.get("", summary="투표 / 좋아요 수 실시간 구독 (Server-Sent Events)")
+async def subscribe(posts: str = Query(..., description="구독할 게시글 목록 (예: ox:1,ox:2,qa:3)")):
+    """
+    게시글의 투표 / 좋아요 수가 바뀔 때마다 text/event-stream 으로 전달하는 엔드포인트입니다.
+    연결 직후 현재 값을 한 번 보내고, 이후에는 바뀐 게시글만 게시글당 LIVE_INTERVAL 에 최대 한 번 보냅니다.
+
+    - **posts**: 구독할 게시글 목록 "타입:id" 를 쉼표로 구분 (필수) (str) (Query)
+
+    각 메시지:
+    event: counts
+    data: {"postType": "ox", "id": 1, "likeCount": 3, "oCount": 10, "xCount": 4}
+    (qa 는 likeCount 만)
+    """
+    keys = parse_posts(posts, LIVE_TABLES, LIVE_MAX_POSTS)
+    if live_counts.full:
+        live_counts.reject()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="실시간 구독 연결이 너무 많습니다. 잠시 후 다시 시도해주세요."
+        )
+
+    # 구독은 응답 본문을 보내기 시작할 때 등록하고 본문이 끝나면 해제
+    # (본문이 시작되기 전에 연결이 끊기면 finally 가 실행되지 않으므로 핸들러에서 등록하지 않음)
+    async def body():
+        # 구독을 먼저 등록해서 현재 값을 읽는 사이의 변경도 놓치지 않음
+        subscriber = live_counts.subscribe(keys)
+        try:
+            initial = await live_counts.read(keys)
+            for item in initial.values():
+                yield _event(item)
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.event.wait(), LIVE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield "".join(_event(item) for item in subscriber.take().values())
+        finally:
+            live_counts.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,8 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import uvicorn
 from contextlib import asynccontextmanager
-from database import database
+from database import database, current_user, request_slots, DB_GATHER_LIMIT
+from following.graph import follow_graph
+from searching.fulltext import post_search_index
+from searching.index import user_search_index
 from example import router as test_router
 from QnA_CRUD import qna
 from ox import router as ox_router
@@ -12,12 +16,37 @@ from like import like
 from Auth import login
 from searching import searching
 from proFile import profile
+from upload import upload
+from export import export
+from feed import feed
+from live import live
+from interaction import interaction
+from export.job import export_jobs
+from timeline.timeline import home_timeline
+from cache import response_cache
+from existence import existence
+from ox.counter import vote_counter
+from live.hub import live_counts
+from internal import router as internal_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("하이")
     await database.connect()
+    await response_cache.connect()
+    await existence.load()
+    await follow_graph.load()
+    await user_search_index.load()
+    await post_search_index.load()
+    vote_counter.start()
+    live_counts.start()
     yield
+    await live_counts.stop()
+    await vote_counter.stop()
+    await export_jobs.shutdown()
+    await home_timeline.drain()
+    post_search_index.save()
+    await response_cache.disconnect()
     await database.disconnect()
 
 app = FastAPI(lifespan=lifespan)
@@ -31,6 +60,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 요청의 userId 헤더를 DB 계층에 전달 (쓰기 직후 읽기를 primary 로 보내는 데 사용)
+# 요청마다 동시에 쓸 수 있는 커넥션 수도 함께 설정 (database.gather 를 여러 번 / 중첩해서 불러도 요청 전체가 DB_GATHER_LIMIT 개)
+@app.middleware("http")
+async def bind_current_user(request: Request, call_next):
+    token = current_user.set(request.headers.get("userId"))
+    slots_token = request_slots.set(asyncio.Semaphore(DB_GATHER_LIMIT))
+    try:
+        return await call_next(request)
+    finally:
+        request_slots.reset(slots_token)
+        current_user.reset(token)
+
 app.include_router(test_router.router, prefix="/api/test")
 app.include_router(login.router, prefix="/api/auth")
 app.include_router(qna.router, prefix="/api/qna")
@@ -40,6 +81,12 @@ app.include_router(like.router, prefix="/api/like")
 app.include_router(bookmark.router, prefix="/api/bookmark")
 app.include_router(searching.router, prefix="/api/search")
 app.include_router(profile.router, prefix="/api/profile")
+app.include_router(upload.router, prefix="/api/upload")
+app.include_router(export.router, prefix="/api/export")
+app.include_router(feed.router, prefix="/api/feed")
+app.include_router(live.router, prefix="/api/live")
+app.include_router(interaction.router, prefix="/api/interaction")
+app.include_router(internal_router.router, prefix="/api/internal")
 
 
 
@@ -0,0 +1,150 @@
+from dotenv import load_dotenv
+from functools import lru_cache
+from typing import Callable, Dict, Optional
+import bisect
+import json
+import logging
+import os
+import re
+import threading
+
+load_dotenv()
+
+# 이 시간(ms) 이상 걸린 쿼리는 slow query 로그를 남김
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+
+# fingerprint 종류가 무한히 늘어나지 않도록 제한 (넘치면 "other" 로 합산)
+MAX_FINGERPRINTS = int(os.getenv("METRICS_MAX_FINGERPRINTS", "500"))
+
+# 히스토그램 버킷 상한 (ms)
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+slow_query_logger = logging.getLogger("slow_query")
+
+# /api/internal/metrics 에서 한 번에 보여줄 항목들 (이름 -> 스냅샷 함수)
+_collectors: Dict[str, Callable[[], dict]] = {}
+
+def register(name: str, collector: Callable[[], dict]):
+    _collectors[name] = collector
+
+def snapshot() -> dict:
+    return {name: collector() for name, collector in _collectors.items()}
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms: float):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    # 버킷 상한 기준의 근사 백분위수
+    def percentile(self, p: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = self.count * p
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return BUCKETS_MS[i] if i < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sumMs": round(self.total, 3),
+            "maxMs": round(self.max, 3),
+            "p50Ms": self.percentile(0.5),
+            "p95Ms": self.percentile(0.95),
+            "p99Ms": self.percentile(0.99),
+            "buckets": {
+                **{f"le_{b}": n for b, n in zip(BUCKETS_MS, self.counts)},
+                "le_inf": self.counts[-1],
+            },
+        }
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+# 값만 다른 쿼리를 같은 것으로 묶기 위한 정규화
+# ex) SELECT * FROM ox WHERE id IN (%s, %s, 3) -> SELECT * FROM ox WHERE id IN (?+)
+@lru_cache(maxsize=1024)
+def fingerprint(query: str) -> str:
+    normalized = _STRING.sub("?", query).replace("%s", "?")
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _VALUE_LIST.sub("(?+)", normalized)
+    return _SPACE.sub(" ", normalized).strip().rstrip(";").strip()
+
+class QueryStats:
+    """
+    fingerprint 별 쿼리 실행 시간 / 반환 행 수 / 커넥션 풀 대기 시간을 프로세스 내에 집계합니다.
+    풀 대기 시간과 쿼리 시간은 따로 집계해서 풀 고갈과 느린 SQL 을 구분할 수 있게 합니다.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queries: Dict[str, dict] = {}
+        self._pool_wait = Histogram()
+
+    def record_pool_wait(self, seconds: float):
+        with self._lock:
+            self._pool_wait.observe(seconds * 1000)
+
+    def record(self, query: str, seconds: float, rows: int, pool_wait: Optional[float] = None, error: bool = False):
+        key = fingerprint(query)
+        ms = seconds * 1000
+
+        with self._lock:
+            stats = self._queries.get(key)
+            if stats is None:
+                if len(self._queries) >= MAX_FINGERPRINTS:
+                    key = "other"
+                    stats = self._queries.get(key)
+                if stats is None:
+                    stats = self._queries[key] = {"query": Histogram(), "poolWait": Histogram(), "rows": 0, "errors": 0}
+
+            stats["query"].observe(ms)
+            stats["rows"] += rows
+            if pool_wait is not None:
+                stats["poolWait"].observe(pool_wait * 1000)
+            if error:
+                stats["errors"] += 1
+
+        if ms >= SLOW_QUERY_MS:
+            slow_query_logger.warning(json.dumps({
+                "event": "slow_query",
+                "fingerprint": key,
+                "queryMs": round(ms, 3),
+                "poolWaitMs": None if pool_wait is None else round(pool_wait * 1000, 3),
+                "rows": rows,
+                "error": error,
+            }, ensure_ascii=False))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            queries = [
+                {
+                    "fingerprint": key,
+                    "rows": stats["rows"],
+                    "errors": stats["errors"],
+                    "query": stats["query"].snapshot(),
+                    "poolWait": stats["poolWait"].snapshot(),
+                }
+                for key, stats in self._queries.items()
+            ]
+            pool_wait = self._pool_wait.snapshot()
+
+        # 총 소요 시간이 큰 쿼리부터
+        queries.sort(key=lambda q: q["query"]["sumMs"], reverse=True)
+        return {"slowQueryMs": SLOW_QUERY_MS, "poolWait": pool_wait, "queries": queries}
+
+query_stats = QueryStats()
+register("db", query_stats.snapshot)
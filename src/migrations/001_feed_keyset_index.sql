@@ -0,0 +1,7 @@
+-- 피드 keyset 페이지네이션용 인덱스
+-- ORDER BY created_at DESC, id DESC LIMIT n 을 filesort 없이 인덱스 역순 탐색으로 처리
+CREATE INDEX idx_ox_created_at_id ON ox (created_at, id);
+CREATE INDEX idx_ox_author_created_at_id ON ox (author, created_at, id);
+
+CREATE INDEX idx_qa_created_at_id ON qa (created_at, id);
+CREATE INDEX idx_qa_author_created_at_id ON qa (author, created_at, id);
@@ -0,0 +1,7 @@
+-- 게시글별 좋아요 수를 비정규화해서 저장
+-- 컬럼 추가 후 `python reconcile.py like_count` 로 기존 데이터를 채운다
+ALTER TABLE ox ADD COLUMN like_count INT NOT NULL DEFAULT 0;
+ALTER TABLE qa ADD COLUMN like_count INT NOT NULL DEFAULT 0;
+
+-- reconcile 시 post 단위 COUNT(*) 용
+CREATE INDEX idx_like_post ON `like` (post_type, post_id);
@@ -0,0 +1,16 @@
+-- 클라이언트가 presigned URL 로 S3 에 직접 올린 파일의 메타데이터
+-- 발급 시 pending 으로 만들고, 업로드 완료 콜백에서 completed 로 바꾼다
+CREATE TABLE upload (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    owner VARCHAR(255) NOT NULL,
+    object_key VARCHAR(512) NOT NULL,
+    file_name VARCHAR(255) NOT NULL,
+    content_type VARCHAR(255) NULL,
+    size BIGINT NOT NULL,
+    multipart_id VARCHAR(255) NULL,
+    status ENUM('pending', 'completed') NOT NULL DEFAULT 'pending',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME NULL,
+    UNIQUE KEY uk_upload_object_key (object_key),
+    KEY idx_upload_owner (owner, created_at)
+);
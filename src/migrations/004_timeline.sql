@@ -0,0 +1,16 @@
+-- 팔로잉 피드용 유저별 타임라인 (글 작성 시 팔로워들에게 미리 넣어둠)
+-- 팔로워가 TIMELINE_FANOUT_LIMIT 명을 넘는 작성자의 글은 넣지 않고 조회 시 합친다
+-- 테이블 생성 후 `python reconcile.py timeline` 으로 기존 데이터를 채운다
+CREATE TABLE timeline (
+    user_id VARCHAR(255) NOT NULL,
+    post_type VARCHAR(2) NOT NULL,
+    post_id INT NOT NULL,
+    author VARCHAR(255) NOT NULL,
+    created_at DATETIME NOT NULL,
+    PRIMARY KEY (user_id, post_type, created_at, post_id),
+    KEY idx_timeline_author (user_id, author),
+    KEY idx_timeline_post (post_type, post_id)
+);
+
+-- 글 작성 시 작성자의 팔로워 목록 조회용
+CREATE INDEX idx_following_follower ON following (follower, following);
@@ -0,0 +1,6 @@
+-- Q&A 글별 댓글 수를 비정규화해서 저장
+-- 컬럼 추가 후 `python reconcile.py comment_count` 로 기존 데이터를 채운다
+ALTER TABLE qa ADD COLUMN comment_count INT NOT NULL DEFAULT 0;
+
+-- 댓글 keyset 페이지네이션 (글별 최신순) 및 reconcile 시 글 단위 COUNT(*) 용
+CREATE INDEX idx_comment_post_created_at_id ON comment (post_id, created_at, id);
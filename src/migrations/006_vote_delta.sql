@@ -0,0 +1,9 @@
+-- 아직 ox.o_count / x_count 에 반영되지 않은 투표 증감 (VOTE_FLUSH_INTERVAL > 0 일 때 투표마다 INSERT)
+-- 서버가 주기마다 합쳐서 반영한 뒤 지우고, reconcile 은 행이 남아 있는 퀴즈를 건너뛴다
+CREATE TABLE ox_vote_delta (
+    id BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+    post_id INT NOT NULL,
+    o_delta TINYINT NOT NULL,
+    x_delta TINYINT NOT NULL,
+    INDEX idx_ox_vote_delta_post (post_id)
+);
@@ -0,0 +1,157 @@
+from database import database
+from cache import response_cache
+from metrics import register
+from dotenv import load_dotenv
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import logging
+import os
+import time
+
+load_dotenv()
+
+# 투표 수를 ox 테이블에 모아서 반영하는 주기 (초). 0 이면 투표마다 바로 UPDATE
+VOTE_FLUSH_INTERVAL = float(os.getenv("VOTE_FLUSH_INTERVAL", "1"))
+
+# 한 번의 트랜잭션에서 반영하는 ox_vote_delta 행 수
+_FLUSH_CHUNK = 5000
+
+# 메모리의 증감을 이 시간 (초) 이 지나면 반영된 것으로 보고 버림
+# (커밋 직후 add 보다 먼저 반영된 증감이 응답에 계속 더해지지 않도록)
+_PENDING_TTL = max(VOTE_FLUSH_INTERVAL * 10, 60)
+
+class VoteCounter:
+    """
+    OX 퀴즈 투표 수(o_count / x_count)를 write-behind 로 반영하는 누적기입니다.
+    투표 핸들러는 ox_check 행과 함께 증감을 ox_vote_delta 에 INSERT 하고 (ox 행은 잠그지 않음),
+    VOTE_FLUSH_INTERVAL 마다 쌓인 증감을 퀴즈별로 합쳐서 UPDATE 한 번으로 반영한 뒤 지웁니다.
+    인기 퀴즈에 투표가 몰려도 ox 행 잠금은 주기마다 한 번만 잡힙니다.
+    증감이 DB 에 남으므로 프로세스가 종료되어도 잃지 않고, `python reconcile.py vote_count` 는
+    아직 반영되지 않은 증감이 있는 퀴즈를 건너뜁니다.
+    메모리의 증감은 응답 / 실시간 수에 아직 반영되지 않은 투표를 더해서 보여줄 때만 씁니다.
+    """
+    def __init__(self):
+        # 퀴즈 id -> [o 증감, x 증감] (아직 ox 에 반영되지 않은 것)
+        self._pending: Dict[int, List[int]] = {}
+        # ox_vote_delta id -> (퀴즈 id, o 증감, x 증감, 더한 시각)
+        self._deltas: "OrderedDict[int, Tuple[int, int, int, float]]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        self._stats = {"votes": 0, "flushes": 0, "flushedPosts": 0, "failedFlushes": 0}
+
+    @property
+    def buffered(self) -> bool:
+        return VOTE_FLUSH_INTERVAL > 0
+
+    def _merge(self, post_id: int, o_delta: int, x_delta: int):
+        delta = self._pending.setdefault(post_id, [0, 0])
+        delta[0] += o_delta
+        delta[1] += x_delta
+        if delta == [0, 0]:
+            del self._pending[post_id]
+
+    # 투표 트랜잭션이 커밋된 뒤 ox_vote_delta 에 넣은 행의 id 와 함께 호출
+    def add(self, delta_id: int, post_id: int, o_delta: int, x_delta: int):
+        self._deltas[delta_id] = (post_id, o_delta, x_delta, time.monotonic())
+        self._merge(post_id, o_delta, x_delta)
+        self._stats["votes"] += 1
+
+    def _forget(self, delta_id: int):
+        entry = self._deltas.pop(delta_id, None)
+        if entry is not None:
+            post_id, o_delta, x_delta, _ = entry
+            self._merge(post_id, -o_delta, -x_delta)
+
+    # 아직 반영되지 않은 증감 (투표 응답 / 실시간 수에 현재 값을 보여줄 때 더함)
+    def pending(self, post_id: int) -> Tuple[int, int]:
+        delta = self._pending.get(post_id)
+        return (delta[0], delta[1]) if delta else (0, 0)
+
+    # DB (또는 캐시) 에서 읽은 투표 수에 아직 반영되지 않은 증감을 더한 값
+    # 목록 / 상세 등 투표 수를 보여주는 모든 조회가 이 값을 써야 투표 직후 수가 되돌아가 보이지 않음
+    def counts(self, post_id: int, o_count: int, x_count: int) -> Tuple[int, int]:
+        pending_o, pending_x = self.pending(post_id)
+        return max(o_count + pending_o, 0), max(x_count + pending_x, 0)
+
+    # ox_vote_delta 에 쌓인 증감을 ox 에 반영하고 지움 (처리한 행 수 반환)
+    async def _flush_chunk(self) -> int:
+        async with database.transaction() as tx:
+            query = "SELECT id, post_id, o_delta, x_delta FROM ox_vote_delta ORDER BY id LIMIT %s FOR UPDATE SKIP LOCKED"
+            result = await tx.execute_query(query, (_FLUSH_CHUNK,))
+            if not result:
+                return 0
+
+            totals: Dict[int, List[int]] = {}
+            for row in result:
+                delta = totals.setdefault(row['post_id'], [0, 0])
+                delta[0] += row['o_delta']
+                delta[1] += row['x_delta']
+
+            items = [(post_id, delta) for post_id, delta in totals.items() if delta != [0, 0]]
+            if items:
+                rows = " UNION ALL ".join(["SELECT %s AS id, %s AS o_delta, %s AS x_delta"] * len(items))
+                query = f"""
+                UPDATE ox o
+                JOIN ({rows}) AS d ON o.id = d.id
+                SET o.o_count = GREATEST(o.o_count + d.o_delta, 0),
+                    o.x_count = GREATEST(o.x_count + d.x_delta, 0)
+                """
+                params = [value for post_id, (o_delta, x_delta) in items for value in (post_id, o_delta, x_delta)]
+                await tx.execute_query(query, tuple(params))
+
+            ids = [row['id'] for row in result]
+            placeholders = ", ".join(["%s"] * len(ids))
+            await tx.execute_query(f"DELETE FROM ox_vote_delta WHERE id IN ({placeholders})", tuple(ids))
+
+        for delta_id in ids:
+            self._forget(delta_id)
+        # 상세 / 목록 캐시와 ETag 는 DB 에 반영된 뒤에 무효화
+        await response_cache.invalidate("ox:counts", *[f"ox:{post_id}" for post_id in totals])
+        self._stats["flushedPosts"] += len(totals)
+        return len(ids)
+
+    async def flush(self):
+        try:
+            # 한 번에 다 못 읽은 만큼 이어서 반영
+            while await self._flush_chunk() == _FLUSH_CHUNK:
+                pass
+        except Exception:
+            # 반영하지 못한 증감은 ox_vote_delta 에 남아서 다음 주기에 다시 시도
+            self._stats["failedFlushes"] += 1
+            logging.exception("투표 수 반영 실패")
+            return
+        self._stats["flushes"] += 1
+
+        expired = time.monotonic() - _PENDING_TTL
+        while self._deltas:
+            delta_id, (_, _, _, added) = next(iter(self._deltas.items()))
+            if added >= expired:
+                break
+            self._forget(delta_id)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), VOTE_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        if self.buffered and self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run())
+
+    # 서버 종료 시 반영 중인 주기를 끊지 않고, 루프를 멈춘 뒤 마지막으로 한 번 더 반영
+    async def stop(self):
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+
+    def stats(self) -> dict:
+        return dict(self._stats, pendingPosts=len(self._pending), flushInterval=VOTE_FLUSH_INTERVAL)
+
+vote_counter = VoteCounter()
+register("vote_counter", vote_counter.stats)
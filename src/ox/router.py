@@ -1,362 +1,455 @@
-from fastapi import APIRouter, HTTPException, status, Header
-from database import database
-from typing import List, Optional
-from pydantic import BaseModel, Field
-from datetime import datetime
-
-router = APIRouter(
-    tags=["OX 게시판"],
-    responses={404: {"description" : "Not Found"}},
-)
-
-# @router.get("/")
-# async def get_list(id: Optional[str] = None):
-#     """
-#     OX 퀴즈 목록을 받아오는 EndPoint입니다.
-    
-#     - **id**: 쉼표로 구분된 작성자 ID 리스트 (선택) (str) (없으면 전체를 받아옵니다)
-#     """
-    
-#     # 기본 쿼리 정의 (id가 없는 경우 모든 레코드를 가져옴)
-#     query = "SELECT * FROM ox"
-#     params = []
-    
-#     # id 리스트가 제공된 경우, 쿼리에 조건 추가
-#     if id:
-#         # 쉼표로 구분된 id 문자열을 리스트로 변환
-#         id_list = id.split(',')
-#         # id 개수에 맞게 플레이스홀더를 생성하고 파라미터를 추가
-#         placeholders = ', '.join(['%s'] * len(id_list))  # '%s'를 id의 개수만큼 생성
-#         query += f" WHERE author IN ({placeholders})"
-#         params.extend(id_list)  # id 리스트의 값들을 파라미터로 추가
-    
-#     # 쿼리 실행
-#     try:
-#         result = await database.execute_query(query, tuple(params))  # 파라미터를 튜플로 변환하여 전달
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail="Database query failed")
-    
-#     # 결과가 있는 경우 모든 필드를 포함한 리스트로 반환
-#     formatted_result = [{"question": row['question'], "answer": row['answer'], "author": row['author']} for row in result]  # 모든 필드를 포함
-    
-#     return formatted_result
-
-class SuccessResponse(BaseModel):
-    message: str
-
-class OXItem(BaseModel):
-    id: int = Field(..., description="OX 퀴즈의 고유 ID")
-    content: str = Field(..., description="OX 퀴즈 질문 내용")
-    author: str = Field(..., description="OX 퀴즈 작성자의 사용자 ID")
-    oCount: int = Field(..., description="퀴즈에 대한 'O' 투표 수")
-    xCount: int = Field(..., description="퀴즈에 대한 'X' 투표 수")
-    voted: bool = Field(..., description="현재 사용자가 이 퀴즈에 투표했는지 여부")
-    postType: str = Field(..., description="게시물의 유형 (예: 'ox')")
-    created_at: datetime = Field(..., description="퀴즈가 생성된 날짜와 시간")
-    liked: bool = Field(..., description="현재 사용자가 이 퀴즈를 좋아요 했는지 여부")
-    likeCount: int = Field(..., description="퀴즈에 대한 총 좋아요 수")
-
-class OXListResponse(BaseModel):
-    result: List[OXItem] = Field(..., description="OX 퀴즈 항목의 목록")
-
-@router.get("", summary="OX 퀴즈 목록 받아오기", response_model=OXListResponse)
-async def get_list(targetUserId: Optional[str] = None, userId: str = Header()):
-    """
-    OX 퀴즈 목록을 받아오는 EndPoint입니다.
-    
-    - **targetUserId**: 작성자 ID (선택) (str) (없으면 전체를 받아옵니다)
-    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
-    """
-    
-    query = """
-    SELECT 
-        o.id, 
-        o.content, 
-        o.author,
-        o.o_count,
-        o.x_count,
-        o.created_at,
-        CASE WHEN c.id IS NOT NULL THEN TRUE ELSE FALSE END AS voted,
-        CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,
-        COALESCE(like_count_table.like_count, 0) AS like_count 
-    FROM ox o
-    LEFT JOIN `ox_check` c ON o.id = c.post_id AND c.user_id = %s
-    LEFT JOIN `like` l ON o.id = l.post_id AND l.user_id = %s AND post_type = 'ox'
-    LEFT JOIN (
-        SELECT post_id, COUNT(*) AS like_count 
-        FROM `like`
-        WHERE post_type = 'ox'
-        GROUP BY post_id
-    ) AS like_count_table ON o.id = like_count_table.post_id 
-    """
-    params = [userId, userId]
-    
-    if targetUserId:
-        query += " WHERE o.author = %s"
-        params.append(targetUserId)
-    
-    result = await database.execute_query(query, tuple(params))
-    
-    formatted_result = [{"id": row['id'], "content": row['content'], "oCount": row["o_count"], "xCount": row["x_count"], "voted": bool(row["voted"]), "author": row["author"], "created_at": row["created_at"], "postType": "ox", "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result]  
-    
-    return {"result": formatted_result}
-    
-@router.get("/following", summary="팔로잉한 사람들의 OX 퀴즈 목록 받아오기", response_model=OXListResponse)
-async def get_list(userId: str = Header()):
-    """
-    OX 퀴즈 목록을 받아오는 EndPoint입니다.
-    
-    - **userId**: 로그인한 유저 ID (필수) (str) (Header)
-    """
-    
-    query = """
-    SELECT 
-        o.id, 
-        o.content, 
-        o.author,
-        o.o_count,
-        o.x_count,
-        o.created_at,
-        CASE WHEN c.id IS NOT NULL THEN TRUE ELSE FALSE END AS voted,
-        CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,  
-        COALESCE(like_count_table.like_count, 0) AS like_count 
-    FROM ox o
-    JOIN following f ON f.follower = o.author  
-    LEFT JOIN `ox_check` c ON o.id = c.post_id AND c.user_id = %s
-    LEFT JOIN `like` l ON o.id = l.post_id AND l.user_id = %s AND post_type = 'ox'
-    LEFT JOIN (
-        SELECT post_id, COUNT(*) AS like_count 
-        FROM `like`
-        WHERE post_type = 'ox'
-        GROUP BY post_id
-    ) AS like_count_table ON o.id = like_count_table.post_id 
-    WHERE f.following = %s;  
-    """
-
-    params = [userId,userId, userId]
-            
-    result = await database.execute_query(query, tuple(params)) 
-    
-    formatted_result = [{"id": row['id'], "content": row['content'], "oCount": row["o_count"], "xCount": row["x_count"], "voted": bool(row["voted"]), "author": row["author"], "created_at": row["created_at"], "postType": "ox", "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result]  
-    
-    return {"result": formatted_result}
-    
-class OX(BaseModel):
-    content: str  
-
-@router.post("", summary="OX 퀴즈 업로드", response_model= SuccessResponse)
-async def getList(ox: OX, userId: str = Header()):
-    """
-    OX 퀴즈를 업로드하는 EndPoint입니다.
-    
-    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
-    - **content**: 질문할 문제 (필수) (str 100자 이하)
-    """
-    
-    if len(ox.content) > 100 or len(ox.content) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="질문 길이는 반드시 1자 이상 100이하여야 됩니다."
-        )
-        
-    if len(userId) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="작성자는 필수입니다."
-        )
-        
-    try:
-        query = "INSERT INTO ox (author, content) VALUES (%s, %s)"
-        params = (userId, ox.content)
-        
-        await database.execute_query(query, params)
-        
-        return {"message": "Successfully Uploaded"}
-    
-    except:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="예상치 못한 오류가 발생했습니다."
-        )
-
-class OXModify(BaseModel):
-    content: str
-
-@router.put("/{postID}", summary="OX 퀴즈 수정", response_model= SuccessResponse)
-async def modify(postID: int, ox: OXModify, userId: str = Header()):
-    """
-    OX 퀴즈를 수정하는 EndPoint입니다.
-    
-    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
-    - **postID**: 글 ID (필수) (int) (Parameter)
-    - **content**: 질문할 문제 (필수) (str 100자 이하)
-    """
-    
-    if len(ox.content) > 100 or len(ox.content) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="질문 길이는 반드시 1자 이상 100이하여야 됩니다."
-        )
-        
-    if len(userId) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="작성자는 필수입니다."
-        )
-        
-    query = "SELECT * FROM ox WHERE author = %s AND id = %s"
-    params = (userId, postID)   
-    count = await database.execute_query(query, params)
-
-    if len(count) == 0:  
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="해당 글에 수정 권한이 없습니다."
-        )
-        
-    try:
-        query = "UPDATE ox SET content = %s WHERE author = %s AND id = %s"
-        params = (ox.content, userId, postID)        
-        affected_rows = await database.execute_query(query, params)
-                
-    except Exception as e:
-        print(e)
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="예상치 못한 오류가 발생했습니다."
-        )
-        
-    if affected_rows == 0:  
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="수정할 글이 없습니다."
-        )
-
-    return {"message": "Successfully Modified"}
-
-@router.delete("/{postID}", summary="OX 퀴즈 수정", response_model= SuccessResponse)
-async def delete(postID: int, userId: str = Header()):
-    """
-    'ox' 테이블의 데이터를 id를 통해 조회해서 삭제하는 엔드포인트입니다.
-    
-    - **postID**: 게시글 id (int)
-    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
-    """
-    
-    query = "SELECT * FROM ox WHERE author = %s AND id = %s"
-    params = (userId, postID)   
-    count = await database.execute_query(query, params)
-    
-    if len(count) == 0:  
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="해당 글에 삭제 권한이 없거나 존재하지 않습니다."
-        )
-    
-    query = "DELETE FROM ox WHERE id = %s AND author = %s"
-    params = (postID, userId)
-    
-    # 쿼리 실행
-    await database.execute_query(query, params)
-    
-    return {"message": "Data deleted successfully"}
-
-class OXVote(BaseModel):
-    vote: bool
-    
-class OXListResponse(BaseModel):
-    message: str
-    oCount: int
-    xCount: int 
-
-@router.post("/vote/{postId}", summary="OX 퀴즈 투표", response_model=OXListResponse)
-async def getList(postId: int, vote: OXVote, userId: str = Header()):
-    """
-    OX 퀴즈에 투표하는 EndPoint입니다.
-    
-    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
-    - **postId**: 투표할 퀴즈의 ID (필수) (int) (Parameter)
-    - **vote**: 사용자가 선택한 투표 (True: 'O', False: 'X')
-    """
-    
-    query = "SELECT * FROM ox WHERE id = %s"
-    params = (postId)
-    result = await database.execute_query(query, params)
-    
-    if len(result) == 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="해당 퀴즈가 존재하지 않습니다."
-        )
-        
-    query = "SELECT * FROM `ox_check` WHERE post_id = %s AND user_id = %s"
-    params = (postId, userId)
-    result = await database.execute_query(query, params)
-    
-    if len(result) == 0:
-        query = "INSERT INTO ox_check (user_id, post_id, vote) VALUES (%s, %s, %s)"
-        params = (userId, postId, vote.vote)
-        result = await database.execute_query(query, params)
-        
-        if vote.vote:  
-            update_query = "UPDATE ox SET o_count = o_count + 1 WHERE id = %s"
-        else:  
-            update_query = "UPDATE ox SET x_count = x_count + 1 WHERE id = %s"
-            
-        await database.execute_query(update_query, (postId,))
-        
-        query = "SELECT o_count, x_count FROM ox WHERE id = %s"
-        params = (postId)
-        result = await database.execute_query(query, params)
-        
-        return {"message": "Voted successfully", "oCount": result[0]['o_count'], "xCount": result[0]['x_count']}
-    else:
-        if result[0]['vote']:  
-            update_query = "UPDATE ox SET o_count = o_count - 1 WHERE id = %s"
-        else:  
-            update_query = "UPDATE ox SET x_count = x_count - 1 WHERE id = %s"
-        
-        await database.execute_query(update_query, (postId,))
-            
-        query = "DELETE FROM ox_check WHERE user_id = %s AND post_id = %s"
-        params = (userId, postId)
-        result = await database.execute_query(query, params)
-        
-        query = "SELECT o_count, x_count FROM ox WHERE id = %s"
-        params = (postId)
-        result = await database.execute_query(query, params)
-        
-        return {"message": "Voted Canceled successfully", "oCount": result[0]['o_count'], "xCount": result[0]['x_count']}
-
-@router.get("/detail/{postID}")
-async def get_ox_detail(postID: str, userId: str = Header()):
-    query = """
-    SELECT 
-        o.id, 
-        o.content, 
-        o.author,
-        o.o_count,
-        o.x_count,
-        o.created_at,
-        CASE WHEN c.id IS NOT NULL THEN TRUE ELSE FALSE END AS voted,
-        CASE WHEN l.id IS NOT NULL THEN TRUE ELSE FALSE END AS liked,
-        COALESCE(like_count_table.like_count, 0) AS like_count 
-    FROM ox o
-    LEFT JOIN `ox_check` c ON o.id = c.post_id AND c.user_id = %s
-    LEFT JOIN `like` l ON o.id = l.post_id AND l.user_id = %s AND post_type = 'ox'
-    LEFT JOIN (
-        SELECT post_id, COUNT(*) AS like_count 
-        FROM `like`
-        WHERE post_type = 'ox'
-        GROUP BY post_id
-    ) AS like_count_table ON o.id = like_count_table.post_id
-    WHERE o.id = %s 
-    """
-    params = [userId, userId, postID]
-
-    result = await database.execute_query(query, params)
-    
-    formatted_result = [{"id": row['id'], "content": row['content'], "oCount": row["o_count"], "xCount": row["x_count"], "voted": bool(row["voted"]), "author": row["author"], "created_at": row["created_at"], "postType": "ox", "liked": bool(row["liked"]), "likeCount": row["like_count"]} for row in result]  
-    
-    return {"result": formatted_result}
-    
\ No newline at end of file
+from fastapi import APIRouter, HTTPException, status, Header, Query, Request, Response
+from database import database
+from pagination import DEFAULT_LIMIT, MAX_LIMIT, keyset_condition, keyset_params, paginate
+from searching.fulltext import post_search_index
+from timeline.timeline import home_timeline
+from interaction.state import user_state
+from cache import CACHE_LIST_TTL, response_cache
+from etag import check_etag
+from batch import in_order, parse_ids
+from existence import existence
+from ox.counter import vote_counter
+from live.hub import live_counts
+from typing import List, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+router = APIRouter(
+    tags=["OX 게시판"],
+    responses={404: {"description" : "Not Found"}},
+)
+
+# @router.get("/")
+# async def get_list(id: Optional[str] = None):
+#     """
+#     OX 퀴즈 목록을 받아오는 EndPoint입니다.
+    
+#     - **id**: 쉼표로 구분된 작성자 ID 리스트 (선택) (str) (없으면 전체를 받아옵니다)
+#     """
+    
+#     # 기본 쿼리 정의 (id가 없는 경우 모든 레코드를 가져옴)
+#     query = "SELECT * FROM ox"
+#     params = []
+    
+#     # id 리스트가 제공된 경우, 쿼리에 조건 추가
+#     if id:
+#         # 쉼표로 구분된 id 문자열을 리스트로 변환
+#         id_list = id.split(',')
+#         # id 개수에 맞게 플레이스홀더를 생성하고 파라미터를 추가
+#         placeholders = ', '.join(['%s'] * len(id_list))  # '%s'를 id의 개수만큼 생성
+#         query += f" WHERE author IN ({placeholders})"
+#         params.extend(id_list)  # id 리스트의 값들을 파라미터로 추가
+    
+#     # 쿼리 실행
+#     try:
+#         result = await database.execute_query(query, tuple(params))  # 파라미터를 튜플로 변환하여 전달
+#     except Exception as e:
+#         raise HTTPException(status_code=500, detail="Database query failed")
+    
+#     # 결과가 있는 경우 모든 필드를 포함한 리스트로 반환
+#     formatted_result = [{"question": row['question'], "answer": row['answer'], "author": row['author']} for row in result]  # 모든 필드를 포함
+    
+#     return formatted_result
+
+class SuccessResponse(BaseModel):
+    message: str
+
+class OXItem(BaseModel):
+    id: int = Field(..., description="OX 퀴즈의 고유 ID")
+    content: str = Field(..., description="OX 퀴즈 질문 내용")
+    author: str = Field(..., description="OX 퀴즈 작성자의 사용자 ID")
+    oCount: int = Field(..., description="퀴즈에 대한 'O' 투표 수")
+    xCount: int = Field(..., description="퀴즈에 대한 'X' 투표 수")
+    voted: bool = Field(..., description="현재 사용자가 이 퀴즈에 투표했는지 여부")
+    postType: str = Field(..., description="게시물의 유형 (예: 'ox')")
+    created_at: datetime = Field(..., description="퀴즈가 생성된 날짜와 시간")
+    liked: bool = Field(..., description="현재 사용자가 이 퀴즈를 좋아요 했는지 여부")
+    likeCount: int = Field(..., description="퀴즈에 대한 총 좋아요 수")
+
+class OXListResponse(BaseModel):
+    result: List[OXItem] = Field(..., description="OX 퀴즈 항목의 목록")
+    nextCursor: Optional[str] = Field(None, description="다음 페이지 커서 (마지막 페이지면 null)")
+
+# 투표 수에는 아직 ox 에 반영되지 않은 투표를 더함 (캐시된 행도 마찬가지)
+def _format(row: dict, state) -> dict:
+    o_count, x_count = vote_counter.counts(row['id'], row["o_count"], row["x_count"])
+    return {"id": row['id'], "content": row['content'], "oCount": o_count, "xCount": x_count, "voted": state.voted(row['id']), "author": row["author"], "created_at": row["created_at"], "postType": "ox", "liked": state.liked("ox", row['id']), "likeCount": row["like_count"]}
+
+@router.get("", summary="OX 퀴즈 목록 받아오기", response_model=OXListResponse)
+async def get_list(request: Request, response: Response, targetUserId: Optional[str] = None, cursor: Optional[str] = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), userId: str = Header()):
+    """
+    OX 퀴즈 목록을 최신순으로 받아오는 EndPoint입니다.
+    응답의 ETag 를 If-None-Match 헤더로 보내면 바뀐 게 없을 때 304 를 반환합니다.
+    
+    - **targetUserId**: 작성자 ID (선택) (str) (없으면 전체를 받아옵니다)
+    - **cursor**: 이전 응답의 nextCursor (선택) (str) (없으면 첫 페이지)
+    - **limit**: 한 번에 받아올 개수 (선택) (int) (기본 20, 최대 100)
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    """
+    
+    # 글 작성 / 삭제, 투표 / 좋아요 수, 이 유저의 투표 / 좋아요가 바뀌지 않았으면 쿼리 없이 304
+    not_modified = await check_etag(request, response, ("ox:list", "ox:counts", f"state:{userId}"), "ox:list", targetUserId, cursor, limit, userId)
+    if not_modified:
+        return not_modified
+    
+    query = """
+    SELECT 
+        o.id, 
+        o.content, 
+        o.author,
+        o.o_count,
+        o.x_count,
+        o.created_at,
+        o.like_count
+    FROM ox o
+    """
+    params = []
+    conditions = []
+    
+    if targetUserId:
+        conditions.append("o.author = %s")
+        params.append(targetUserId)
+    
+    if cursor:
+        conditions.append(keyset_condition("o"))
+        params.extend(keyset_params(cursor))
+    
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    
+    query += " ORDER BY o.created_at DESC, o.id DESC LIMIT %s"
+    params.append(limit + 1)
+    
+    # 게시글 데이터는 모든 유저에게 같으므로 캐시
+    # ETag 와 같은 태그를 달아서 투표 / 좋아요 수가 바뀌면 캐시도 같이 무효화 (ETag 만 바뀌고 예전 본문이 나가지 않도록)
+    # 투표 / 좋아요 여부는 JOIN 대신 유저별 캐시에서 (목록 조회와 동시에)
+    result, state = await database.gather(
+        response_cache.get_or_load(
+            f"ox:list:{targetUserId or ''}:{cursor or ''}:{limit}",
+            lambda: database.execute_query(query, tuple(params)),
+            tags=["ox:list", "ox:counts"],
+            ttl=CACHE_LIST_TTL,
+        ),
+        user_state.get(userId),
+    )
+    result, next_cursor = paginate(result, limit)
+    
+    formatted_result = [_format(row, state) for row in result]  
+    
+    return {"result": formatted_result, "nextCursor": next_cursor}
+    
+@router.get("/following", summary="팔로잉한 사람들의 OX 퀴즈 목록 받아오기", response_model=OXListResponse)
+async def get_list(cursor: Optional[str] = None, limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT), userId: str = Header()):
+    """
+    팔로잉한 사람들의 OX 퀴즈 목록을 최신순으로 받아오는 EndPoint입니다.
+    
+    - **cursor**: 이전 응답의 nextCursor (선택) (str) (없으면 첫 페이지)
+    - **limit**: 한 번에 받아올 개수 (선택) (int) (기본 20, 최대 100)
+    - **userId**: 로그인한 유저 ID (필수) (str) (Header)
+    """
+    
+    # 유저별 타임라인에서 이번 페이지의 글 id 만 먼저 고르고 (기본 키 범위 조회) 본문을 붙임
+    source, params = await home_timeline.feed_source(userId, "ox", cursor, limit + 1)
+    
+    query = f"""
+    SELECT 
+        o.id, 
+        o.content, 
+        o.author,
+        o.o_count,
+        o.x_count,
+        o.created_at,
+        o.like_count
+    FROM ({source}) AS feed
+    JOIN ox o ON o.id = feed.id
+    ORDER BY o.created_at DESC, o.id DESC
+    """
+            
+    result, state = await database.gather(database.execute_query(query, tuple(params)), user_state.get(userId))
+    result, next_cursor = paginate(result, limit)
+    
+    formatted_result = [_format(row, state) for row in result]  
+    
+    return {"result": formatted_result, "nextCursor": next_cursor}
+    
+class OX(BaseModel):
+    content: str  
+
+@router.post("", summary="OX 퀴즈 업로드", response_model= SuccessResponse)
+async def getList(ox: OX, userId: str = Header()):
+    """
+    OX 퀴즈를 업로드하는 EndPoint입니다.
+    
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    - **content**: 질문할 문제 (필수) (str 100자 이하)
+    """
+    
+    if len(ox.content) > 100 or len(ox.content) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="질문 길이는 반드시 1자 이상 100이하여야 됩니다."
+        )
+        
+    if len(userId) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="작성자는 필수입니다."
+        )
+        
+    try:
+        query = "INSERT INTO ox (author, content) VALUES (%s, %s)"
+        params = (userId, ox.content)
+        
+        post_id = await database.execute_insert(query, params)
+        post_search_index.upsert("ox", post_id, ox.content)
+        home_timeline.post_created("ox", post_id, userId)
+        existence.post_added("ox", post_id)
+        await response_cache.invalidate("ox:list")
+        
+        return {"message": "Successfully Uploaded"}
+    
+    except:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="예상치 못한 오류가 발생했습니다."
+        )
+
+class OXModify(BaseModel):
+    content: str
+
+@router.put("/{postID}", summary="OX 퀴즈 수정", response_model= SuccessResponse)
+async def modify(postID: int, ox: OXModify, userId: str = Header()):
+    """
+    OX 퀴즈를 수정하는 EndPoint입니다.
+    
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    - **postID**: 글 ID (필수) (int) (Parameter)
+    - **content**: 질문할 문제 (필수) (str 100자 이하)
+    """
+    
+    if len(ox.content) > 100 or len(ox.content) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="질문 길이는 반드시 1자 이상 100이하여야 됩니다."
+        )
+        
+    if len(userId) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="작성자는 필수입니다."
+        )
+        
+    query = "SELECT * FROM ox WHERE author = %s AND id = %s"
+    params = (userId, postID)   
+    count = await database.execute_query(query, params)
+
+    if len(count) == 0:  
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="해당 글에 수정 권한이 없습니다."
+        )
+        
+    try:
+        query = "UPDATE ox SET content = %s WHERE author = %s AND id = %s"
+        params = (ox.content, userId, postID)        
+        affected_rows = await database.execute_query(query, params)
+                
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="예상치 못한 오류가 발생했습니다."
+        )
+        
+    if affected_rows == 0:  
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="수정할 글이 없습니다."
+        )
+
+    post_search_index.upsert("ox", postID, ox.content)
+    await response_cache.invalidate(f"ox:{postID}", "ox:list")
+    return {"message": "Successfully Modified"}
+
+@router.delete("/{postID}", summary="OX 퀴즈 수정", response_model= SuccessResponse)
+async def delete(postID: int, userId: str = Header()):
+    """
+    'ox' 테이블의 데이터를 id를 통해 조회해서 삭제하는 엔드포인트입니다.
+    
+    - **postID**: 게시글 id (int)
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    """
+    
+    query = "SELECT * FROM ox WHERE author = %s AND id = %s"
+    params = (userId, postID)   
+    count = await database.execute_query(query, params)
+    
+    if len(count) == 0:  
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="해당 글에 삭제 권한이 없거나 존재하지 않습니다."
+        )
+    
+    query = "DELETE FROM ox WHERE id = %s AND author = %s"
+    params = (postID, userId)
+    
+    # 쿼리 실행
+    await database.execute_query(query, params)
+    post_search_index.remove("ox", postID)
+    home_timeline.post_deleted("ox", postID)
+    existence.post_removed("ox", postID)
+    user_state.post_deleted("ox", postID)
+    await response_cache.invalidate(f"ox:{postID}", "ox:list")
+    
+    return {"message": "Data deleted successfully"}
+
+class OXVote(BaseModel):
+    vote: bool
+    
+class OXListResponse(BaseModel):
+    message: str
+    oCount: int
+    xCount: int 
+
+@router.post("/vote/{postId}", summary="OX 퀴즈 투표", response_model=OXListResponse)
+async def getList(postId: int, vote: OXVote, userId: str = Header()):
+    """
+    OX 퀴즈에 투표하는 EndPoint입니다.
+    
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    - **postId**: 투표할 퀴즈의 ID (필수) (int) (Parameter)
+    - **vote**: 사용자가 선택한 투표 (True: 'O', False: 'X')
+    """
+    
+    # 확실히 없는 퀴즈는 트랜잭션을 열지 않고 바로 거절
+    if not existence.post_may_exist("ox", postId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="해당 퀴즈가 존재하지 않습니다."
+        )
+    
+    async with database.transaction() as tx:
+        # 퀴즈 행 대신 투표한 유저 행을 잠가서 같은 유저의 연속 클릭만 직렬화
+        # (인기 퀴즈에 투표가 몰려도 서로 다른 유저끼리는 기다리지 않음)
+        query = """
+        SELECT o.o_count, o.x_count, c.vote
+        FROM user u
+        JOIN ox o ON o.id = %s
+        LEFT JOIN `ox_check` c ON c.post_id = o.id AND c.user_id = u.id
+        WHERE u.id = %s
+        FOR UPDATE OF u, c
+        """
+        params = (postId, userId)
+        result = await tx.execute_query(query, params)
+        
+        if len(result) == 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="해당 퀴즈가 존재하지 않습니다."
+            )
+        
+        o_count, x_count, previous = result[0]['o_count'], result[0]['x_count'], result[0]['vote']
+        
+        if previous is None:
+            query = "INSERT INTO ox_check (user_id, post_id, vote) VALUES (%s, %s, %s)"
+            params = (userId, postId, vote.vote)
+            await tx.execute_query(query, params)
+            o_delta, x_delta = (1, 0) if vote.vote else (0, 1)
+            message = "Voted successfully"
+        else:
+            query = "DELETE FROM ox_check WHERE user_id = %s AND post_id = %s"
+            params = (userId, postId)
+            await tx.execute_query(query, params)
+            o_delta, x_delta = (-1, 0) if previous else (0, -1)
+            message = "Voted Canceled successfully"
+        
+        if vote_counter.buffered:
+            query = "INSERT INTO ox_vote_delta (post_id, o_delta, x_delta) VALUES (%s, %s, %s)"
+            delta_id = await tx.execute_insert(query, (postId, o_delta, x_delta))
+        else:
+            query = "UPDATE ox SET o_count = GREATEST(o_count + %s, 0), x_count = GREATEST(x_count + %s, 0) WHERE id = %s"
+            await tx.execute_query(query, (o_delta, x_delta, postId))
+    
+    user_state.set_voted(userId, postId, previous is None)
+    live_counts.publish("ox", postId)
+    if vote_counter.buffered:
+        # 투표 수는 모아서 반영 (반영된 뒤에 퀴즈 캐시가 무효화됨)
+        o_count, x_count = vote_counter.counts(postId, o_count, x_count)
+        vote_counter.add(delta_id, postId, o_delta, x_delta)
+        await response_cache.invalidate(f"state:{userId}")
+    else:
+        await response_cache.invalidate(f"ox:{postId}", "ox:counts", f"state:{userId}")
+        
+    return {"message": message, "oCount": max(o_count + o_delta, 0), "xCount": max(x_count + x_delta, 0)}
+
+class OXBatchResponse(BaseModel):
+    result: List[OXItem] = Field(..., description="요청한 순서대로의 OX 퀴즈 목록 (없는 id 는 빠짐)")
+
+@router.get("/batch", summary="OX 퀴즈 여러 개 한 번에 받아오기", response_model=OXBatchResponse)
+async def get_ox_batch(request: Request, response: Response, ids: str = Query(..., description="쉼표로 구분된 OX 퀴즈 ID 목록"), userId: str = Header()):
+    """
+    여러 OX 퀴즈를 상세 조회와 같은 모양으로 한 번에 받아오는 엔드포인트입니다.
+    퀴즈마다 /detail/{postID} 를 호출하는 대신 한 번의 IN (...) 쿼리로 조회합니다.
+    
+    - **ids**: 쉼표로 구분된 OX 퀴즈 ID 목록, 최대 BATCH_MAX_IDS (기본 100)개 (필수) (str) (Query)
+
+    - **userId**: 현재 접속중인 유저 이름 (필수) (str) (Header)
+    """
+    post_ids = parse_ids(ids)
+    not_modified = await check_etag(request, response, (*[f"ox:{post_id}" for post_id in post_ids], f"state:{userId}"), "ox:batch", *post_ids, userId)
+    if not_modified:
+        return not_modified
+    
+    placeholders = ", ".join(["%s"] * len(post_ids))
+    query = f"""
+    SELECT 
+        o.id, 
+        o.content, 
+        o.author,
+        o.o_count,
+        o.x_count,
+        o.created_at,
+        o.like_count
+    FROM ox o
+    WHERE o.id IN ({placeholders})
+    """
+    
+    result, state = await database.gather(database.execute_query(query, tuple(post_ids)), user_state.get(userId))
+    
+    formatted_result = [_format(row, state) for row in in_order(result, post_ids)]  
+    
+    return {"result": formatted_result}
+
+@router.get("/detail/{postID}")
+async def get_ox_detail(request: Request, response: Response, postID: int, userId: str = Header()):
+    not_modified = await check_etag(request, response, (f"ox:{postID}", f"state:{userId}"), "ox:detail", postID, userId)
+    if not_modified:
+        return not_modified
+    
+    # 모든 유저에게 같은 부분 (동시에 같은 퀴즈를 보는 요청은 한 번의 쿼리로 합쳐짐)
+    query = """
+    SELECT 
+        o.id, 
+        o.content, 
+        o.author,
+        o.o_count,
+        o.x_count,
+        o.created_at,
+        o.like_count
+    FROM ox o
+    WHERE o.id = %s 
+    """
+    params = (postID,)
+
+    # 유저마다 다른 부분 (투표 / 좋아요 여부) 은 게시글 조회와 동시에
+    result, state = await database.gather(
+        response_cache.get_or_load(f"ox:{postID}:detail", lambda: database.execute_shared(query, params), tags=[f"ox:{postID}"]),
+        user_state.get(userId),
+    )
+    
+    if len(result) == 0:
+        return {"result": []}
+    
+    formatted_result = [_format(row, state) for row in result]  
+    
+    return {"result": formatted_result}
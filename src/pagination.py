@@ -0,0 +1,59 @@
+from fastapi import HTTPException, status
+from datetime import datetime
+from typing import Optional, Tuple
+import base64
+import json
+
+# 피드 한 페이지 기본 크기 / 최대 크기
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# 커서 값을 클라이언트가 해석할 필요 없는 불투명한 문자열로 변환
+def encode_token(value) -> str:
+    raw = json.dumps(value, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_token(token: str):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="잘못된 cursor 값입니다."
+        )
+
+def encode_cursor(created_at: datetime, post_id: int) -> str:
+    return encode_token([created_at.isoformat(), post_id])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, post_id = decode_token(cursor)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except HTTPException:
+        raise
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="잘못된 cursor 값입니다."
+        )
+
+# 커서 이후의 행만 가져오는 조건 (OFFSET 없이 (created_at, id) 인덱스를 그대로 탐색)
+# MySQL 은 row constructor 비교 시 인덱스를 잘 타지 못하므로 풀어서 작성
+# ascending=True 는 오래된 순 (ORDER BY created_at, id) 으로 넘길 때
+def keyset_condition(alias: str, id_column: str = "id", ascending: bool = False) -> str:
+    op = ">" if ascending else "<"
+    return f"({alias}.created_at {op} %s OR ({alias}.created_at = %s AND {alias}.{id_column} {op} %s))"
+
+def keyset_params(cursor: str) -> list:
+    created_at, post_id = decode_cursor(cursor)
+    return [created_at, created_at, post_id]
+
+# limit + 1 개를 조회한 결과를 잘라서 다음 페이지 커서를 만든다
+def paginate(rows: list, limit: int) -> Tuple[list, Optional[str]]:
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(last['created_at'], last['id'])
@@ -0,0 +1,128 @@
+from database import database
+from metrics import register
+from dotenv import load_dotenv
+from collections import OrderedDict
+from typing import Dict, Iterable, NamedTuple, Optional, Set, Tuple
+import asyncio
+import os
+import time
+
+load_dotenv()
+
+# 메모리에 들고 있는 최대 유저 수 (가장 오래 안 쓴 유저부터 제거)
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "100000"))
+# 유저 정보 유효 시간 (초) / 다른 서버에서 바뀐 이름도 이 시간 안에는 반영됨
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))
+
+_FETCH_CHUNK = 500
+
+class UserRecord(NamedTuple):
+    id: str
+    name: str
+    country: str
+
+class UserIdentityCache:
+    """
+    유저 ID -> (이름, 국가) LRU + TTL 캐시입니다.
+    팔로잉 / 팔로워 목록, 댓글, 프로필처럼 ID 를 이름으로 바꾸기만 하는 곳에서 `user` 테이블 JOIN 대신 사용합니다.
+      - get_many(ids): 캐시에 없는 ID 만 한 번의 IN (...) 쿼리로 읽음 (동시에 같은 ID 를 읽는 요청은 합쳐짐)
+      - 회원가입 / 프로필 수정은 put(), 비밀번호 변경은 invalidate() 로 바로 반영
+    """
+    def __init__(self):
+        # ID -> (만료 시각, 유저 정보)
+        self._users: "OrderedDict[str, Tuple[float, UserRecord]]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # 읽는 도중 변경이 생긴 유저 (읽은 결과를 캐시에 넣지 않음)
+        self._changed_while_loading: Set[str] = set()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _cached(self, user_id: str) -> Optional[UserRecord]:
+        entry = self._users.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._users[user_id]
+            self._stats["expirations"] += 1
+            return None
+        self._users.move_to_end(user_id)
+        return entry[1]
+
+    def _store(self, record: UserRecord):
+        self._users[record.id] = (time.monotonic() + USER_CACHE_TTL, record)
+        self._users.move_to_end(record.id)
+        while len(self._users) > USER_CACHE_SIZE:
+            self._users.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def get(self, user_id: str) -> Optional[UserRecord]:
+        return (await self.get_many([user_id])).get(user_id)
+
+    # 없는 유저는 결과에서 빠짐
+    async def get_many(self, user_ids: Iterable[str]) -> Dict[str, UserRecord]:
+        result: Dict[str, UserRecord] = {}
+        misses = []
+        waiting: Dict[str, asyncio.Future] = {}
+        for user_id in dict.fromkeys(user_ids):
+            record = self._cached(user_id)
+            if record is not None:
+                result[user_id] = record
+            elif user_id in self._loading:
+                waiting[user_id] = self._loading[user_id]
+            else:
+                misses.append(user_id)
+
+        self._stats["hits"] += len(result)
+        self._stats["misses"] += len(misses) + len(waiting)
+
+        if misses:
+            future = asyncio.ensure_future(self._load(misses))
+            for user_id in misses:
+                self._loading[user_id] = future
+            # 아래 루프에서 future 변수를 다시 쓰므로 만들 때의 값을 묶어둠
+            future.add_done_callback(lambda _, ids=misses, loading=future: self._finish(ids, loading))
+            waiting.update((user_id, future) for user_id in misses)
+
+        for pending in set(waiting.values()):
+            loaded = await asyncio.shield(pending)
+            result.update((user_id, loaded[user_id]) for user_id in waiting if user_id in loaded)
+        return result
+
+    def _finish(self, user_ids: list, future: asyncio.Future):
+        for user_id in user_ids:
+            if self._loading.get(user_id) is future:
+                del self._loading[user_id]
+
+    async def _load(self, user_ids: list) -> Dict[str, UserRecord]:
+        loaded = {}
+        for start in range(0, len(user_ids), _FETCH_CHUNK):
+            chunk = user_ids[start:start + _FETCH_CHUNK]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            rows = await database.execute_query(f"SELECT id, name, country FROM user WHERE id IN ({placeholders})", tuple(chunk))
+            for row in rows:
+                loaded[row['id']] = UserRecord(row['id'], row['name'], row['country'])
+
+        # 읽는 사이에 바뀐 유저는 이번 결과를 쓰기만 하고 캐시에 넣지 않음
+        changed = self._changed_while_loading.intersection(user_ids)
+        self._changed_while_loading -= changed
+        for user_id, record in loaded.items():
+            if user_id not in changed:
+                self._store(record)
+        return loaded
+
+    # 회원가입 / 프로필 수정 커밋 후 호출
+    def put(self, user_id: str, name: str, country: str):
+        if user_id in self._loading:
+            self._changed_while_loading.add(user_id)
+        self._store(UserRecord(user_id, name, country))
+
+    # 그 밖에 user 행이 바뀐 뒤 호출 (다음 조회 때 다시 읽음)
+    def invalidate(self, user_id: str):
+        if user_id in self._loading:
+            self._changed_while_loading.add(user_id)
+        self._users.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return dict(self._stats, users=len(self._users), maxUsers=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+user_identity = UserIdentityCache()
+register("user_identity", user_identity.stats)
@@ -1,5 +1,9 @@
 from fastapi import APIRouter, HTTPException, status, Header
 from database import database
+from following.graph import follow_graph
+from proFile.identity import user_identity
+from searching.index import user_search_index
+from cache import cached, response_cache
 from typing import Optional
 from pydantic import BaseModel
 
@@ -10,6 +14,7 @@ router = APIRouter(
 
 
 @router.get("/{userId}", summary="유저의 프로필 반환")
+@cached(key=lambda userId: f"profile:{userId}", tags=lambda userId: [f"user:{userId}"])
 async def insert_item(userId: str):
     """
     유저의 id, 이름, 국가를 반환해주는 엔드포인트입니다.
@@ -25,24 +30,11 @@ async def insert_item(userId: str):
         )
     
     try:
-        query = """
-        SELECT 
-        u.*,
-        COALESCE(f.following_count, 0) AS following_count
-        FROM 
-            user u
-        LEFT JOIN (
-            SELECT follower, COUNT(*) AS following_count 
-            FROM following
-            GROUP BY follower
-        ) f ON u.id = f.follower 
-        WHERE 
-            u.id = %s
-        """
-        params = (userId)
-        # 쿼리 실행
-        result = await database.execute_query(query, params)
-        formatted_result = [{"userId": row['id'], "username": row['name'], "country": row['country'], "followerCount": row['following_count']} for row in result]
+        # 이름 / 국가는 유저 정보 캐시에서, 팔로워 수는 메모리 팔로우 그래프에서
+        user = await user_identity.get(userId)
+        result = [] if user is None else [user]
+        follower_count = await follow_graph.follower_count(userId)
+        formatted_result = [{"userId": row.id, "username": row.name, "country": row.country, "followerCount": follower_count} for row in result]
         return {"result": formatted_result}
 
     except Exception as e:
@@ -73,10 +65,26 @@ async def insert_item(username: str, country: str, userId: str = Header()):
         )
     
     try:
-        query = "UPDATE user SET name = %s, country = %s WHERE id = %s"
-        params = (username, country, userId)
-        # 쿼리 실행
-        result = await database.execute_query(query, params)
+        async with database.transaction() as tx:
+            # 값이 같으면 UPDATE 의 affected rows 가 0 이므로 행이 있는지는 따로 확인
+            result = await tx.execute_query("SELECT id FROM user WHERE id = %s FOR UPDATE", (userId,))
+            exists = len(result) > 0
+            if exists:
+                query = "UPDATE user SET name = %s, country = %s WHERE id = %s"
+                params = (username, country, userId)
+                # 쿼리 실행
+                await tx.execute_query(query, params)
+        
+        # 실제로 바뀐 유저만 캐시 / 검색 인덱스에 반영 (없는 userId 로 가짜 정보가 들어가지 않도록)
+        if exists:
+            user_search_index.update(userId, username)
+            user_identity.put(userId, username, country)
+            # 댓글 페이지 캐시 / ETag 에 이름이 들어 있으므로 이 유저가 댓글을 단 글의 댓글 태그도 무효화
+            result = await database.execute_query("SELECT DISTINCT post_id FROM comment WHERE author = %s", (userId,))
+            await response_cache.invalidate(f"user:{userId}", *[f"qa:{row['post_id']}:comments" for row in result])
+        else:
+            user_identity.invalidate(userId)
+            await response_cache.invalidate(f"user:{userId}")
         return {"Message": "Updated Successful"}
 
     except Exception as e:
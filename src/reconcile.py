@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import sys
+from contextlib import aclosing
+from database import database
+from timeline.timeline import TIMELINE_FANOUT_LIMIT, TIMELINE_MAX_ENTRIES, TIMELINE_TABLES
+from upload.upload import cleanup_stale_uploads
+
+# 비정규화된 카운터 컬럼을 원본 테이블 기준으로 다시 맞추는 커맨드
+# 사용법 (src 디렉토리에서): python reconcile.py like_count
+#                              python reconcile.py vote_count  (ox_check 기준으로 o_count / x_count, 반영 대기 중인 증감이 있는 퀴즈는 건너뜀)
+#                              python reconcile.py comment_count
+#                              python reconcile.py timeline  (팔로잉 피드 타임라인을 following 기준으로 다시 채움)
+#                              python reconcile.py uploads  (완료되지 않은 presigned 업로드의 S3 객체 / 멀티파트 조각 정리)
+
+# 한 번의 UPDATE 가 잡는 게시글 id 범위 (큰 테이블에서 락을 오래 잡지 않도록 나눠서 처리)
+BATCH_SIZE = 5000
+
+async def reconcile_like_count():
+    for table in ("ox", "qa"):
+        result = await database.execute_query(f"SELECT COALESCE(MAX(id), 0) AS max_id FROM {table}")
+        max_id = result[0]['max_id']
+
+        for start in range(0, max_id + 1, BATCH_SIZE):
+            end = start + BATCH_SIZE
+            query = f"""
+            UPDATE {table} p
+            LEFT JOIN (
+                SELECT post_id, COUNT(*) AS like_count
+                FROM `like`
+                WHERE post_type = %s AND post_id >= %s AND post_id < %s
+                GROUP BY post_id
+            ) AS l ON p.id = l.post_id
+            SET p.like_count = COALESCE(l.like_count, 0)
+            WHERE p.id >= %s AND p.id < %s AND p.like_count <> COALESCE(l.like_count, 0)
+            """
+            await database.execute_query(query, (table, start, end, start, end))
+
+        logging.info(f"{table}.like_count 보정 완료 (id 0 ~ {max_id})")
+
+async def reconcile_vote_count():
+    result = await database.execute_query("SELECT COALESCE(MAX(id), 0) AS max_id FROM ox")
+    max_id = result[0]['max_id']
+
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        end = start + BATCH_SIZE
+        query = """
+        UPDATE ox p
+        LEFT JOIN (
+            SELECT post_id, SUM(vote = 1) AS o_count, SUM(vote = 0) AS x_count
+            FROM ox_check
+            WHERE post_id >= %s AND post_id < %s
+            GROUP BY post_id
+        ) AS c ON p.id = c.post_id
+        SET p.o_count = COALESCE(c.o_count, 0), p.x_count = COALESCE(c.x_count, 0)
+        WHERE p.id >= %s AND p.id < %s
+          AND (p.o_count <> COALESCE(c.o_count, 0) OR p.x_count <> COALESCE(c.x_count, 0))
+          AND NOT EXISTS (SELECT 1 FROM ox_vote_delta v WHERE v.post_id = p.id)
+        """
+        await database.execute_query(query, (start, end, start, end))
+
+    logging.info(f"ox.o_count / x_count 보정 완료 (id 0 ~ {max_id})")
+
+async def reconcile_comment_count():
+    result = await database.execute_query("SELECT COALESCE(MAX(id), 0) AS max_id FROM qa")
+    max_id = result[0]['max_id']
+
+    for start in range(0, max_id + 1, BATCH_SIZE):
+        end = start + BATCH_SIZE
+        query = """
+        UPDATE qa p
+        LEFT JOIN (
+            SELECT post_id, COUNT(*) AS comment_count
+            FROM comment
+            WHERE post_id >= %s AND post_id < %s
+            GROUP BY post_id
+        ) AS c ON p.id = c.post_id
+        SET p.comment_count = COALESCE(c.comment_count, 0)
+        WHERE p.id >= %s AND p.id < %s AND p.comment_count <> COALESCE(c.comment_count, 0)
+        """
+        await database.execute_query(query, (start, end, start, end))
+
+    logging.info(f"qa.comment_count 보정 완료 (id 0 ~ {max_id})")
+
+async def reconcile_timeline():
+    # 팔로워가 많은 작성자는 조회 시 합치므로 타임라인에 넣지 않음
+    query = "SELECT follower FROM following GROUP BY follower HAVING COUNT(*) > %s"
+    celebrities = [row['follower'] for row in await database.execute_query(query, (TIMELINE_FANOUT_LIMIT,))]
+    exclude = f"AND f.follower NOT IN ({', '.join(['%s'] * len(celebrities))})" if celebrities else ""
+
+    users = []
+    async with aclosing(database.stream_query("SELECT DISTINCT following FROM following")) as rows:
+        async for row in rows:
+            users.append(row['following'])
+
+    for user_id in users:
+        for post_type, table in TIMELINE_TABLES.items():
+            query = f"""
+            INSERT IGNORE INTO timeline (user_id, post_type, post_id, author, created_at)
+            SELECT f.following, %s, p.id, p.author, p.created_at
+            FROM following f
+            JOIN {table} p ON p.author = f.follower
+            WHERE f.following = %s {exclude}
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT %s
+            """
+            await database.execute_query(query, (post_type, user_id, *celebrities, TIMELINE_MAX_ENTRIES))
+
+    logging.info(f"timeline 보정 완료 (유저 {len(users)}명, 제외한 인기 작성자 {len(celebrities)}명)")
+
+COMMANDS = {
+    "like_count": reconcile_like_count,
+    "vote_count": reconcile_vote_count,
+    "comment_count": reconcile_comment_count,
+    "timeline": reconcile_timeline,
+    "uploads": cleanup_stale_uploads,
+}
+
+async def main(names):
+    await database.connect()
+    try:
+        for name in names:
+            await COMMANDS[name]()
+    finally:
+        await database.disconnect()
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or list(COMMANDS)
+    unknown = [name for name in names if name not in COMMANDS]
+    if unknown:
+        sys.exit(f"알 수 없는 명령: {', '.join(unknown)} (가능: {', '.join(COMMANDS)})")
+
+    asyncio.run(main(names))
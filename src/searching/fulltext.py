@@ -0,0 +1,280 @@
+from database import database
+from metrics import register
+from dotenv import load_dotenv
+from array import array
+from collections import Counter
+from contextlib import aclosing
+from typing import Dict, List, Optional, Tuple
+import heapq
+import logging
+import math
+import json
+import os
+import re
+import unicodedata
+import zlib
+
+load_dotenv()
+
+# 인덱스 스냅샷 파일 경로 (없으면 매번 DB 에서 새로 만듦)
+SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH")
+
+# 검색 대상 게시글 타입 -> 테이블
+POST_TABLES = {"ox": "ox", "qa": "qa"}
+
+# BM25 파라미터
+K1 = 1.2
+B = 0.75
+
+# 스냅샷 형식이 바뀌면 올려서 예전 파일을 무시하게 함
+# (2 부터 JSON / 1 은 pickle 이었으므로 읽지 못하고 새로 만듦)
+_SNAPSHOT_VERSION = 2
+
+_FETCH_CHUNK = 500
+
+_HANGUL_RUN = re.compile(r"[가-힣]+")
+_TOKEN_RUN = re.compile(r"[가-힣]+|[^\W_가-힣]+")
+
+# 한글은 띄어쓰기 / 조사 때문에 단어 단위로 자르면 검색이 잘 안 되므로 음절 bigram 으로,
+# 영어 / 숫자 등은 소문자 단어 단위로 자름
+# "OX퀴즈 재밌다" -> ["ox", "퀴즈", "재밌", "밌다"]
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFC", text).casefold()
+    tokens = []
+    for run in _TOKEN_RUN.findall(text):
+        if _HANGUL_RUN.fullmatch(run):
+            if len(run) == 1:
+                tokens.append(run)
+            else:
+                tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+def content_crc(content: str) -> int:
+    return zlib.crc32(content.encode("utf-8"))
+
+class PostSearchIndex:
+    """
+    OX / Q&A 게시글 본문의 역색인입니다. (단어 -> {문서 번호: 등장 횟수})
+    게시글 작성 / 수정 / 삭제 시 바로 반영되고, 종료 시 SEARCH_INDEX_PATH 에 저장했다가
+    재시작하면 불러와서 DB 와 달라진 글(CRC32 비교)만 다시 색인합니다.
+    """
+    def __init__(self):
+        self._clear()
+        self.ready = False
+
+    def _clear(self):
+        self._doc_index: Dict[Tuple[str, int], int] = {}
+        self._docs: List[Optional[Tuple[str, int]]] = []
+        self._doc_terms: List[Optional[Tuple[str, ...]]] = []
+        self._lengths = array("I")
+        self._crcs = array("I")
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._free: List[int] = []
+        self._count = 0
+        self._total_length = 0
+        self._dirty = False
+
+    def _index_doc(self, key: Tuple[str, int], content: str):
+        self._remove_doc(key)
+
+        tokens = tokenize(content)
+        counts = Counter(tokens)
+
+        if self._free:
+            number = self._free.pop()
+            self._docs[number] = key
+            self._doc_terms[number] = tuple(counts)
+            self._lengths[number] = len(tokens)
+            self._crcs[number] = content_crc(content)
+        else:
+            number = len(self._docs)
+            self._docs.append(key)
+            self._doc_terms.append(tuple(counts))
+            self._lengths.append(len(tokens))
+            self._crcs.append(content_crc(content))
+
+        self._doc_index[key] = number
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[number] = tf
+        self._count += 1
+        self._total_length += len(tokens)
+        self._dirty = True
+
+    def _remove_doc(self, key: Tuple[str, int]):
+        number = self._doc_index.pop(key, None)
+        if number is None:
+            return
+
+        for term in self._doc_terms[number]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(number, None)
+                if not postings:
+                    del self._postings[term]
+
+        self._count -= 1
+        self._total_length -= self._lengths[number]
+        self._docs[number] = None
+        self._doc_terms[number] = None
+        self._lengths[number] = 0
+        self._free.append(number)
+        self._dirty = True
+
+    # 게시글 작성 / 수정 시
+    def upsert(self, post_type: str, post_id: int, content: str):
+        if self.ready:
+            self._index_doc((post_type, int(post_id)), content)
+
+    # 게시글 삭제 시
+    def remove(self, post_type: str, post_id: int):
+        if self.ready:
+            self._remove_doc((post_type, int(post_id)))
+
+    async def load(self):
+        self._clear()
+        self.ready = False
+
+        snapshot = self._read_snapshot()
+        if snapshot is None:
+            for post_type, table in POST_TABLES.items():
+                async with aclosing(database.stream_query(f"SELECT id, content FROM {table}")) as rows:
+                    async for row in rows:
+                        self._index_doc((post_type, row['id']), row['content'])
+        else:
+            self.__dict__.update(snapshot)
+            await self._catch_up()
+
+        self._dirty = snapshot is None
+        self.ready = True
+        logging.info(f"게시글 검색 인덱스 로드 완료 (게시글 {self._count}개, 단어 {len(self._postings)}개)")
+
+    # 스냅샷 이후에 추가 / 수정 / 삭제된 글만 다시 반영
+    async def _catch_up(self):
+        changed = 0
+        for post_type, table in POST_TABLES.items():
+            seen = set()
+            stale = []
+            async with aclosing(database.stream_query(f"SELECT id, CRC32(content) AS crc FROM {table}")) as rows:
+                async for row in rows:
+                    key = (post_type, row['id'])
+                    seen.add(row['id'])
+                    number = self._doc_index.get(key)
+                    if number is None or self._crcs[number] != row['crc']:
+                        stale.append(row['id'])
+
+            for key in [key for key in self._doc_index if key[0] == post_type and key[1] not in seen]:
+                self._remove_doc(key)
+                changed += 1
+
+            for start in range(0, len(stale), _FETCH_CHUNK):
+                chunk = stale[start:start + _FETCH_CHUNK]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                rows = await database.execute_query(f"SELECT id, content FROM {table} WHERE id IN ({placeholders})", tuple(chunk))
+                for row in rows:
+                    self._index_doc((post_type, row['id']), row['content'])
+                changed += len(rows)
+
+        logging.info(f"게시글 검색 인덱스 스냅샷 이후 변경 {changed}건 반영")
+
+    # 스냅샷 파일은 JSON (pickle 처럼 읽을 때 코드가 실행될 일이 없음)
+    # 문서 번호별 배열 (docs / lengths / crcs) 과 단어별 [문서 번호, 등장 횟수, ...] 만 저장하고
+    # 나머지 (문서 번호 색인, 문서별 단어, 빈 번호, 합계) 는 읽을 때 다시 계산
+    def _dump_snapshot(self) -> dict:
+        return {
+            "version": _SNAPSHOT_VERSION,
+            "docs": self._docs,
+            "lengths": self._lengths.tolist(),
+            "crcs": self._crcs.tolist(),
+            "postings": {term: [value for item in postings.items() for value in item] for term, postings in self._postings.items()},
+        }
+
+    @staticmethod
+    def _restore_snapshot(snapshot: dict) -> Optional[dict]:
+        if snapshot.get("version") != _SNAPSHOT_VERSION:
+            return None
+
+        docs = [(key[0], int(key[1])) if key is not None else None for key in snapshot["docs"]]
+        lengths = array("I", snapshot["lengths"])
+        crcs = array("I", snapshot["crcs"])
+        if not len(docs) == len(lengths) == len(crcs):
+            raise ValueError("문서 배열 길이가 다릅니다.")
+
+        doc_terms: List[Optional[list]] = [[] if key is not None else None for key in docs]
+        postings: Dict[str, Dict[int, int]] = {}
+        for term, flat in snapshot["postings"].items():
+            entries = postings[term] = dict(zip(flat[0::2], flat[1::2]))
+            for number in entries:
+                doc_terms[number].append(term)
+
+        return {
+            "_doc_index": {key: number for number, key in enumerate(docs) if key is not None},
+            "_docs": docs,
+            "_doc_terms": [tuple(terms) if terms is not None else None for terms in doc_terms],
+            "_lengths": lengths,
+            "_crcs": crcs,
+            "_postings": postings,
+            "_free": [number for number, key in enumerate(docs) if key is None],
+            "_count": sum(1 for key in docs if key is not None),
+            "_total_length": sum(lengths),
+        }
+
+    def _read_snapshot(self) -> Optional[dict]:
+        if not SEARCH_INDEX_PATH or not os.path.exists(SEARCH_INDEX_PATH):
+            return None
+        try:
+            with open(SEARCH_INDEX_PATH, "r", encoding="utf-8") as f:
+                return self._restore_snapshot(json.load(f))
+        except Exception as e:
+            logging.warning(f"게시글 검색 인덱스 스냅샷을 읽지 못해서 새로 만듭니다: {e}")
+            return None
+
+    # 종료 시 호출 (바뀐 게 없으면 쓰지 않음)
+    def save(self):
+        if not SEARCH_INDEX_PATH or not self.ready or not self._dirty:
+            return
+
+        temp_path = SEARCH_INDEX_PATH + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._dump_snapshot(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(temp_path, SEARCH_INDEX_PATH)
+        self._dirty = False
+        logging.info(f"게시글 검색 인덱스 저장 완료 ({SEARCH_INDEX_PATH})")
+
+    # BM25 점수 순으로 (점수, 게시글 타입, 게시글 id) 반환
+    # after: 이전 페이지 마지막 항목 (점수, 게시글 타입, 게시글 id) / 그 다음부터 반환
+    def search(self, query: str, limit: int, after: Optional[Tuple[float, str, int]] = None) -> List[Tuple[float, str, int]]:
+        terms = set(tokenize(query))
+        if not terms or self._count == 0:
+            return []
+
+        average_length = self._total_length / self._count
+        scores: Dict[int, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (self._count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for number, tf in postings.items():
+                norm = K1 * (1 - B + B * self._lengths[number] / average_length)
+                scores[number] = scores.get(number, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+
+        # 점수 내림차순, 같은 점수면 (타입, id) 오름차순
+        def order(item):
+            number, score = item
+            post_type, post_id = self._docs[number]
+            return (-score, post_type, post_id)
+
+        items = scores.items()
+        if after is not None:
+            boundary = (-after[0], after[1], after[2])
+            items = [item for item in items if order(item) > boundary]
+
+        return [(score, *self._docs[number]) for number, score in heapq.nsmallest(limit, items, key=order)]
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "posts": self._count, "terms": len(self._postings), "path": SEARCH_INDEX_PATH}
+
+post_search_index = PostSearchIndex()
+register("post_search", post_search_index.stats)
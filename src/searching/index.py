@@ -0,0 +1,198 @@
+from database import database
+from following.graph import follow_graph
+from metrics import register
+from bisect import bisect_left, insort
+from contextlib import aclosing
+from typing import Dict, List, Optional, Set, Tuple
+import heapq
+import logging
+import time
+import unicodedata
+
+# 한글 초성 (호환용 자모)
+CHOSEONG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_CHOSEONG_SET = set(CHOSEONG)
+
+# 한 검색에서 점수를 매길 최대 후보 수 (한 글자 검색처럼 후보가 너무 많을 때의 상한)
+MAX_CANDIDATES = 20000
+
+# 검색어 없이 조회할 때 보여주는 인기 유저 목록 갱신 주기 (초)
+POPULAR_TTL = 60
+
+def normalize(text: str) -> str:
+    return unicodedata.normalize("NFC", text).casefold().strip()
+
+# "김철수" -> "ㄱㅊㅅ" (한글 음절이 아닌 글자는 그대로)
+def choseong(text: str) -> str:
+    result = []
+    for char in text:
+        code = ord(char) - 0xAC00
+        if 0 <= code < 11172:
+            result.append(CHOSEONG[code // 588])
+        else:
+            result.append(char)
+    return "".join(result)
+
+def is_choseong_query(text: str) -> bool:
+    letters = [char for char in text if not char.isspace()]
+    return bool(letters) and all(char in _CHOSEONG_SET for char in letters)
+
+def bigrams(text: str) -> Set[str]:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+class UserSearchIndex:
+    """
+    유저 ID / 이름 검색용 메모리 인덱스입니다.
+      - 접두어: (키, 유저 번호) 정렬 리스트에서 이진 탐색
+      - 부분 문자열: 글자 단위 bigram 역색인 (한글은 음절 단위라 두 글자부터 부분 검색 가능)
+      - 초성: "ㄱㅊㅅ" 처럼 초성만 입력하면 이름의 초성 문자열에서 검색
+    결과는 팔로워 수가 많은 순으로 정렬합니다.
+    """
+    def __init__(self):
+        self._clear()
+        self.ready = False
+
+    def _clear(self):
+        self._index: Dict[str, int] = {}
+        self._users: List[Tuple[str, str]] = []
+        self._prefix: List[Tuple[str, int]] = []
+        self._grams: Dict[str, Set[int]] = {}
+        self._popular: List[str] = []
+        self._popular_at = 0.0
+
+    @staticmethod
+    def _keys(user_id: str, name: str) -> Set[str]:
+        name_key = normalize(name)
+        keys = {normalize(user_id), name_key, choseong(name_key).replace(" ", "")}
+        keys.discard("")
+        return keys
+
+    def _add_keys(self, number: int, keys: Set[str], bulk: bool = False):
+        for key in keys:
+            if bulk:
+                self._prefix.append((key, number))
+            else:
+                insort(self._prefix, (key, number))
+            for gram in bigrams(key):
+                self._grams.setdefault(gram, set()).add(number)
+
+    # keep: 이 유저에게 계속 남는 키 (같은 bigram 을 가진 키가 남아 있으면 역색인에서 지우지 않음)
+    def _remove_keys(self, number: int, keys: Set[str], keep: Set[str]):
+        kept_grams = set().union(*(bigrams(key) for key in keep))
+        for key in keys:
+            i = bisect_left(self._prefix, (key, number))
+            if i < len(self._prefix) and self._prefix[i] == (key, number):
+                del self._prefix[i]
+
+            for gram in bigrams(key) - kept_grams:
+                postings = self._grams.get(gram)
+                if postings is not None:
+                    postings.discard(number)
+                    if not postings:
+                        del self._grams[gram]
+
+    async def load(self):
+        self._clear()
+        self.ready = False
+
+        async with aclosing(database.stream_query("SELECT id, name FROM user")) as rows:
+            async for row in rows:
+                number = len(self._users)
+                self._index[row['id']] = number
+                self._users.append((row['id'], row['name']))
+                self._add_keys(number, self._keys(row['id'], row['name']), bulk=True)
+
+        self._prefix.sort()
+        self.ready = True
+        logging.info(f"유저 검색 인덱스 로드 완료 (유저 {len(self._users)}명)")
+
+    # 회원가입 시
+    def add(self, user_id: str, name: str):
+        if user_id in self._index:
+            self.update(user_id, name)
+            return
+
+        number = len(self._users)
+        self._index[user_id] = number
+        self._users.append((user_id, name))
+        self._add_keys(number, self._keys(user_id, name))
+
+    # 프로필 이름 변경 시
+    def update(self, user_id: str, name: str):
+        number = self._index.get(user_id)
+        if number is None:
+            return
+
+        old_keys = self._keys(*self._users[number])
+        new_keys = self._keys(user_id, name)
+        self._users[number] = (user_id, name)
+        self._remove_keys(number, old_keys - new_keys, new_keys)
+        self._add_keys(number, new_keys - old_keys)
+
+    def _prefix_matches(self, query: str, candidates: Dict[int, int]):
+        i = bisect_left(self._prefix, (query, -1))
+        while i < len(self._prefix) and len(candidates) < MAX_CANDIDATES:
+            key, number = self._prefix[i]
+            if not key.startswith(query):
+                break
+            tier = 0 if key == query else 1
+            if candidates.get(number, 3) > tier:
+                candidates[number] = tier
+            i += 1
+
+    def _substring_matches(self, query: str, candidates: Dict[int, int]):
+        grams = bigrams(query)
+        if not grams:
+            return
+
+        postings = sorted((self._grams.get(gram, set()) for gram in grams), key=len)
+        for number in set.intersection(*postings):
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+            if number in candidates:
+                continue
+            # bigram 이 모두 들어있어도 연속하지 않을 수 있으므로 실제로 포함하는지 확인
+            if any(query in key for key in self._keys(*self._users[number])):
+                candidates[number] = 2
+
+    async def search(self, query: str, limit: int, exclude: Optional[str] = None) -> List[str]:
+        query = normalize(query)
+        if not query:
+            return await self._popular_users(limit, exclude)
+
+        if is_choseong_query(query):
+            query = query.replace(" ", "")
+
+        # 유저 번호 -> 일치 정도 (0: 완전 일치, 1: 접두어, 2: 부분 문자열)
+        candidates: Dict[int, int] = {}
+        self._prefix_matches(query, candidates)
+        self._substring_matches(query, candidates)
+
+        user_ids = [self._users[number][0] for number in candidates if self._users[number][0] != exclude]
+        counts = await follow_graph.follower_counts(user_ids)
+        ranked = heapq.nsmallest(
+            limit,
+            user_ids,
+            key=lambda user_id: (-counts[user_id], candidates[self._index[user_id]], user_id),
+        )
+        return ranked
+
+    async def _popular_users(self, limit: int, exclude: Optional[str]) -> List[str]:
+        now = time.monotonic()
+        if now - self._popular_at > POPULAR_TTL:
+            user_ids = [user[0] for user in self._users]
+            counts = await follow_graph.follower_counts(user_ids)
+            self._popular = heapq.nlargest(200, user_ids, key=lambda user_id: counts[user_id])
+            self._popular_at = now
+
+        return [user_id for user_id in self._popular if user_id != exclude][:limit]
+
+    def name_of(self, user_id: str) -> Optional[str]:
+        number = self._index.get(user_id)
+        return None if number is None else self._users[number][1]
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "users": len(self._users), "prefixKeys": len(self._prefix), "bigrams": len(self._grams)}
+
+user_search_index = UserSearchIndex()
+register("user_search", user_search_index.stats)
@@ -1,7 +1,12 @@
-from fastapi import APIRouter, HTTPException, status, Header
+from fastapi import APIRouter, HTTPException, status, Header, Query
 from database import database
+from following.graph import follow_graph
+from pagination import decode_token, encode_token
+from searching.fulltext import POST_TABLES, post_search_index
+from searching.index import user_search_index
 from typing import Optional
 from pydantic import BaseModel
+import math
 
 router = APIRouter(
     tags=["searching"],
@@ -9,10 +14,13 @@ router = APIRouter(
 )
 
 @router.get("", summary="유저 검색 시 팔로우 여부")
-async def user_search(userId: str = Header()):
+async def user_search(q: Optional[str] = None, limit: int = Query(20, ge=1, le=100), userId: str = Header()):
     """
-    유저의 팔로우 여부를 검색 시에 보여주는 엔드포인트입니다.
+    유저 ID / 이름으로 유저를 검색하고 팔로우 여부를 같이 보여주는 엔드포인트입니다.
+    결과는 팔로워 수가 많은 순으로 정렬됩니다.
 
+    - **q**: 검색어 (선택) (str) (ID / 이름의 앞부분, 두 글자 이상이면 중간 부분도 검색, 한글 초성 검색 가능) (없으면 팔로워가 많은 유저)
+    - **limit**: 최대 결과 수 (선택) (int) (기본 20, 최대 100)
     - **userId**: 현재 접속중인 유저 이름 (parameter)
 
     """
@@ -23,39 +31,83 @@ async def user_search(userId: str = Header()):
             detail="유저 이름은 1글자 이상 25글자 이하여야 합니다."
         )
     
+    if q is not None and len(q) > 50:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="검색어는 50글자 이하여야 합니다."
+        )
+    
     try:
-        query = """
-                SELECT 
-                    u.id, 
-                    u.name,
-                    COALESCE(sub_f.follower_count, 0) AS follower_count, 
-                    CASE 
-                        WHEN f2.follower IS NOT NULL THEN TRUE 
-                        ELSE FALSE 
-                    END AS followed
-                FROM user u
-                LEFT JOIN (
-                    SELECT follower, COUNT(*) AS follower_count 
-                    FROM following
-                    GROUP BY follower
-                ) sub_f ON u.id = sub_f.follower 
-                LEFT JOIN following f2 
-                    ON u.id = f2.follower 
-                    AND f2.following = %s
-                WHERE u.id != %s
-                """
-                
-        params = (userId, userId)  # 특정 사용자를 팔로우하는지 확인할 사용자 ID
+        # 메모리 인덱스에서 검색하고 팔로우 여부 / 팔로워 수는 팔로우 그래프에서 붙임
+        user_ids = await user_search_index.search(q or "", limit, exclude=userId)
+        followed = set(await follow_graph.following_ids(userId))
+        counts = await follow_graph.follower_counts(user_ids)
 
-        # 쿼리 실행
-        result = await database.execute_query(query, params)
-
-        # 쿼리 결과 출력 또는 반환
-        response = [{"id": row["id"], "name": row["name"], "followed": bool(row["followed"]), "followerCount": row["follower_count"]} for row in result]
+        response = [{"id": user_id, "name": user_search_index.name_of(user_id), "followed": user_id in followed, "followerCount": counts[user_id]} for user_id in user_ids]
         return {"userList": response}
     except Exception as e:
         print(e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="예상치 못한 오류가 발생했습니다."
-        )
\ No newline at end of file
+        )
+
+@router.get("/posts", summary="게시글 본문 검색")
+async def post_search(q: str, cursor: Optional[str] = None, limit: int = Query(20, ge=1, le=100)):
+    """
+    OX 퀴즈 / Q&A 게시글 본문을 검색하는 엔드포인트입니다.
+    결과는 관련도(BM25) 순으로 정렬됩니다.
+
+    - **q**: 검색어 (필수) (str) (한글은 두 글자 단위로 검색됩니다)
+    - **cursor**: 이전 응답의 nextCursor (선택) (str) (없으면 첫 페이지)
+    - **limit**: 한 번에 받아올 개수 (선택) (int) (기본 20, 최대 100)
+    """
+    if len(q) == 0 or len(q) > 100:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="검색어는 1글자 이상 100글자 이하여야 합니다."
+        )
+    
+    after = None
+    if cursor:
+        token = decode_token(cursor)
+        try:
+            if isinstance(token, list) and len(token) == 3 and token[1] in POST_TABLES:
+                after = (float(token[0]), token[1], int(token[2]))
+        except (TypeError, ValueError, OverflowError):
+            pass
+        if after is None or not math.isfinite(after[0]):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="잘못된 cursor 값입니다."
+            )
+    
+    hits = post_search_index.search(q, limit + 1, after)
+    next_cursor = encode_token(list(hits[limit - 1])) if len(hits) > limit else None
+    hits = hits[:limit]
+    
+    try:
+        # 인덱스에서 찾은 글의 내용은 타입별로 한 번씩 IN (...) 으로 조회
+        posts = {}
+        for post_type, table in POST_TABLES.items():
+            ids = [post_id for _, hit_type, post_id in hits if hit_type == post_type]
+            if not ids:
+                continue
+            placeholders = ", ".join(["%s"] * len(ids))
+            query = f"SELECT id, content, author, created_at FROM {table} WHERE id IN ({placeholders})"
+            for row in await database.execute_query(query, tuple(ids)):
+                posts[(post_type, row['id'])] = row
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="예상치 못한 오류가 발생했습니다."
+        )
+    
+    result = [
+        {"id": post_id, "postType": post_type, "content": row['content'], "author": row['author'], "created_at": row['created_at'], "score": round(score, 4)}
+        for score, post_type, post_id in hits
+        if (row := posts.get((post_type, post_id))) is not None
+    ]
+    
+    return {"result": result, "nextCursor": next_cursor}
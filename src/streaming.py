@@ -0,0 +1,80 @@
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from contextlib import aclosing
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Callable, List
+import json
+
+# 한 번에 클라이언트로 내보내는 행 수
+FLUSH_ROWS = 100
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _dumps(item: dict) -> str:
+    return json.dumps(item, ensure_ascii=False, default=_default)
+
+# 행 스트림을 size 개씩 묶어서 전달 (묶음 단위로 추가 정보를 한 번에 붙일 때 사용)
+async def chunked(rows: AsyncIterator[dict], size: int) -> AsyncIterator[List[dict]]:
+    async with aclosing(rows):
+        chunk = []
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+# database.stream_query 결과를 행 단위로 직렬화해서 그대로 응답으로 흘려보냄
+#  - 기본: {"<key>": [ ... ]} (기존 응답 모양 그대로)
+#  - Accept: application/x-ndjson 인 경우: 한 줄에 한 행
+# 첫 행을 미리 읽어서 쿼리 오류는 응답 헤더가 나가기 전에 호출한 쪽으로 전달됨
+async def stream_rows(request: Request, rows: AsyncIterator[dict], format_row: Callable[[dict], dict], key: str = "result") -> StreamingResponse:
+    ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+    try:
+        first = await rows.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except BaseException:
+        await rows.aclose()
+        raise
+
+    async def body():
+        async with aclosing(rows):
+            if ndjson:
+                buffer = []
+                if first is not None:
+                    buffer.append(_dumps(format_row(first)) + "\n")
+                async for row in rows:
+                    buffer.append(_dumps(format_row(row)) + "\n")
+                    if len(buffer) >= FLUSH_ROWS:
+                        yield "".join(buffer)
+                        buffer = []
+                if buffer:
+                    yield "".join(buffer)
+                return
+
+            yield "{" + json.dumps(key) + ":["
+            if first is not None:
+                buffer = [_dumps(format_row(first))]
+                separator = ""
+                async for row in rows:
+                    buffer.append(_dumps(format_row(row)))
+                    if len(buffer) >= FLUSH_ROWS:
+                        yield separator + ",".join(buffer)
+                        separator = ","
+                        buffer = []
+                if buffer:
+                    yield separator + ",".join(buffer)
+            yield "]}"
+
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE if ndjson else "application/json")
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# database.py 는 import 시 DB 환경 변수를 확인하므로 테스트용 값을 넣어둠 (실제로 연결하지 않음)
+for name in ("DB_HOST", "DB_PORT", "DB_USER", "DB_PASSWORD", "DB_NAME"):
+    os.environ.setdefault(name, "test")
+
+# src 디렉토리에서 모듈을 import
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,29 @@
+import pytest
+from fastapi import HTTPException
+
+from batch import in_order, parse_ids, parse_posts
+
+def test_parse_ids_keeps_first_occurrence_order():
+    assert parse_ids("3, 1,3,2") == [3, 1, 2]
+
+@pytest.mark.parametrize("ids", ["", "1,,2", "1,a", "-1", "1.5"])
+def test_parse_ids_rejects_malformed_input(ids):
+    with pytest.raises(HTTPException) as error:
+        parse_ids(ids)
+    assert error.value.status_code == 400
+
+def test_parse_ids_limit_counts_unique_ids():
+    assert parse_ids("1,1,2", limit=2) == [1, 2]
+    with pytest.raises(HTTPException) as error:
+        parse_ids("1,2,3", limit=2)
+    assert error.value.status_code == 400
+
+def test_parse_posts():
+    assert parse_posts("ox:1, qa:2,ox:1", ("ox", "qa")) == [("ox", 1), ("qa", 2)]
+    for posts in ("ox:1,xx:2", "ox:", "1"):
+        with pytest.raises(HTTPException):
+            parse_posts(posts, ("ox", "qa"))
+
+def test_in_order_follows_requested_ids_and_drops_missing():
+    rows = [{"id": 2}, {"id": 1}]
+    assert in_order(rows, [1, 3, 2]) == [{"id": 1}, {"id": 2}]
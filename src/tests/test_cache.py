@@ -0,0 +1,38 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from cache import _dumps, _loads
+
+def test_json_envelope_round_trip():
+    value = {
+        "rows": [{"id": 1, "created_at": datetime(2024, 1, 2, 3, 4, 5, 6), "name": "이름"}],
+        "key": ("ox", 1),
+        "day": date(2024, 1, 2),
+        "elapsed": timedelta(seconds=1.5),
+        "score": Decimal("1.10"),
+        "raw": b"\x00\xff",
+        "nothing": None,
+        "flag": True,
+    }
+    data = _dumps(value)
+
+    assert isinstance(data, bytes)
+    assert _loads(data) == value
+    # 튜플은 리스트로 바뀌지 않음
+    assert isinstance(_loads(data)["key"], tuple)
+
+def test_nested_tuples_round_trip():
+    value = [(1, ("a", datetime(2024, 1, 1))), []]
+    assert _loads(_dumps(value)) == value
+
+@pytest.mark.parametrize("value", [
+    {1: "non-string key"},
+    {"__cache__": "datetime", "value": "2024-01-01"},
+    {1, 2},
+    object(),
+])
+def test_uncacheable_values_are_rejected(value):
+    with pytest.raises(TypeError):
+        _dumps(value)
@@ -0,0 +1,72 @@
+import asyncio
+import math
+
+import existence as existence_module
+from existence import BloomFilter, ExistenceIndex, IdBitmap
+
+def test_bloom_filter_sizing_matches_target_rate():
+    bloom = BloomFilter(10000, 0.01)
+    # 키 하나당 약 9.6 bit, 해시 7 개
+    assert math.isclose(bloom.size / bloom.capacity, 9.585, rel_tol=0.01)
+    assert bloom.hashes == 7
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(5000, 0.01)
+    for i in range(5000):
+        bloom.add(f"user-{i}")
+
+    assert all(f"user-{i}" in bloom for i in range(5000))
+    false_positives = sum(f"other-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+    assert bloom.estimated_fp_rate() < 0.02
+
+def test_id_bitmap_add_remove():
+    bitmap = IdBitmap()
+    for post_id in (0, 7, 8, 1000):
+        bitmap.add(post_id)
+    bitmap.add(7)
+
+    assert bitmap.count == 4
+    assert 1000 in bitmap and 999 not in bitmap and 10**9 not in bitmap
+    bitmap.remove(7)
+    bitmap.remove(7)
+    assert 7 not in bitmap and bitmap.count == 3
+
+class FakeDatabase:
+    def __init__(self, tables, on_stream=None):
+        self.tables = tables
+        self.on_stream = on_stream
+        self.stream_primary = []
+
+    async def execute_primary(self, query, params=None):
+        return [{"count": len(self.tables["user"])}]
+
+    async def stream_query(self, query, params=None, primary=False):
+        self.stream_primary.append(primary)
+        table = query.split()[-1]
+        for value in self.tables[table]:
+            if self.on_stream:
+                self.on_stream(table)
+            yield {"id": value}
+
+def test_load_reads_primary_and_keeps_changes_made_during_load(monkeypatch):
+    index = ExistenceIndex()
+
+    def during_load(table):
+        # 로드 도중 커밋된 회원가입 / 글 작성 / 삭제
+        if table == "ox":
+            index.user_added("late-user")
+            index.post_added("ox", 99)
+            index.post_removed("ox", 1)
+
+    db = FakeDatabase({"user": ["a", "b"], "ox": [1, 2], "qa": [5]}, during_load)
+    monkeypatch.setattr(existence_module, "database", db)
+    assert index.post_may_exist("ox", 12345)  # 로드 전에는 모두 "있을 수 있음"
+
+    asyncio.run(index.load())
+
+    assert db.stream_primary and all(db.stream_primary)
+    assert index.user_may_exist("a") and index.user_may_exist("late-user")
+    assert index.post_may_exist("ox", 2) and index.post_may_exist("ox", 99)
+    assert not index.post_may_exist("ox", 1)
+    assert not index.post_may_exist("qa", 6)
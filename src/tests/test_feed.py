@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from feed.feed import _MAX_ID, _decode_feed_cursor, _type_cursor
+from pagination import decode_cursor, encode_token
+
+CREATED_AT = datetime(2024, 5, 1, 12, 0, 0)
+
+def test_decode_feed_cursor():
+    cursor = encode_token([CREATED_AT.isoformat(), "qa", "7"])
+    assert _decode_feed_cursor(cursor) == (CREATED_AT, "qa", 7)
+
+@pytest.mark.parametrize("value", [[CREATED_AT.isoformat(), "xx", 1], [CREATED_AT.isoformat(), "ox"], ["bad", "ox", 1], "text"])
+def test_decode_feed_cursor_rejects_bad_values(value):
+    with pytest.raises(HTTPException) as error:
+        _decode_feed_cursor(encode_token(value))
+    assert error.value.status_code == 400
+
+def test_type_cursor_for_each_post_type():
+    feed_cursor = (CREATED_AT, "ox", 5)
+
+    # 같은 타입은 그대로 이어서
+    assert decode_cursor(_type_cursor(feed_cursor, "ox")) == (CREATED_AT, 5)
+    # 내림차순에서 먼저 나오는 타입 ("qa" > "ox"): 같은 시간의 글은 이미 지나갔으므로 제외
+    assert decode_cursor(_type_cursor(feed_cursor, "qa")) == (CREATED_AT, 0)
+    # 내림차순에서 나중에 나오는 타입: 같은 시간의 글은 아직 안 나왔으므로 모두 포함
+    assert decode_cursor(_type_cursor((CREATED_AT, "qa", 5), "ox")) == (CREATED_AT, _MAX_ID)
@@ -0,0 +1,51 @@
+import json
+
+from searching import fulltext
+from searching.fulltext import PostSearchIndex, tokenize
+
+def _index(docs):
+    index = PostSearchIndex()
+    index.ready = True
+    for (post_type, post_id), content in docs.items():
+        index.upsert(post_type, post_id, content)
+    return index
+
+def test_tokenize_splits_hangul_into_bigrams():
+    assert tokenize("OX퀴즈 재밌다") == ["ox", "퀴즈", "재밌", "밌다"]
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    path = tmp_path / "search.json"
+    monkeypatch.setattr(fulltext, "SEARCH_INDEX_PATH", str(path))
+
+    index = _index({("ox", 1): "사과는 빨갛다", ("qa", 2): "사과 맛있는 apple", ("ox", 3): "바나나 apple"})
+    index.remove("ox", 3)
+    index.save()
+
+    # pickle 이 아닌 JSON 으로 저장됨
+    assert json.loads(path.read_text(encoding="utf-8"))["version"] == fulltext._SNAPSHOT_VERSION
+
+    restored = PostSearchIndex()
+    snapshot = restored._read_snapshot()
+    assert snapshot is not None
+    restored.__dict__.update(snapshot)
+    restored.ready = True
+
+    assert restored._count == index._count == 2
+    assert restored._total_length == index._total_length
+    assert restored._free == index._free
+    assert restored._postings == index._postings
+    assert restored.search("사과", 10) == index.search("사과", 10)
+    assert [key for _, *key in restored.search("apple", 10)] == [["qa", 2]]
+
+    # 빈 번호를 다시 쓰고 단어 목록으로 지울 수 있어야 함
+    restored.upsert("ox", 4, "포도")
+    restored.remove("qa", 2)
+    assert restored.search("apple", 10) == []
+    assert [key for _, *key in restored.search("포도", 10)] == [["ox", 4]]
+
+def test_unreadable_snapshot_is_ignored(tmp_path, monkeypatch):
+    path = tmp_path / "search.json"
+    path.write_bytes(b"\x80\x05not json")
+    monkeypatch.setattr(fulltext, "SEARCH_INDEX_PATH", str(path))
+
+    assert PostSearchIndex()._read_snapshot() is None
@@ -0,0 +1,74 @@
+import asyncio
+
+from proFile import identity
+from proFile.identity import UserIdentityCache
+
+class FakeUsers:
+    """user 테이블 대신 쓰는 execute_query. release 가 set 될 때까지 첫 조회를 멈춰둘 수 있음"""
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.release = asyncio.Event()
+        self.block_first = False
+
+    async def execute_query(self, query, params=None):
+        self.queries.append(params)
+        if self.block_first and len(self.queries) == 1:
+            await self.release.wait()
+        return [self.rows[user_id] for user_id in params if user_id in self.rows]
+
+def _rows(*user_ids):
+    return {user_id: {"id": user_id, "name": user_id.upper(), "country": "KR"} for user_id in user_ids}
+
+def test_get_many_reads_only_misses(monkeypatch):
+    users = FakeUsers(_rows("a", "b"))
+    monkeypatch.setattr(identity.database, "execute_query", users.execute_query)
+
+    async def run():
+        cache = UserIdentityCache()
+        first = await cache.get_many(["a", "missing"])
+        second = await cache.get_many(["a", "b"])
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert set(first) == {"a"}
+    assert second["b"].name == "B"
+    assert users.queries == [("a", "missing"), ("b",)]
+
+def test_overlapping_loads_do_not_leak_loading_entries(monkeypatch):
+    users = FakeUsers(_rows("a", "b"))
+    users.block_first = True
+    monkeypatch.setattr(identity.database, "execute_query", users.execute_query)
+
+    async def run():
+        cache = UserIdentityCache()
+        # "a" 를 읽는 중에 "a" (기다림) 와 "b" (새로 읽음) 를 같이 요청
+        first = asyncio.ensure_future(cache.get_many(["a"]))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(cache.get_many(["a", "b"]))
+        await asyncio.sleep(0)
+        users.release.set()
+        results = await asyncio.gather(first, second)
+        await asyncio.sleep(0)
+        return cache, results
+
+    cache, (first, second) = asyncio.run(run())
+    assert set(first) == {"a"}
+    assert set(second) == {"a", "b"}
+    assert cache._loading == {}
+
+def test_put_while_loading_is_not_overwritten(monkeypatch):
+    users = FakeUsers(_rows("a"))
+    users.block_first = True
+    monkeypatch.setattr(identity.database, "execute_query", users.execute_query)
+
+    async def run():
+        cache = UserIdentityCache()
+        loading = asyncio.ensure_future(cache.get_many(["a"]))
+        await asyncio.sleep(0)
+        cache.put("a", "renamed", "US")
+        users.release.set()
+        await loading
+        return await cache.get("a")
+
+    assert asyncio.run(run()).name == "renamed"
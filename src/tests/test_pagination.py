@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, decode_token, encode_cursor, encode_token, keyset_condition, keyset_params, paginate
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 0, 123456)
+    cursor = encode_cursor(created_at, 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+    assert keyset_params(cursor) == [created_at, created_at, 42]
+
+def test_token_round_trip():
+    value = ["2024-05-01T00:00:00", "qa", 7]
+    assert decode_token(encode_token(value)) == value
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_token("text"), encode_token(["bad date", 1]), encode_token([1, 2, 3])])
+def test_bad_cursor_is_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_keyset_condition_direction():
+    assert keyset_condition("o") == "(o.created_at < %s OR (o.created_at = %s AND o.id < %s))"
+    assert keyset_condition("t", "post_id", ascending=True) == "(t.created_at > %s OR (t.created_at = %s AND t.post_id > %s))"
+
+def test_paginate_returns_cursor_only_when_more_rows_exist():
+    rows = [{"id": i, "created_at": datetime(2024, 1, 1, 0, 0, i)} for i in (3, 2, 1)]
+
+    page, cursor = paginate(rows, 3)
+    assert page == rows and cursor is None
+
+    page, cursor = paginate(rows, 2)
+    assert page == rows[:2]
+    assert decode_cursor(cursor) == (rows[1]["created_at"], 2)
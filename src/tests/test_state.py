@@ -0,0 +1,82 @@
+import asyncio
+
+from interaction import state as state_module
+from interaction.state import UserStateCache
+
+class FakeStateDatabase:
+    """`like` / `ox_check` 대신 쓰는 execute_primary. release 가 set 될 때까지 조회를 멈춰둘 수 있음"""
+    def __init__(self, likes, votes):
+        self.likes = likes
+        self.votes = votes
+        self.queries = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def execute_primary(self, query, params=None):
+        self.queries += 1
+        await self.release.wait()
+        user_id = params[0]
+        if "`like`" in query:
+            return [{"post_type": post_type, "post_id": post_id} for post_type, post_id in self.likes.get(user_id, [])]
+        return [{"post_id": post_id} for post_id in self.votes.get(user_id, [])]
+
+def _patch(monkeypatch, db):
+    monkeypatch.setattr(state_module.database, "execute_primary", db.execute_primary)
+
+def test_concurrent_gets_share_one_load(monkeypatch):
+    db = FakeStateDatabase({"a": [("ox", 3), ("qa", 1)]}, {"a": [3, 2]})
+    db.release.clear()
+    _patch(monkeypatch, db)
+
+    async def run():
+        cache = UserStateCache()
+        gets = [asyncio.ensure_future(cache.get("a")) for _ in range(3)]
+        await asyncio.sleep(0)
+        db.release.set()
+        states = await asyncio.gather(*gets)
+        return cache, states
+
+    cache, states = asyncio.run(run())
+    # 동시에 들어온 조회는 한 번만 (like + ox_check 쿼리 2 개) 읽고 같은 결과를 나눠 가짐
+    assert db.queries == 2
+    assert states[0] is states[1] is states[2]
+    assert states[0].liked("ox", 3) and states[0].liked("qa", 1) and not states[0].liked("qa", 3)
+    assert states[0].voted(2) and states[0].voted(3) and not states[0].voted(1)
+    assert not cache._loading
+
+def test_change_during_load_is_not_cached(monkeypatch):
+    db = FakeStateDatabase({}, {})
+    db.release.clear()
+    _patch(monkeypatch, db)
+
+    async def run():
+        cache = UserStateCache()
+        loading = asyncio.ensure_future(cache.get("a"))
+        await asyncio.sleep(0)
+        # 읽는 도중 커밋된 좋아요 (읽은 결과에는 빠져 있을 수 있음)
+        cache.set_liked("a", "ox", 5, True)
+        db.likes["a"] = [("ox", 5)]
+        db.release.set()
+        await loading
+        return await cache.get("a")
+
+    state = asyncio.run(run())
+    assert db.queries == 4
+    assert state.liked("ox", 5)
+
+def test_updates_apply_to_cached_state(monkeypatch):
+    _patch(monkeypatch, FakeStateDatabase({"a": [("ox", 1)]}, {}))
+
+    async def run():
+        cache = UserStateCache()
+        state = await cache.get("a")
+        cache.set_liked("a", "ox", 1, False)
+        cache.set_voted("a", 9, True)
+        cache.set_voted("a", 4, True)
+        return cache, state
+
+    cache, state = asyncio.run(run())
+    assert not state.liked("ox", 1)
+    assert state.voted(4) and state.voted(9)
+    cache.post_deleted("ox", 9)
+    assert not state.voted(9)
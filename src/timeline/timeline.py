@@ -0,0 +1,233 @@
+from database import database
+from following.graph import follow_graph
+from metrics import register
+from pagination import keyset_condition, keyset_params
+from dotenv import load_dotenv
+from collections import OrderedDict
+from typing import List, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+import time
+
+load_dotenv()
+
+# 팔로워가 이보다 많은 작성자의 글은 타임라인에 넣지 않고 조회할 때 직접 합침 (fan-out-on-read)
+TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", "5000"))
+# 유저 / 게시글 타입별로 타임라인에 남겨두는 최대 글 수 (이보다 오래된 글은 피드에서 보이지 않음)
+TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", "1000"))
+# 새로 팔로우했을 때 타임라인에 채워 넣는 상대의 최근 글 수
+TIMELINE_BACKFILL = int(os.getenv("TIMELINE_BACKFILL", "200"))
+# 글 작성 시 팔로워 타임라인을 TIMELINE_MAX_ENTRIES 개로 자르는 최소 간격 (초, 유저 / 타입별)
+TIMELINE_TRIM_INTERVAL = float(os.getenv("TIMELINE_TRIM_INTERVAL", "3600"))
+
+# 마지막으로 자른 시각을 기억하는 (유저, 타입) 수
+_TRIMMED_MAX = 100000
+# DELETE 한 번으로 자르는 유저 수
+_TRIM_CHUNK = 200
+
+# 타임라인을 쓰는 게시글 타입 -> 테이블
+TIMELINE_TABLES = {"ox": "ox", "qa": "qa"}
+
+class HomeTimeline:
+    """
+    팔로잉 피드용 유저별 타임라인 (timeline 테이블) 입니다.
+      - 글 작성: 작성자의 팔로워마다 (유저, 타입, 작성 시간, 글 id) 행을 넣음 (fan-out-on-write)
+      - 팔로워가 TIMELINE_FANOUT_LIMIT 명을 넘는 작성자: 넣지 않고 조회 시 작성자 글을 직접 합침 (fan-out-on-read)
+      - 팔로우 / 언팔로우: 상대의 최근 글을 채워 넣거나 지움
+      - 언팔로우로 작성자가 기준 아래로 내려오면: 팔로워 전원에게 최근 글을 채워 넣음
+        (기준을 넘는 동안 쓴 글은 타임라인에 없으므로)
+      - 글 작성 시 팔로워 타임라인을 TIMELINE_TRIM_INTERVAL 마다 한 번씩 TIMELINE_MAX_ENTRIES 개로 자름
+    조회는 (user_id, post_type, created_at, post_id) 기본 키 범위 한 번으로 끝납니다.
+    쓰기는 응답을 늦추지 않도록 백그라운드에서 실행합니다.
+    """
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        # (유저, 타입) -> 마지막으로 자른 시각
+        self._trimmed: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+        self._stats = {"fanOut": 0, "skippedCelebrity": 0, "backfill": 0, "demoted": 0, "trims": 0, "failed": 0}
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(self._guard(coro))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _guard(self, coro):
+        try:
+            await coro
+        except Exception:
+            self._stats["failed"] += 1
+            logging.exception("타임라인 반영 실패")
+
+    async def is_celebrity(self, author: str) -> bool:
+        return await follow_graph.follower_count(author) > TIMELINE_FANOUT_LIMIT
+
+    # 글 작성 후 호출
+    def post_created(self, post_type: str, post_id: int, author: str):
+        self._spawn(self._fan_out(post_type, post_id, author))
+
+    async def _fan_out(self, post_type: str, post_id: int, author: str):
+        if await self.is_celebrity(author):
+            self._stats["skippedCelebrity"] += 1
+            return
+
+        table = TIMELINE_TABLES[post_type]
+        # (following = 팔로우 하는 사람, follower = 팔로우 당하는 사람)
+        query = f"""
+        INSERT IGNORE INTO timeline (user_id, post_type, post_id, author, created_at)
+        SELECT f.following, %s, p.id, p.author, p.created_at
+        FROM {table} p
+        JOIN following f ON f.follower = p.author
+        WHERE p.id = %s
+        """
+        await database.execute_query(query, (post_type, post_id))
+        self._stats["fanOut"] += 1
+
+        await self.trim_many(self._due(await follow_graph.follower_ids(author), post_type), post_type)
+
+    # 마지막으로 자른 지 TIMELINE_TRIM_INTERVAL 이 지난 유저만 골라서 자른 시각을 기록
+    def _due(self, user_ids, post_type: str) -> List[str]:
+        now = time.monotonic()
+        due = []
+        for user_id in user_ids:
+            key = (user_id, post_type)
+            trimmed_at = self._trimmed.get(key)
+            if trimmed_at is not None and now - trimmed_at < TIMELINE_TRIM_INTERVAL:
+                continue
+            self._trimmed[key] = now
+            self._trimmed.move_to_end(key)
+            due.append(user_id)
+
+        while len(self._trimmed) > _TRIMMED_MAX:
+            self._trimmed.popitem(last=False)
+        return due
+
+    # 글 삭제 후 호출
+    def post_deleted(self, post_type: str, post_id: int):
+        self._spawn(database.execute_query("DELETE FROM timeline WHERE post_type = %s AND post_id = %s", (post_type, post_id)))
+
+    # user_id 가 author 를 팔로우한 뒤 호출
+    def followed(self, user_id: str, author: str):
+        self._spawn(self._backfill(user_id, author))
+
+    async def _backfill(self, user_id: str, author: str):
+        if await self.is_celebrity(author):
+            return
+
+        for post_type, table in TIMELINE_TABLES.items():
+            query = f"""
+            INSERT IGNORE INTO timeline (user_id, post_type, post_id, author, created_at)
+            SELECT %s, %s, p.id, p.author, p.created_at
+            FROM {table} p
+            WHERE p.author = %s
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT %s
+            """
+            await database.execute_query(query, (user_id, post_type, author, TIMELINE_BACKFILL))
+            await self.trim_many([user_id], post_type)
+        self._stats["backfill"] += 1
+
+    # user_id 가 author 를 언팔로우한 뒤 호출
+    def unfollowed(self, user_id: str, author: str):
+        self._spawn(self._unfollow(user_id, author))
+
+    async def _unfollow(self, user_id: str, author: str):
+        await database.execute_query("DELETE FROM timeline WHERE user_id = %s AND author = %s", (user_id, author))
+        if await self.is_celebrity(author):
+            return
+
+        # 기준을 넘는 동안 쓴 글 (최근 글이 타임라인에 없음) 이 있으면 팔로워 전원에게 채워 넣음
+        for post_type, table in TIMELINE_TABLES.items():
+            query = f"""
+            SELECT 1 FROM {table} p
+            WHERE p.author = %s
+              AND EXISTS (SELECT 1 FROM following f WHERE f.follower = p.author)
+              AND NOT EXISTS (SELECT 1 FROM timeline t WHERE t.post_type = %s AND t.post_id = p.id)
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT 1
+            """
+            if not await database.execute_query(query, (author, post_type)):
+                continue
+
+            query = f"""
+            INSERT IGNORE INTO timeline (user_id, post_type, post_id, author, created_at)
+            SELECT f.following, %s, p.id, p.author, p.created_at
+            FROM following f
+            JOIN (
+                SELECT id, author, created_at FROM {table}
+                WHERE author = %s
+                ORDER BY created_at DESC, id DESC
+                LIMIT %s
+            ) AS p ON p.author = f.follower
+            WHERE f.follower = %s
+            """
+            await database.execute_query(query, (post_type, author, TIMELINE_BACKFILL, author))
+            await self.trim_many(await follow_graph.follower_ids(author), post_type)
+            self._stats["demoted"] += 1
+
+    # 유저마다 최근 TIMELINE_MAX_ENTRIES 개보다 오래된 행 삭제
+    # 유저별로 조회 + DELETE 를 반복하지 않고 _TRIM_CHUNK 명씩 DELETE 한 번으로 자름
+    # (윈도 함수가 든 파생 테이블은 먼저 구체화되므로 같은 테이블을 지우는 DELETE 에서 쓸 수 있음)
+    async def trim_many(self, user_ids: List[str], post_type: str):
+        user_ids = list(user_ids)
+        for start in range(0, len(user_ids), _TRIM_CHUNK):
+            chunk = user_ids[start:start + _TRIM_CHUNK]
+            query = f"""
+            DELETE t FROM timeline t
+            JOIN (
+                SELECT user_id, created_at, post_id FROM (
+                    SELECT user_id, created_at, post_id,
+                           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, post_id DESC) AS rn
+                    FROM timeline
+                    WHERE post_type = %s AND user_id IN ({", ".join(["%s"] * len(chunk))})
+                ) AS ranked
+                WHERE rn > %s
+            ) AS old ON old.user_id = t.user_id AND old.created_at = t.created_at AND old.post_id = t.post_id
+            WHERE t.post_type = %s
+            """
+            await database.execute_query(query, (post_type, *chunk, TIMELINE_MAX_ENTRIES, post_type))
+            self._stats["trims"] += len(chunk)
+
+    # 피드 한 페이지에 들어갈 글 id 를 만드는 서브쿼리 (id, created_at 컬럼)
+    # 타임라인 범위 조회 + 팔로우 중인 인기 작성자의 글을 합쳐서 최신순 limit 개
+    # 삭제된 글의 행 (삭제 반영 전이거나 실패한 경우) 은 limit 을 세기 전에 걸러서 페이지가 줄어들지 않도록 함
+    async def feed_source(self, user_id: str, post_type: str, cursor: Optional[str], limit: int) -> Tuple[str, list]:
+        table = TIMELINE_TABLES[post_type]
+        cursor_params = keyset_params(cursor) if cursor else []
+
+        query = f"""
+        (SELECT t.post_id AS id, t.created_at FROM timeline t
+         JOIN {table} p ON p.id = t.post_id
+         WHERE t.user_id = %s AND t.post_type = %s{" AND " + keyset_condition("t", "post_id") if cursor else ""}
+         ORDER BY t.created_at DESC, t.post_id DESC LIMIT %s)
+        """
+        params = [user_id, post_type, *cursor_params, limit]
+
+        celebrities = await self._followed_celebrities(user_id)
+        if celebrities:
+            # 인기 작성자가 기준을 넘기 전에 넣어둔 행과 겹칠 수 있으므로 UNION 으로 중복 제거
+            query += f"""
+            UNION
+            (SELECT p.id, p.created_at FROM {table} p
+             WHERE p.author IN ({", ".join(["%s"] * len(celebrities))}){" AND " + keyset_condition("p") if cursor else ""}
+             ORDER BY p.created_at DESC, p.id DESC LIMIT %s)
+            """
+            params.extend([*celebrities, *cursor_params, limit])
+
+        return f"SELECT id, created_at FROM ({query}) AS feed ORDER BY created_at DESC, id DESC LIMIT %s", params + [limit]
+
+    async def _followed_celebrities(self, user_id: str) -> List[str]:
+        authors = await follow_graph.following_ids(user_id)
+        counts = await follow_graph.follower_counts(authors)
+        return [author for author in authors if counts[author] > TIMELINE_FANOUT_LIMIT]
+
+    # 서버 종료 시 남은 쓰기 작업을 기다림
+    async def drain(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return dict(self._stats, pending=len(self._tasks), fanOutLimit=TIMELINE_FANOUT_LIMIT, maxEntries=TIMELINE_MAX_ENTRIES)
+
+home_timeline = HomeTimeline()
+register("timeline", home_timeline.stats)
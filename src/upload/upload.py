@@ -0,0 +1,218 @@
+from fastapi import APIRouter, Header, HTTPException, status
+from database import database
+from typing import Optional, List
+from pydantic import BaseModel
+from dotenv import load_dotenv
+import logging
+import math
+import os
+import uuid
+import uploadS3
+
+load_dotenv()
+
+# 한 파일의 최대 크기 (byte)
+UPLOAD_MAX_SIZE = int(os.getenv("UPLOAD_MAX_SIZE", str(1024 * 1024 * 1024)))
+# 발급 후 이 시간 (초) 이 지나도 완료되지 않은 업로드는 `python reconcile.py uploads` 에서 정리
+# (presigned URL 유효 시간 S3_PRESIGN_EXPIRES 보다 길어야 함)
+UPLOAD_PENDING_TTL = int(os.getenv("UPLOAD_PENDING_TTL", "86400"))
+
+# 한 번에 정리하는 업로드 수
+_CLEANUP_BATCH = 500
+
+router = APIRouter(
+    tags=["upload"],
+    responses={404: {"description" : "Not Found"}},
+)
+
+class UploadRequest(BaseModel):
+    fileName: str
+    size: int
+    contentType: Optional[str] = None
+
+class UploadPart(BaseModel):
+    partNumber: int
+    url: str
+
+class UploadResponse(BaseModel):
+    uploadId: int
+    key: str
+    method: str
+    url: Optional[str] = None
+    partSize: Optional[int] = None
+    parts: Optional[List[UploadPart]] = None
+
+@router.post("", summary="S3 직접 업로드 URL 발급", response_model=UploadResponse)
+async def create_upload(item: UploadRequest, userId: str = Header()):
+    """
+    클라이언트가 파일을 API 서버를 거치지 않고 S3 에 바로 올릴 수 있도록 presigned URL 을 발급하는 EndPoint입니다.
+    업로드가 끝나면 POST /api/upload/{uploadId}/complete 를 호출해야 합니다.
+    
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    - **fileName**: 원본 파일 이름 (필수) (str) (저장 시 뒤에 날짜가 붙음)
+    - **size**: 파일 크기 (필수) (int) (byte)
+    - **contentType**: 파일 MIME 타입 (선택) (str)
+    
+    작은 파일은 method=PUT 과 url 하나, 큰 파일은 method=MULTIPART 와 조각별 url(parts) 이 반환됩니다.
+    멀티파트인 경우 파일을 partSize 단위로 잘라서 각 url 에 PUT 하고, 응답의 ETag 헤더를 모아서 완료 요청에 보내야 합니다.
+    """
+    
+    if len(userId) == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="유저 ID는 필수입니다."
+        )
+    
+    if len(item.fileName) == 0 or len(item.fileName) > 200:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="파일 이름은 1글자 이상 200글자 이하여야 합니다."
+        )
+    
+    if item.size <= 0 or item.size > UPLOAD_MAX_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"파일 크기는 1byte 이상 {UPLOAD_MAX_SIZE}byte 이하여야 합니다."
+        )
+    
+    # 같은 이름 / 같은 날짜로 올려도 덮어쓰지 않도록 유저 + 랜덤 경로 아래에 둠
+    file_name = uploadS3.dated_file_name(item.fileName.replace("/", "_"))
+    key = f"uploads/{userId}/{uuid.uuid4().hex}/{file_name}"
+    
+    try:
+        multipart_id = None
+        if item.size > uploadS3.S3_MULTIPART_THRESHOLD:
+            multipart_id = await uploadS3.create_multipart(key, item.contentType)
+        
+        query = """
+        INSERT INTO upload (owner, object_key, file_name, content_type, size, multipart_id)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """
+        params = (userId, key, file_name, item.contentType, item.size, multipart_id)
+        upload_id = await database.execute_insert(query, params)
+        
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="예상치 못한 오류가 발생했습니다."
+        )
+    
+    if multipart_id is None:
+        return {"uploadId": upload_id, "key": key, "method": "PUT", "url": uploadS3.presign_put(key, item.contentType)}
+    
+    part_size = uploadS3.part_size_for(item.size)
+    part_count = math.ceil(item.size / part_size)
+    return {
+        "uploadId": upload_id,
+        "key": key,
+        "method": "MULTIPART",
+        "partSize": part_size,
+        "parts": uploadS3.presign_parts(key, multipart_id, part_count),
+    }
+
+class CompletedPart(BaseModel):
+    partNumber: int
+    etag: str
+
+class UploadComplete(BaseModel):
+    parts: Optional[List[CompletedPart]] = None
+
+@router.post("/{uploadId}/complete", summary="S3 직접 업로드 완료")
+async def complete_upload(uploadId: int, item: UploadComplete, userId: str = Header()):
+    """
+    presigned URL 로 S3 업로드를 마친 뒤 호출하는 EndPoint입니다.
+    S3 에 실제로 올라간 객체를 확인하고 업로드 기록을 완료 상태로 바꿉니다.
+    
+    - **userId**: 현재 접속중인 유저 ID (필수) (str) (Header)
+    - **uploadId**: 발급 시 받은 업로드 ID (필수) (int) (Parameter)
+    - **parts**: 멀티파트인 경우 조각 번호와 ETag 목록 (멀티파트일 때 필수) (list)
+    """
+    
+    query = "SELECT owner, object_key, size, multipart_id, status FROM upload WHERE id = %s"
+    result = await database.execute_query(query, (uploadId,))
+    
+    if len(result) == 0 or result[0]['owner'] != userId:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="존재하지 않는 업로드입니다."
+        )
+    
+    upload = result[0]
+    key = upload['object_key']
+    if upload['status'] == 'completed':
+        return {"message": "Already completed", "fileUrl": uploadS3.file_url_of(key)}
+    
+    if upload['multipart_id'] is not None and not item.parts:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="멀티파트 업로드는 parts가 필요합니다."
+        )
+    
+    try:
+        if upload['multipart_id'] is not None:
+            parts = [{"PartNumber": part.partNumber, "ETag": part.etag} for part in item.parts]
+            await uploadS3.complete_multipart(key, upload['multipart_id'], parts)
+        
+        size = await uploadS3.object_size(key)
+        
+    except uploadS3.ClientError as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="S3 업로드를 완료하지 못했습니다. parts를 확인해주세요."
+        )
+    except Exception as e:
+        print(e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="예상치 못한 오류가 발생했습니다."
+        )
+    
+    if size is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="S3에 파일이 올라가지 않았습니다."
+        )
+    
+    # presigned URL 로는 크기를 막을 수 없으므로 실제로 올라간 크기를 확인하고, 넘으면 객체와 기록을 지움
+    if size > UPLOAD_MAX_SIZE:
+        await uploadS3.delete_object(key)
+        await database.execute_query("DELETE FROM upload WHERE id = %s AND status = 'pending'", (uploadId,))
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"파일 크기는 {UPLOAD_MAX_SIZE}byte 이하여야 합니다."
+        )
+    
+    # 발급 시 받은 크기와 다르면 실제 크기로 기록
+    query = "UPDATE upload SET status = 'completed', size = %s, completed_at = NOW() WHERE id = %s"
+    await database.execute_query(query, (size, uploadId))
+    
+    return {"message": "Successfully Uploaded", "fileUrl": uploadS3.file_url_of(key)}
+
+# 완료 요청 없이 UPLOAD_PENDING_TTL 이 지난 업로드 정리
+# 멀티파트는 중단해서 이미 올라간 조각을 지우고 (중단하지 않으면 조각이 S3 에 계속 남아 과금됨), 단일 PUT 은 객체를 지움
+async def cleanup_stale_uploads() -> int:
+    cleaned = 0
+    while True:
+        query = """
+        SELECT id, object_key, multipart_id FROM upload
+        WHERE status = 'pending' AND created_at < NOW() - INTERVAL %s SECOND
+        ORDER BY id
+        LIMIT %s
+        """
+        result = await database.execute_query(query, (UPLOAD_PENDING_TTL, _CLEANUP_BATCH))
+        if len(result) == 0:
+            return cleaned
+
+        for upload in result:
+            if upload['multipart_id'] is not None:
+                await uploadS3.abort_multipart(upload['object_key'], upload['multipart_id'])
+            else:
+                await uploadS3.delete_object(upload['object_key'])
+
+        ids = [upload['id'] for upload in result]
+        placeholders = ", ".join(["%s"] * len(ids))
+        await database.execute_query(f"DELETE FROM upload WHERE id IN ({placeholders}) AND status = 'pending'", tuple(ids))
+        cleaned += len(ids)
+        logging.info(f"완료되지 않은 업로드 {cleaned}개 정리")
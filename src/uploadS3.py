@@ -1,9 +1,18 @@
 from fastapi import File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+from botocore.config import Config
+from botocore.exceptions import ClientError, NoCredentialsError, PartialCredentialsError
 from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from io import BytesIO
+from metrics import register
+from typing import Callable, Optional, Union
+import asyncio
 import boto3 
+import inspect
+import logging
+import math
 import os
 from datetime import datetime
 import pytz
@@ -15,32 +24,143 @@ S3_BUCKET = os.getenv("S3_BUCKET")
 AWS_ACCESS_KEY = os.getenv("AWS_ACCESS_KEY")
 AWS_SECRET_KEY = os.getenv("AWS_SECRET_KEY")
 
+# S3 호환 저장소(MinIO, LocalStack 등)로 테스트할 때 지정. 없으면 AWS S3
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+
+# 멀티파트 업로드 한 조각 크기 (S3 최소 5MB). 이보다 작은 파일은 한 번에 업로드
+S3_PART_SIZE = max(int(os.getenv("S3_PART_SIZE", str(8 * 1024 * 1024))), 5 * 1024 * 1024)
+# 파일 하나를 올릴 때 동시에 전송하는 조각 수 (메모리 사용량 = 조각 크기 x 이 값)
+S3_PART_CONCURRENCY = int(os.getenv("S3_PART_CONCURRENCY", "4"))
+# 전체 S3 호출에 쓰는 스레드 수 (업로드가 몰려도 이 이상 동시에 전송하지 않음)
+S3_MAX_WORKERS = int(os.getenv("S3_MAX_WORKERS", "8"))
+
+# 클라이언트가 S3 로 바로 올릴 때 쓰는 presigned URL 유효 시간 (초)
+S3_PRESIGN_EXPIRES = int(os.getenv("S3_PRESIGN_EXPIRES", "3600"))
+# 이 크기를 넘는 파일은 presigned 멀티파트 업로드로 받음
+S3_MULTIPART_THRESHOLD = int(os.getenv("S3_MULTIPART_THRESHOLD", str(64 * 1024 * 1024)))
+# S3 멀티파트 업로드 최대 조각 수
+S3_MAX_PARTS = 10000
+
 # S3 클라이언트 설정
 s3_client = boto3.client(
     's3',
     aws_access_key_id=AWS_ACCESS_KEY,
-    aws_secret_access_key=AWS_SECRET_KEY
+    aws_secret_access_key=AWS_SECRET_KEY,
+    endpoint_url=S3_ENDPOINT_URL,
+    config=Config(max_pool_connections=S3_MAX_WORKERS),
 )
 
+# boto3 는 동기 라이브러리라서 이벤트 루프를 막지 않도록 전용 스레드에서 실행
+_executor = ThreadPoolExecutor(max_workers=S3_MAX_WORKERS, thread_name_prefix="s3")
+
+_stats = {"active": 0, "completed": 0, "failed": 0, "cancelled": 0, "bytes": 0}
+register("s3", lambda: dict(_stats, partSize=S3_PART_SIZE, partConcurrency=S3_PART_CONCURRENCY, maxWorkers=S3_MAX_WORKERS))
+
+async def _call(method, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, partial(method, **kwargs))
+
+# BytesIO 같은 일반 파일 객체와 UploadFile(async read) 모두 지원
+async def _read(file, size: int) -> bytes:
+    data = file.read(size)
+    if inspect.isawaitable(data):
+        data = await data
+    return data
+
+def file_url_of(key: str) -> str:
+    if S3_ENDPOINT_URL:
+        return f"{S3_ENDPOINT_URL.rstrip('/')}/{S3_BUCKET}/{key}"
+    return f"https://{S3_BUCKET}.s3.amazonaws.com/{key}"
+
+# 파일을 S3_PART_SIZE 단위로 읽어서 S3_PART_CONCURRENCY 개씩 동시에 올림
+# progress(지금까지 올라간 byte 수) 는 조각 하나가 끝날 때마다 호출됨
+# 업로드 중인 task 가 취소되거나 실패하면 멀티파트 업로드를 abort 해서 S3 에 조각이 남지 않게 함
+async def put_object(file, key: str, progress: Optional[Callable[[int], None]] = None, content_type: Optional[str] = None):
+    extra = {"ContentType": content_type} if content_type else {}
+    first = await _read(file, S3_PART_SIZE)
+
+    _stats["active"] += 1
+    try:
+        if len(first) < S3_PART_SIZE:
+            await _call(s3_client.put_object, Bucket=S3_BUCKET, Key=key, Body=first, **extra)
+            _stats["bytes"] += len(first)
+            if progress:
+                progress(len(first))
+        else:
+            await _multipart_upload(file, key, first, progress, extra)
+        _stats["completed"] += 1
+    except asyncio.CancelledError:
+        _stats["cancelled"] += 1
+        raise
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    finally:
+        _stats["active"] -= 1
+
+async def _multipart_upload(file, key: str, first: bytes, progress, extra: dict):
+    upload = await _call(s3_client.create_multipart_upload, Bucket=S3_BUCKET, Key=key, **extra)
+    upload_id = upload["UploadId"]
+
+    slots = asyncio.Semaphore(S3_PART_CONCURRENCY)
+    parts = []
+    uploaded = 0
+
+    async def send(number: int, body: bytes):
+        nonlocal uploaded
+        try:
+            result = await _call(s3_client.upload_part, Bucket=S3_BUCKET, Key=key, UploadId=upload_id, PartNumber=number, Body=body)
+            parts.append({"PartNumber": number, "ETag": result["ETag"]})
+            uploaded += len(body)
+            _stats["bytes"] += len(body)
+            if progress:
+                progress(uploaded)
+        finally:
+            slots.release()
+
+    tasks = []
+    try:
+        body = first
+        number = 1
+        while body:
+            # 동시에 올리는 조각 수만큼만 메모리에 읽어둠
+            await slots.acquire()
+            tasks.append(asyncio.ensure_future(send(number, body)))
+            # 앞 조각이 실패했으면 더 읽지 않고 바로 중단
+            for task in tasks:
+                if task.done() and task.exception():
+                    raise task.exception()
+            body = await _read(file, S3_PART_SIZE)
+            number += 1
+
+        await asyncio.gather(*tasks)
+        parts.sort(key=lambda part: part["PartNumber"])
+        await _call(s3_client.complete_multipart_upload, Bucket=S3_BUCKET, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        # 취소된 상태여도 abort 는 끝까지 보내야 함
+        abort = asyncio.ensure_future(_call(s3_client.abort_multipart_upload, Bucket=S3_BUCKET, Key=key, UploadId=upload_id))
+        try:
+            await asyncio.shield(abort)
+        except BaseException as e:
+            logging.warning(f"S3 멀티파트 업로드 abort 실패 ({key}): {e!r}")
+        raise
+
 # S3 내 파일 업로드
 # [file_name 형식]
 #  1. 확장자와 함께 넘어온 경우. Input: address.xlsx -> address-YYYY-MM-DD.xlsx
 #  2. 확장자 없이 넘어온 경우 ".xlsx" 추가. Input: address -> address-YYYY-MM-DD.xlsx 
-async def upload_file(file: BytesIO, file_name: str):
+async def upload_file(file: Union[BytesIO, UploadFile], file_name: str, progress: Optional[Callable[[int], None]] = None):
     try:
-        file_name_only, ext = split_file_name(file_name)
-    
-        # 현재 한국 시간 반환하여 파일 이름에 시간 등록
-        korea_date = get_korea_date().strftime("%Y-%m-%d")
-        
-        # 현재 한국 시간과 파일명을 더함 ex)2024-07-03-***.xlsx
-        file_name = file_name_only + "-" + korea_date + ext
+        file_name = dated_file_name(file_name)
         
-        # S3에 파일 업로드
-        s3_client.upload_fileobj(file, S3_BUCKET, file_name)
+        # S3에 파일 업로드 (큰 파일은 멀티파트로 나눠서 동시에 전송)
+        await put_object(file, file_name, progress)
 
         # 파일의 S3 URL 생성
-        file_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{file_name}"
+        file_url = file_url_of(file_name)
 
         return file_url
     
@@ -51,6 +171,74 @@ async def upload_file(file: BytesIO, file_name: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
+# presigned URL 로 클라이언트가 직접 올리는 경우 (API 서버는 URL 만 발급)
+def presign_put(key: str, content_type: Optional[str] = None) -> str:
+    params = {"Bucket": S3_BUCKET, "Key": key}
+    if content_type:
+        params["ContentType"] = content_type
+    return s3_client.generate_presigned_url("put_object", Params=params, ExpiresIn=S3_PRESIGN_EXPIRES)
+
+# 비공개 버킷의 객체를 내려받을 수 있는 URL
+def presign_get(key: str) -> str:
+    return s3_client.generate_presigned_url("get_object", Params={"Bucket": S3_BUCKET, "Key": key}, ExpiresIn=S3_PRESIGN_EXPIRES)
+
+# 조각 수가 S3_MAX_PARTS 를 넘지 않도록 조각 크기를 키움
+def part_size_for(size: int) -> int:
+    return max(S3_PART_SIZE, math.ceil(size / S3_MAX_PARTS))
+
+async def create_multipart(key: str, content_type: Optional[str] = None) -> str:
+    extra = {"ContentType": content_type} if content_type else {}
+    upload = await _call(s3_client.create_multipart_upload, Bucket=S3_BUCKET, Key=key, **extra)
+    return upload["UploadId"]
+
+def presign_parts(key: str, upload_id: str, part_count: int) -> list:
+    return [
+        {
+            "partNumber": number,
+            "url": s3_client.generate_presigned_url(
+                "upload_part",
+                Params={"Bucket": S3_BUCKET, "Key": key, "UploadId": upload_id, "PartNumber": number},
+                ExpiresIn=S3_PRESIGN_EXPIRES,
+            ),
+        }
+        for number in range(1, part_count + 1)
+    ]
+
+async def complete_multipart(key: str, upload_id: str, parts: list):
+    parts = sorted(parts, key=lambda part: part["PartNumber"])
+    await _call(s3_client.complete_multipart_upload, Bucket=S3_BUCKET, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+
+async def abort_multipart(key: str, upload_id: str):
+    try:
+        await _call(s3_client.abort_multipart_upload, Bucket=S3_BUCKET, Key=key, UploadId=upload_id)
+    except ClientError as e:
+        # 이미 완료 / 중단된 업로드
+        if e.response.get("Error", {}).get("Code") != "NoSuchUpload":
+            raise
+
+# 없는 키를 지워도 오류가 나지 않음
+async def delete_object(key: str):
+    await _call(s3_client.delete_object, Bucket=S3_BUCKET, Key=key)
+
+# 올라간 객체의 크기 (없으면 None)
+async def object_size(key: str) -> Optional[int]:
+    try:
+        head = await _call(s3_client.head_object, Bucket=S3_BUCKET, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return head["ContentLength"]
+
+# 확장자 앞에 현재 한국 날짜를 붙임 ex) address.xlsx -> address-2024-07-03.xlsx
+def dated_file_name(file_name: str) -> str:
+    file_name_only, ext = split_file_name(file_name)
+
+    # 현재 한국 시간 반환하여 파일 이름에 시간 등록
+    korea_date = get_korea_date().strftime("%Y-%m-%d")
+
+    return file_name_only + "-" + korea_date + ext
+
 # 현재 한국 시간 반환
 def get_korea_date():
     seoul_tz = pytz.timezone('Asia/Seoul')